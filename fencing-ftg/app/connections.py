@@ -0,0 +1,140 @@
+import asyncio
+import time
+from typing import Optional
+from fastapi import WebSocket
+from .game.scheduler import CostStats
+from .game.metrics import REGISTRY, SAMPLING
+from .protocol import Snapshot, FORMAT_JSON, FORMAT_BINARY
+
+SEND_SECONDS = {fmt: REGISTRY.histogram("ftg_send_seconds", "One websocket send, per wire format (sampled frames)",
+                                        {"format": fmt})
+                for fmt in (FORMAT_JSON, FORMAT_BINARY)}
+
+# Close code / reason for clients dropped for being too slow
+EVICT_CODE = 1008
+EVICT_REASON = "Too slow"
+
+
+class Client:
+    """
+    One websocket with its own outbound queue and writer task.
+
+    The queue holds a single snapshot slot: a newer snapshot supersedes one that
+    has not been sent yet, so a lagging client only ever receives the latest state
+    and the game loop never waits on a socket. A client that is still busy with an
+    earlier send for max_lagged_ticks consecutive ticks, or whose send takes longer
+    than send_timeout seconds, is evicted.
+    """
+
+    def __init__(self, websocket: WebSocket, fmt: str = FORMAT_JSON,
+                 max_lagged_ticks: int = 120, send_timeout: float = 5.0):
+        self.websocket = websocket
+        self.fmt = fmt
+        self.max_lagged_ticks = max_lagged_ticks
+        self.send_timeout = send_timeout
+        self.last_seq: Optional[int] = None  # last frame sent, for delta encoding and heartbeats
+
+        self.sent = 0
+        self.dropped = 0       # snapshots superseded before they were sent
+        self.lagged_ticks = 0  # consecutive offers that found the writer still busy
+        self.send_stats = CostStats()
+        self._send_seconds = SEND_SECONDS[fmt]
+        self.closed = False
+        self.close_reason: Optional[str] = None
+
+        self._pending: Optional[Snapshot] = None
+        self._sending = False
+        self._ready = asyncio.Event()
+        self._writer = asyncio.create_task(self._write_loop())
+
+    @property
+    def queue_depth(self) -> int:
+        return 0 if self._pending is None else 1
+
+    @property
+    def idle(self) -> bool:
+        """Nothing queued or being sent."""
+        return self._pending is None and not self._sending
+
+    def offer(self, snapshot: Snapshot):
+        """Queue a snapshot without blocking (called from the tick loop)."""
+        if self.closed:
+            return
+        if self._pending is not None:
+            self.dropped += 1
+        if self._pending is not None or self._sending:
+            self.lagged_ticks += 1
+            if self.lagged_ticks >= self.max_lagged_ticks:
+                self.evict(f"queue saturated for {self.lagged_ticks} ticks")
+                return
+        else:
+            self.lagged_ticks = 0
+        self._pending = snapshot
+        self._ready.set()
+
+    async def _send(self, snapshot: Snapshot):
+        # snapshot may also be a protocol.Heartbeat (same interface)
+        if self.fmt == FORMAT_BINARY:
+            # binary_for falls back to a keyframe if frames were superseded in between
+            await self.websocket.send_bytes(snapshot.binary_for(self.last_seq))
+        else:
+            await self.websocket.send_text(snapshot.json)
+        self.last_seq = snapshot.seq
+
+    async def _write_loop(self):
+        while not self.closed:
+            await self._ready.wait()
+            self._ready.clear()
+            snapshot, self._pending = self._pending, None
+            if snapshot is None:
+                continue
+            start = time.perf_counter()
+            self._sending = True
+            try:
+                await asyncio.wait_for(self._send(snapshot), self.send_timeout)
+            except asyncio.TimeoutError:
+                self.evict(f"send took longer than {self.send_timeout}s")
+                return
+            except Exception as e:
+                # Socket already gone; the receive loop will notice the disconnect
+                self.close(f"send failed: {e!r}")
+                return
+            finally:
+                self._sending = False
+            cost = time.perf_counter() - start
+            self.send_stats.record(cost)
+            if SAMPLING.on:
+                self._send_seconds.observe(cost)
+            self.sent += 1
+
+    def close(self, reason: str = "closed"):
+        """Stop the writer (on disconnect). Safe to call more than once."""
+        if self.closed:
+            return
+        self.closed = True
+        self.close_reason = reason
+        self._pending = None
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+    def evict(self, reason: str):
+        print(f"Evicting client: {reason}")
+        self.close(reason)
+        asyncio.create_task(self._close_socket())
+
+    async def _close_socket(self):
+        try:
+            await self.websocket.close(code=EVICT_CODE, reason=EVICT_REASON)
+        except Exception:
+            pass  # Already closed
+
+    def report(self) -> dict:
+        return {
+            "format": self.fmt,
+            "queue_depth": self.queue_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "lagged_ticks": self.lagged_ticks,
+            "send": self.send_stats.report(),
+            "closed": self.close_reason,
+        }
@@ -1,21 +1,27 @@
-from .models import GameState, ActionType, FencerState, Fencer
+from .models import GameCore, GameState, ActionType, FencerState, STATE_CODES
 import random
+from typing import Optional, Union
+
+# Opponent states to retreat from: state codes (GameEngine.core) and FencerState (a Pydantic GameState)
+_ATTACKING = frozenset((FencerState.ATTACK_STARTUP, FencerState.ATTACK_ACTIVE,
+                        STATE_CODES[FencerState.ATTACK_STARTUP], STATE_CODES[FencerState.ATTACK_ACTIVE]))
 
 class SimpleAI:
-    def __init__(self, player_id: int):
+    def __init__(self, player_id: int, seed: Optional[int] = None):
         self.player_id = player_id
-        # Reaction delay or randomness can be added here
+        # Own RNG so a bout can be reproduced from its seed (see replay.py)
+        self.rng = random.Random(seed)
         self.tick_counter = 0
         self.action_cooldown = 0
 
-    def decide(self, game_state: GameState) -> ActionType:
+    def decide(self, game_state: Union[GameCore, GameState]) -> ActionType:
         self.tick_counter += 1
         if self.action_cooldown > 0:
             self.action_cooldown -= 1
             return ActionType.IDLE
 
-        me: Fencer = game_state.fencers[self.player_id]
-        opponent: Fencer = game_state.fencers[1 - self.player_id]
+        me = game_state.fencers[self.player_id]
+        opponent = game_state.fencers[1 - self.player_id]
         
         # Extract useful info
         # Check distance
@@ -28,7 +34,7 @@ class SimpleAI:
         
         # Simple Logic
         # 1. If opponent attacking, try to retreat (step back)
-        if opponent.state in [FencerState.ATTACK_STARTUP, FencerState.ATTACK_ACTIVE] and dist < 2.5:
+        if opponent.state in _ATTACKING and dist < 2.5:
              # Retreat!
              self.action_cooldown = 5
              return ActionType.STEP_BACK
@@ -39,7 +45,7 @@ class SimpleAI:
             
         # 3. If range is Optimal (around 2.0), try to attack or dither
         if 1.5 <= dist <= 2.5:
-            dice = random.random()
+            dice = self.rng.random()
             if dice < 0.05: # Small chance to attack per tick
                 self.action_cooldown = 20
                 return ActionType.THRUST
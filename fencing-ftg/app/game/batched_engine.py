@@ -0,0 +1,220 @@
+import numpy as np
+from .models import (
+    Fencer, GameState, ActionType, FencerState, GameConfig,
+    ACTION_TYPES, FENCER_STATES, ACTION_CODES, STATE_CODES,
+)
+
+# State / action codes (see models.ACTION_TYPES / models.FENCER_STATES)
+NEUTRAL = STATE_CODES[FencerState.NEUTRAL]
+MOVING_FORWARD = STATE_CODES[FencerState.MOVING_FORWARD]
+MOVING_BACKWARD = STATE_CODES[FencerState.MOVING_BACKWARD]
+ATTACK_STARTUP = STATE_CODES[FencerState.ATTACK_STARTUP]
+ATTACK_ACTIVE = STATE_CODES[FencerState.ATTACK_ACTIVE]
+HIT = STATE_CODES[FencerState.HIT]
+
+IDLE = ACTION_CODES[ActionType.IDLE]
+THRUST = ACTION_CODES[ActionType.THRUST]
+LUNGE = ACTION_CODES[ActionType.LUNGE]
+
+# last_event codes
+EVENTS = (None, "P1_POINT", "P2_POINT", "DOUBLE_TOUCH", "GAME_RESTART")
+EVENT_NONE, EVENT_P1_POINT, EVENT_P2_POINT, EVENT_DOUBLE_TOUCH, EVENT_GAME_RESTART = range(len(EVENTS))
+EVENT_CODES = {name: code for code, name in enumerate(EVENTS)}
+
+# winner codes (-1 is a tie, as in GameState)
+NO_WINNER = -2
+
+# Same start positions / frame data as GameEngine
+START_POSITIONS = (4.0, 10.0)
+FREEZE_FRAMES = 60
+THRUST_ACTIVE_FRAMES = 15
+LUNGE_ACTIVE_FRAMES = 25
+
+# Lookup tables indexed by action code: which state / timer an action puts a NEUTRAL fencer in.
+# -1 means "no state change" (IDLE, BEAT).
+_ACTION_STATE = np.full(len(ACTION_TYPES), -1, dtype=np.int8)
+_ACTION_TIMER = np.zeros(len(ACTION_TYPES), dtype=np.int32)
+for _action, _state, _timer in (
+    (ActionType.STEP_FORWARD, FencerState.MOVING_FORWARD, 10),
+    (ActionType.STEP_BACK, FencerState.MOVING_BACKWARD, 10),
+    (ActionType.THRUST, FencerState.ATTACK_STARTUP, 5),
+    (ActionType.LUNGE, FencerState.ATTACK_STARTUP, 8),
+):
+    _ACTION_STATE[ACTION_CODES[_action]] = STATE_CODES[_state]
+    _ACTION_TIMER[ACTION_CODES[_action]] = _timer
+
+# Direction of "forward" for each fencer: P1 moves +x, P2 moves -x
+_FORWARD = np.array([1.0, -1.0])
+
+
+class BatchedGameEngine:
+    """
+    N independent bouts stored as struct-of-arrays and advanced together.
+
+    Mirrors GameEngine.process_tick exactly (including its quirks, e.g. the
+    distance is not refreshed by a freeze-frame reset or by reset()).
+    Per-fencer arrays have shape (N, 2), per-bout arrays shape (N,).
+    """
+
+    def __init__(self, num_bouts: int, config: GameConfig = GameConfig()):
+        self.num_bouts = num_bouts
+        self.config = config
+
+        fencer_defaults = Fencer.model_fields
+        self.move_speed = fencer_defaults["move_speed"].default
+        self.lunge_speed = fencer_defaults["lunge_speed"].default
+        self.reach = fencer_defaults["reach"].default
+
+        n = num_bouts
+        self.position = np.empty((n, 2), dtype=np.float64)
+        self.state = np.zeros((n, 2), dtype=np.int8)
+        self.state_timer = np.zeros((n, 2), dtype=np.int32)
+        self.last_action = np.zeros((n, 2), dtype=np.int8)
+        self.score = np.zeros((n, 2), dtype=np.int32)
+
+        self.tick_count = np.zeros(n, dtype=np.int64)
+        self.distance = np.zeros(n, dtype=np.float64)
+        self.game_over = np.zeros(n, dtype=bool)
+        self.winner = np.full(n, NO_WINNER, dtype=np.int8)
+        self.last_event = np.zeros(n, dtype=np.int8)
+        self.reset_timer = np.zeros(n, dtype=np.int32)
+
+        self.position[:] = START_POSITIONS
+        self.distance[:] = abs(START_POSITIONS[0] - START_POSITIONS[1])
+
+    def step(self, actions: np.ndarray, mask: np.ndarray = None):
+        """
+        Process one frame of every bout.
+        actions: int array of shape (N, 2) holding action codes (models.ACTION_CODES)
+        mask: optional boolean array of shape (N,); bouts outside the mask are left untouched
+        """
+        actions = np.asarray(actions)
+        state = self.state
+        timer = self.state_timer
+        pos = self.position
+
+        live = ~self.game_over
+        if mask is not None:
+            live &= mask
+
+        # Freeze/Reset timer: frozen bouts only count down
+        frozen = live & (self.reset_timer > 0)
+        self.reset_timer -= frozen
+        thawed = frozen & (self.reset_timer == 0)
+        if thawed.any():
+            self.last_event[thawed] = EVENT_NONE
+            self._reset_positions(thawed)
+
+        active = live & ~frozen
+        if not active.any():
+            return
+        active2 = active[:, None]
+
+        self.tick_count += active
+        self.last_event[active] = EVENT_NONE
+
+        # 1. Update fencer states (only NEUTRAL fencers accept input)
+        accepting = active2 & (state == NEUTRAL)
+        np.copyto(self.last_action, actions, where=accepting, casting="unsafe")
+        new_state = _ACTION_STATE[actions]
+        starts = accepting & (new_state >= 0)
+        np.copyto(state, new_state, where=starts)
+        np.copyto(timer, _ACTION_TIMER[actions], where=starts)
+
+        # 2. Movement
+        move = np.where(state == MOVING_FORWARD, self.move_speed,
+               np.where(state == MOVING_BACKWARD, -self.move_speed,
+               np.where((state == ATTACK_ACTIVE) & (self.last_action == LUNGE), self.lunge_speed, 0.0)))
+        move *= _FORWARD
+        np.add(pos, move, out=pos, where=active2)
+
+        # 3. Boundaries
+        np.copyto(pos, np.clip(pos, 0.0, self.config.arena_length), where=active2)
+        p1 = pos[:, 0]
+        p2 = pos[:, 1]
+        crowded = active & (p2 - p1 < 0.5)
+        if crowded.any():
+            mid = (p1[crowded] + p2[crowded]) / 2
+            p1[crowded] = mid - 0.25
+            p2[crowded] = mid + 0.25
+
+        # 4. Hit detection (Startup -> Active transition first)
+        activating = active2 & (state == ATTACK_STARTUP) & (timer == 0)
+        np.copyto(state, ATTACK_ACTIVE, where=activating)
+        np.copyto(timer,
+                  np.where(self.last_action == THRUST, THRUST_ACTIVE_FRAMES, LUNGE_ACTIVE_FRAMES),
+                  where=activating)
+
+        dist = p2 - p1
+        in_reach = active & (dist <= self.reach)
+        f1_hit = in_reach & (state[:, 0] == ATTACK_ACTIVE)
+        f2_hit = in_reach & (state[:, 1] == ATTACK_ACTIVE)
+        any_hit = f1_hit | f2_hit
+        if any_hit.any():
+            self.score[:, 0] += f1_hit
+            self.score[:, 1] += f2_hit
+            event = np.where(f1_hit & f2_hit, EVENT_DOUBLE_TOUCH,
+                    np.where(f1_hit, EVENT_P1_POINT, EVENT_P2_POINT))
+            self.last_event[any_hit] = event[any_hit]
+            self.reset_timer[any_hit] = FREEZE_FRAMES
+
+        # 5. Timer updates
+        timer -= active2 & (timer > 0)
+        done = active2 & (timer == 0) & (state != NEUTRAL) & (state != HIT) & (state != ATTACK_STARTUP)
+        state[done] = NEUTRAL
+
+        np.copyto(self.distance, np.abs(p1 - p2), where=active)
+        self._check_win_condition(active)
+
+    def _reset_positions(self, mask: np.ndarray):
+        self.position[mask] = START_POSITIONS
+        self.state[mask] = NEUTRAL
+        self.state_timer[mask] = 0
+        self.last_action[mask] = IDLE
+
+    def _check_win_condition(self, mask: np.ndarray):
+        s1 = self.score[:, 0]
+        s2 = self.score[:, 1]
+        over = mask & ((s1 >= self.config.max_score) | (s2 >= self.config.max_score))
+        if over.any():
+            self.game_over |= over
+            winner = np.where(s1 > s2, 0, np.where(s2 > s1, 1, -1))
+            self.winner[over] = winner[over]
+
+    def reset(self, mask=None):
+        """Same as GameEngine.reset_game, for all bouts or the bouts selected by a boolean mask."""
+        if mask is None:
+            mask = np.ones(self.num_bouts, dtype=bool)
+        self._reset_positions(mask)
+        self.score[mask] = 0
+        self.game_over[mask] = False
+        self.winner[mask] = NO_WINNER
+        self.last_event[mask] = EVENT_GAME_RESTART
+        self.tick_count[mask] = 0
+        self.reset_timer[mask] = 0
+
+    def get_state(self, index: int) -> GameState:
+        """Build the Pydantic GameState of one bout (for the API / debugging, not the hot path)."""
+        winner = int(self.winner[index])
+        state = GameState(
+            tick_count=int(self.tick_count[index]),
+            fencers=[
+                Fencer(
+                    id=i,
+                    score=int(self.score[index, i]),
+                    position=float(self.position[index, i]),
+                    state=FENCER_STATES[self.state[index, i]],
+                    state_timer=int(self.state_timer[index, i]),
+                    last_action=ACTION_TYPES[self.last_action[index, i]],
+                    move_speed=self.move_speed,
+                    lunge_speed=self.lunge_speed,
+                    reach=self.reach,
+                )
+                for i in range(2)
+            ],
+            distance=float(self.distance[index]),
+            game_over=bool(self.game_over[index]),
+            winner=None if winner == NO_WINNER else winner,
+            last_event=EVENTS[self.last_event[index]],
+        )
+        return state
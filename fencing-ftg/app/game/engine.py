@@ -1,129 +1,187 @@
-from .models import Fencer, GameState, ActionType, FencerState, GameConfig
-import random
+from time import perf_counter
+from typing import Optional
+from .models import GameStateView, ActionType, FencerState, GameConfig, FencerCore, GameCore, ACTION_CODES, STATE_CODES
+from .profiling import PhaseProfile
+
+# State / action codes used on the hot path (see models.STATE_CODES / models.ACTION_CODES)
+NEUTRAL = STATE_CODES[FencerState.NEUTRAL]
+MOVING_FORWARD = STATE_CODES[FencerState.MOVING_FORWARD]
+MOVING_BACKWARD = STATE_CODES[FencerState.MOVING_BACKWARD]
+ATTACK_STARTUP = STATE_CODES[FencerState.ATTACK_STARTUP]
+ATTACK_ACTIVE = STATE_CODES[FencerState.ATTACK_ACTIVE]
+HIT = STATE_CODES[FencerState.HIT]
+
+IDLE = ACTION_CODES[ActionType.IDLE]
+THRUST = ACTION_CODES[ActionType.THRUST]
+LUNGE = ACTION_CODES[ActionType.LUNGE]
+
+# Action code -> (state, timer) it puts a NEUTRAL fencer in; None = no state change (IDLE, BEAT)
+_ACTION_START = [None] * len(ACTION_CODES)
+_ACTION_START[ACTION_CODES[ActionType.STEP_FORWARD]] = (MOVING_FORWARD, 10) # Example duration
+_ACTION_START[ACTION_CODES[ActionType.STEP_BACK]] = (MOVING_BACKWARD, 10)
+_ACTION_START[ACTION_CODES[ActionType.THRUST]] = (ATTACK_STARTUP, 5) # Startup frames
+_ACTION_START[ACTION_CODES[ActionType.LUNGE]] = (ATTACK_STARTUP, 8) # Longer startup for lunge
+
+# States that return to NEUTRAL when their timer runs out
+_TIMED_STATES = frozenset(STATE_CODES.values()) - {NEUTRAL, HIT, ATTACK_STARTUP}
 
 class GameEngine:
+    """
+    The bout lives in `core` (GameCore / FencerCore: __slots__ objects with integer-coded
+    states and actions), which is what the engine, the AIs and the wire encoder read.
+    `state` is the Pydantic GameState view of it, built on demand for the API.
+    """
+
     def __init__(self, config: GameConfig = GameConfig()):
         self.config = config
-        self.state = GameState(
-            fencers=[
-                Fencer(id=0, position=4.0), # Left fencer
-                Fencer(id=1, position=10.0) # Right fencer
-            ]
-        )
-        self.state.update_distance()
+        self.core = GameCore([
+            FencerCore(id=0, position=4.0), # Left fencer
+            FencerCore(id=1, position=10.0) # Right fencer
+        ])
+        self.core.update_distance()
+        self.reset_timer = 0
+        self._state: Optional[GameStateView] = None
+        self.profile: Optional[PhaseProfile] = None  # set while profiling (enable_profiling)
+
+    @property
+    def state(self) -> GameStateView:
+        """
+        Pydantic snapshot of the bout, rebuilt after every change. It is frozen:
+        assigning to it raises, since nothing would be written back to `core`.
+        """
+        if self._state is None:
+            self._state = self.core.to_model()
+        return self._state
 
-    
     def process_tick(self, actions: dict[int, ActionType]):
         """
         Process one frame of the game.
         actions: dict mapping fencer_id to ActionType
         """
-        if self.state.game_over:
+        core = self.core
+        if core.game_over:
             return
-
-        # Handle Freeze/Reset Timer
-        if hasattr(self, 'reset_timer') and self.reset_timer > 0:
-            self.reset_timer -= 1
-            if self.reset_timer == 0:
-                self.state.last_event = None # Clear message
-                self._reset_positions()
+        if not self._start_tick():
             return # Skip update during freeze
 
-        self.state.tick_count += 1
-        # self.state.last_event = None # Don't clear immediately if we want it to persist?
-        # Actually logic above clears it after freeze.
-        # But if no freeze (normal tick), we usually clear it? 
-        # Let's leave last_event as None usually.
-        if not hasattr(self, 'reset_timer') or self.reset_timer <= 0:
-             self.state.last_event = None # Clear previous frame's event if not frozen
-
+        f1, f2 = core.fencers
         # 1. Update Fencer States & Timers
-        for fencer in self.state.fencers:
-            self._update_fencer_state(fencer, actions.get(fencer.id, ActionType.IDLE))
-
+        self._update_fencer_state(f1, ACTION_CODES[actions.get(0, ActionType.IDLE)])
+        self._update_fencer_state(f2, ACTION_CODES[actions.get(1, ActionType.IDLE)])
         # 2. Movement Logic
-        self._handle_movement()
-
+        self._handle_movement(f1, f2)
         # 3. Collision/Boundary Check
-        self._enforce_boundaries()
-
+        self._enforce_boundaries(f1, f2)
         # 4. Hit Detection
-        self._check_hits()
-
+        self._check_hits(f1, f2)
         # 5. Timer Updates
-        for fencer in self.state.fencers:
-            if fencer.state_timer > 0:
-                fencer.state_timer -= 1
-            if fencer.state_timer == 0 and fencer.state not in [FencerState.NEUTRAL, FencerState.HIT, FencerState.ATTACK_STARTUP]:
-                # Return to neutral after action completes
-                fencer.state = FencerState.NEUTRAL
-        
-        self.state.update_distance()
-        self._check_win_condition()
+        self._finish_tick(f1, f2)
+
+    def enable_profiling(self, profile: Optional[PhaseProfile] = None) -> PhaseProfile:
+        """
+        Collect per-phase times into profile (a new one by default) from the callers
+        that tick through process_tick_profiled() while self.profile is set (GameService
+        does). process_tick itself never checks, so unprofiled engines pay nothing.
+        """
+        self.profile = profile if profile is not None else (self.profile or PhaseProfile())
+        return self.profile
+
+    def disable_profiling(self):
+        self.profile = None
 
-    def _update_fencer_state(self, fencer: Fencer, action: ActionType):
+    def process_tick_profiled(self, actions: dict[int, ActionType]):
+        """process_tick, timing each phase into self.profile (see enable_profiling)."""
+        # Calls the same phase methods as process_tick, with a clock read between them
+        profile = self.profile
+        tick_start = perf_counter()
+        profile.ticks += 1
+        core = self.core
+        if core.game_over:
+            profile.game_over_ticks += 1
+            profile.tick_total += perf_counter() - tick_start
+            return
+        if not self._start_tick():
+            profile.frozen_ticks += 1
+            profile.tick_total += perf_counter() - tick_start
+            return
+        totals, calls = profile.totals, profile.calls
+
+        t0 = perf_counter()
+        f1, f2 = core.fencers
+        self._update_fencer_state(f1, ACTION_CODES[actions.get(0, ActionType.IDLE)])
+        self._update_fencer_state(f2, ACTION_CODES[actions.get(1, ActionType.IDLE)])
+        t1 = perf_counter()
+        self._handle_movement(f1, f2)
+        t2 = perf_counter()
+        self._enforce_boundaries(f1, f2)
+        t3 = perf_counter()
+        self._check_hits(f1, f2)
+        t4 = perf_counter()
+        self._finish_tick(f1, f2)
+        t5 = perf_counter()
+
+        totals[0] += t1 - t0
+        totals[1] += t2 - t1
+        totals[2] += t3 - t2
+        totals[3] += t4 - t3
+        totals[4] += t5 - t4
+        calls[0] += 2  # once per fencer
+        calls[1] += 1
+        calls[2] += 1
+        calls[3] += 1
+        calls[4] += 1
+        profile.tick_total += t5 - tick_start
+
+    def _start_tick(self) -> bool:
+        """Start a frame of a bout that is not over; False while frozen after a touch (no phases run)."""
+        core = self.core
+        self._state = None
+
+        # Handle Freeze/Reset Timer
+        if self.reset_timer > 0:
+            self.reset_timer -= 1
+            if self.reset_timer == 0:
+                core.last_event = None # Clear message
+                self._reset_positions()
+            return False
+
+        core.tick_count += 1
+        core.last_event = None # Clear previous frame's event (not frozen here)
+        return True
+
+    def _update_fencer_state(self, fencer: FencerCore, action: int):
         # Only allow actions if in NEUTRAL state
-        if fencer.state != FencerState.NEUTRAL:
+        if fencer.state != NEUTRAL:
             return
-            
+
         fencer.last_action = action
-        
-        if action == ActionType.STEP_FORWARD:
-            fencer.state = FencerState.MOVING_FORWARD
-            fencer.state_timer = 10 # Example duration
-        elif action == ActionType.STEP_BACK:
-            fencer.state = FencerState.MOVING_BACKWARD
-            fencer.state_timer = 10
-        elif action == ActionType.THRUST:
-            fencer.state = FencerState.ATTACK_STARTUP
-            fencer.state_timer = 5 # Startup frames
-        elif action == ActionType.LUNGE:
-            fencer.state = FencerState.ATTACK_STARTUP
-            fencer.state_timer = 8 # Longer startup for lunge
-            
-        # Startup transitions automatically handled in _check_hits or next tick if timer logic used for phases
-        # Simplifying: Input directly sets state with timer.
-        # For Attack Startup -> Active, we verify timer in main loop.
-        
-        # Improvement: Handle multi-phase actions (Startup -> Active -> Recovery)
-        if fencer.state == FencerState.ATTACK_STARTUP and fencer.state_timer == 0:
-             # This block might need to be in the main loop decrement section to transition
-             pass
-
-    def _handle_movement(self):
-        # Calculate proposed positions
-        f1 = self.state.fencers[0]
-        f2 = self.state.fencers[1]
-        
-        move_dist_map = {
-            FencerState.MOVING_FORWARD: 0.05,
-            FencerState.MOVING_BACKWARD: -0.05,
-            FencerState.ATTACK_ACTIVE: 0.1, # Lunge moves forward
-        }
+        start = _ACTION_START[action]
+        if start is not None:
+            # Input directly sets state with timer; Startup -> Active happens in _check_hits
+            fencer.state, fencer.state_timer = start
 
+    def _handle_movement(self, f1: FencerCore, f2: FencerCore):
         # Apply movement for P1 (moves positive)
         p1_move = 0.0
-        if f1.state == FencerState.MOVING_FORWARD: p1_move = f1.move_speed
-        elif f1.state == FencerState.MOVING_BACKWARD: p1_move = -f1.move_speed
-        elif f1.last_action == ActionType.LUNGE and f1.state == FencerState.ATTACK_ACTIVE: p1_move = f1.lunge_speed
-        
+        if f1.state == MOVING_FORWARD: p1_move = f1.move_speed
+        elif f1.state == MOVING_BACKWARD: p1_move = -f1.move_speed
+        elif f1.last_action == LUNGE and f1.state == ATTACK_ACTIVE: p1_move = f1.lunge_speed
+
         # Apply movement for P2 (moves negative, strictly facing left)
         p2_move = 0.0
-        if f2.state == FencerState.MOVING_FORWARD: p2_move = -f2.move_speed # Forward for P2 is decreasing x
-        elif f2.state == FencerState.MOVING_BACKWARD: p2_move = f2.move_speed
-        elif f2.last_action == ActionType.LUNGE and f2.state == FencerState.ATTACK_ACTIVE: p2_move = -f2.lunge_speed
+        if f2.state == MOVING_FORWARD: p2_move = -f2.move_speed # Forward for P2 is decreasing x
+        elif f2.state == MOVING_BACKWARD: p2_move = f2.move_speed
+        elif f2.last_action == LUNGE and f2.state == ATTACK_ACTIVE: p2_move = -f2.lunge_speed
 
         f1.position += p1_move
         f2.position += p2_move
 
-    def _enforce_boundaries(self):
-        f1 = self.state.fencers[0]
-        f2 = self.state.fencers[1]
-        
+    def _enforce_boundaries(self, f1: FencerCore, f2: FencerCore):
         # Arena limits
-        f1.position = max(0.0, min(f1.position, self.config.arena_length))
-        f2.position = max(0.0, min(f2.position, self.config.arena_length))
-        
+        arena_length = self.config.arena_length
+        f1.position = max(0.0, min(f1.position, arena_length))
+        f2.position = max(0.0, min(f2.position, arena_length))
+
         # Player collision (cannot pass each other)
         # Min distance 0.5m
         if f2.position - f1.position < 0.5:
@@ -131,83 +189,92 @@ class GameEngine:
             f1.position = mid - 0.25
             f2.position = mid + 0.25
 
-    def _check_hits(self):
+    def _check_hits(self, f1: FencerCore, f2: FencerCore):
         # Check simple Transition Startup -> Active
-        for fencer in self.state.fencers:
-            if fencer.state == FencerState.ATTACK_STARTUP and fencer.state_timer == 0:
-                fencer.state = FencerState.ATTACK_ACTIVE
+        for fencer in (f1, f2):
+            if fencer.state == ATTACK_STARTUP and fencer.state_timer == 0:
+                fencer.state = ATTACK_ACTIVE
                 # Increase active frames to make hitting easier (was 5/10)
-                fencer.state_timer = 15 if fencer.last_action == ActionType.THRUST else 25
+                fencer.state_timer = 15 if fencer.last_action == THRUST else 25
 
-        f1 = self.state.fencers[0]
-        f2 = self.state.fencers[1]
         dist = f2.position - f1.position
-        
+
         # Hit Logic: if attacking and in range
-        f1_hit = False
-        f2_hit = False
-        
-        if f1.state == FencerState.ATTACK_ACTIVE:
-            if dist <= f1.reach: # SImple reach check
-                f1_hit = True
-        
-        if f2.state == FencerState.ATTACK_ACTIVE:
-            if dist <= f2.reach:
-                f2_hit = True
-                
+        f1_hit = f1.state == ATTACK_ACTIVE and dist <= f1.reach
+        f2_hit = f2.state == ATTACK_ACTIVE and dist <= f2.reach
+
         if f1_hit and f2_hit:
             # Double touch
             f1.score += 1
             f2.score += 1
-            self.state.last_event = "DOUBLE_TOUCH"
+            self.core.last_event = "DOUBLE_TOUCH"
             self._start_freeze_frame()
         elif f1_hit:
             f1.score += 1
-            self.state.last_event = "P1_POINT"
+            self.core.last_event = "P1_POINT"
             self._start_freeze_frame()
         elif f2_hit:
             f2.score += 1
-            self.state.last_event = "P2_POINT"
+            self.core.last_event = "P2_POINT"
             self._start_freeze_frame()
-            
+
+    def _finish_tick(self, f1: FencerCore, f2: FencerCore):
+        for fencer in (f1, f2):
+            if fencer.state_timer > 0:
+                fencer.state_timer -= 1
+            if fencer.state_timer == 0 and fencer.state in _TIMED_STATES:
+                # Return to neutral after action completes
+                fencer.state = NEUTRAL
+
+        self.core.distance = abs(f1.position - f2.position)
+        self._check_win_condition(f1, f2)
+
     def _start_freeze_frame(self):
-        # We need a way to pause updates for a bit to show the hit
-        # Simple hack: Set a global "freeze" timer on the state?
-        # Or just abuse state_timer on fencers to keep them showing "HIT"?
-        # Let's use a convention: If last_event is set, we might delay reset?
-        # But process_tick clears last_event.
-        
-        # Let's add a simple counter to GameEngine, not GameState to keep model simple?
-        # Or just rely on client animation? 
-        # Better: Reset positions AFTER a delay.
-        # But process_tick runs every frame.
-        # We need a 'reset_timer' in GameEngine.
+        # Pause updates for a bit to show the hit, then reset positions (see process_tick)
         self.reset_timer = 60 # 1 second freeze
 
     def _reset_positions(self):
-        self.state.fencers[0].position = 4.0
-        self.state.fencers[1].position = 10.0
-        for f in self.state.fencers:
-            f.state = FencerState.NEUTRAL
+        f1, f2 = self.core.fencers
+        f1.position = 4.0
+        f2.position = 10.0
+        for f in self.core.fencers:
+            f.state = NEUTRAL
             f.state_timer = 0
-            f.last_action = ActionType.IDLE
+            f.last_action = IDLE
 
-    def _check_win_condition(self):
-        f1 = self.state.fencers[0]
-        f2 = self.state.fencers[1]
+    def _check_win_condition(self, f1: FencerCore, f2: FencerCore):
         if f1.score >= self.config.max_score or f2.score >= self.config.max_score:
-            self.state.game_over = True
-            if f1.score > f2.score: self.state.winner = 0
-            elif f2.score > f1.score: self.state.winner = 1
-            else: self.state.winner = -1 # Tie (Double touch win?)
+            self.core.game_over = True
+            if f1.score > f2.score: self.core.winner = 0
+            elif f2.score > f1.score: self.core.winner = 1
+            else: self.core.winner = -1 # Tie (Double touch win?)
+
+    def snapshot(self) -> tuple:
+        """Compact copy of the mutable bout state (plain values, no Pydantic) for rollback."""
+        c = self.core
+        f1, f2 = c.fencers
+        return (
+            c.tick_count, c.distance, c.game_over, c.winner, c.last_event, self.reset_timer,
+            f1.position, f1.state, f1.state_timer, f1.last_action, f1.score,
+            f2.position, f2.state, f2.state_timer, f2.last_action, f2.score,
+        )
+
+    def restore(self, snapshot: tuple):
+        """Put the bout back into the state captured by snapshot()."""
+        c = self.core
+        f1, f2 = c.fencers
+        (c.tick_count, c.distance, c.game_over, c.winner, c.last_event, self.reset_timer,
+         f1.position, f1.state, f1.state_timer, f1.last_action, f1.score,
+         f2.position, f2.state, f2.state_timer, f2.last_action, f2.score) = snapshot
+        self._state = None
 
     def reset_game(self):
         self._reset_positions()
-        for f in self.state.fencers:
+        for f in self.core.fencers:
             f.score = 0
-        self.state.game_over = False
-        self.state.winner = None
-        self.state.last_event = "GAME_RESTART"
-        self.state.tick_count = 0
-        if hasattr(self, 'reset_timer'):
-            self.reset_timer = 0
+        self.core.game_over = False
+        self.core.winner = None
+        self.core.last_event = "GAME_RESTART"
+        self.core.tick_count = 0
+        self.reset_timer = 0
+        self._state = None
@@ -1,13 +1,39 @@
 import gymnasium as gym
 from gymnasium import spaces
+from gymnasium.utils import seeding
+from gymnasium.vector import VectorEnv, AutoresetMode
+from gymnasium.vector.utils import batch_space
 import numpy as np
 from .engine import GameEngine
-from .models import ActionType, FencerState, GameMode
+from .batched_engine import BatchedGameEngine, EVENT_P1_POINT, EVENT_P2_POINT, EVENT_DOUBLE_TOUCH
+from .models import ActionType, FencerState, GameMode, ACTION_CODES, STATE_CODES, ACT_MAP
+
+# Scripted opponent (P2)
+OPPONENT_CLOSE_IN_DISTANCE = 2.5
+OPPONENT_BACK_OFF_DISTANCE = 1.0
+OPPONENT_THRUST_CHANCE = 0.05
+
+NEUTRAL = STATE_CODES[FencerState.NEUTRAL]
+TOUCH_EVENTS = ("P1_POINT", "P2_POINT", "DOUBLE_TOUCH")
 
 class FencingEnv(gym.Env):
+    """
+    Agent = Player 1 against the scripted opponent, one decision per step().
+
+    frame_skip: repeat the action for up to k ticks per step (reward summed),
+    ending early on a touch or game over.
+    skip_locked: then keep ticking (agent IDLE) while the agent's input would be
+    ignored anyway: its fencer is not NEUTRAL, or the bout is frozen after a touch.
+    The opponent still acts every tick, so a step equals the same ticks run one by one.
+    info["ticks"] is the number of ticks the step ran.
+    """
     metadata = {"render_modes": ["human"], "render_fps": 60}
 
-    def __init__(self, render_mode=None):
+    def __init__(self, render_mode=None, frame_skip: int = 1, skip_locked: bool = False):
+        if frame_skip < 1:
+            raise ValueError("frame_skip must be >= 1")
+        self.frame_skip = frame_skip
+        self.skip_locked = skip_locked
         self.engine = GameEngine()
         # Set to P2 mode just in case, though for Gym usually we control P1?
         # Let's assume the Agent controls Player 1 (Left). 
@@ -25,18 +51,10 @@ class FencingEnv(gym.Env):
             dtype=np.float32
         )
         
-        self.state_map = {
-            FencerState.NEUTRAL: 0,
-            FencerState.MOVING_FORWARD: 1,
-            FencerState.MOVING_BACKWARD: 2,
-            FencerState.ATTACK_STARTUP: 3,
-            FencerState.ATTACK_ACTIVE: 4,
-            FencerState.RECOVERY: 5,
-            FencerState.HIT: 6
-        }
+        self.state_map = STATE_CODES
         
     def _get_obs(self):
-        eng = self.engine.state
+        eng = self.engine.core
         p1 = eng.fencers[0]
         p2 = eng.fencers[1]
         
@@ -44,8 +62,8 @@ class FencingEnv(gym.Env):
             eng.distance,
             p1.position,
             p2.position,
-            self.state_map.get(p1.state, 0),
-            self.state_map.get(p2.state, 0),
+            p1.state,  # state codes (models.STATE_CODES)
+            p2.state,
             p1.score,
             p2.score
         ], dtype=np.float32)
@@ -59,57 +77,218 @@ class FencingEnv(gym.Env):
         return self._get_obs(), {}
 
     def step(self, action):
-        # Map Discrete action to ActionType
-        act_map = {
-            0: ActionType.IDLE,
-            1: ActionType.STEP_FORWARD,
-            2: ActionType.STEP_BACK,
-            3: ActionType.THRUST,
-            4: ActionType.LUNGE
-        }
-        
-
-        
         # Action might be a numpy array (0-d), cast to int
         if isinstance(action, np.ndarray):
             action = int(action)
             
-        p1_action = act_map.get(action, ActionType.IDLE)
-        
+        p1_action = ACT_MAP.get(action, ActionType.IDLE)
+        engine = self.engine
+        core = engine.core
+
+        reward = 0.0
+        ticks = 0
+        for _ in range(self.frame_skip):
+            frozen = engine.reset_timer > 0
+            reward += self._tick(p1_action)
+            ticks += 1
+            if core.game_over or (not frozen and core.last_event in TOUCH_EVENTS):
+                break
+        if self.skip_locked:
+            p1 = core.fencers[0]
+            while not core.game_over and (engine.reset_timer > 0 or p1.state != NEUTRAL):
+                reward += self._tick(ActionType.IDLE)
+                ticks += 1
+
+        return self._get_obs(), reward, core.game_over, False, {"ticks": ticks}
+
+    def _tick(self, p1_action: ActionType) -> float:
+        """Run one engine tick against the scripted opponent; returns its reward."""
         # Simple Opponent AI (Random walk + attack)
         # In a real training loop, you might want a smarter opponent or self-play.
         # Here we do a very dumb random opponent.
+        # One roll per tick from the env's own (seeded) RNG, so episodes are reproducible
+        # and match FencingVectorEnv sub-envs seeded the same way.
+        roll = self.np_random.random()
+        core = self.engine.core
         p2_action = ActionType.IDLE
-        if self.engine.state.distance > 2.5:
+        if core.distance > OPPONENT_CLOSE_IN_DISTANCE:
              p2_action = ActionType.STEP_FORWARD # P2 forward moves left (closer)
-        elif self.engine.state.distance < 1.0:
+        elif core.distance < OPPONENT_BACK_OFF_DISTANCE:
              p2_action = ActionType.STEP_BACK
         else:
-             if np.random.rand() < 0.05: p2_action = ActionType.THRUST
+             if roll < OPPONENT_THRUST_CHANCE: p2_action = ActionType.THRUST
         
         actions = {0: p1_action, 1: p2_action}
         
         self.engine.process_tick(actions)
         
-        obs = self._get_obs()
-        
         # Reward Calculation
         reward = -0.001 # Time penalty
-        terminated = False
-        truncated = False
         
-        if self.engine.state.last_event == "P1_POINT":
+        if core.last_event == "P1_POINT":
             reward += 1.0
-        elif self.engine.state.last_event == "P2_POINT":
+        elif core.last_event == "P2_POINT":
             reward -= 1.0
-        elif self.engine.state.last_event == "DOUBLE_TOUCH":
+        elif core.last_event == "DOUBLE_TOUCH":
             reward -= 0.2
             
-        if self.engine.state.game_over:
-            terminated = True
-            if self.engine.state.winner == 0:
+        if core.game_over:
+            if core.winner == 0:
                 reward += 10.0 # Win Bonus
-            elif self.engine.state.winner == 1:
+            elif core.winner == 1:
                 reward -= 10.0 # Loss Penalty
                 
-        return obs, reward, terminated, truncated, {}
+        return reward
+
+
+class FencingVectorEnv(VectorEnv):
+    """
+    num_envs copies of FencingEnv stepped in-process with one BatchedGameEngine call.
+
+    Follows the Gymnasium vector API with next-step autoreset: the step after an
+    episode ends resets that sub-env (its action is ignored, reward 0).
+    Sub-env i seeded with `seed` behaves exactly like FencingEnv reset with `seed + i`
+    (and the same frame_skip / skip_locked: sub-envs that stop early are masked out
+    of the remaining ticks of the step).
+    Observations/rewards/dones are written into preallocated arrays; with copy=False
+    step() returns those buffers directly, so they are overwritten by the next step.
+    """
+    metadata = {"render_modes": [], "render_fps": 60, "autoreset_mode": AutoresetMode.NEXT_STEP}
+
+    # Opponent rolls drawn per sub-env RNG in blocks, to keep generator calls out of step()
+    RNG_BLOCK = 1024
+
+    def __init__(self, num_envs: int, copy: bool = True, frame_skip: int = 1, skip_locked: bool = False):
+        self.num_envs = num_envs
+        self.copy = copy
+        self.engine = BatchedGameEngine(num_envs)
+
+        single = FencingEnv(frame_skip=frame_skip, skip_locked=skip_locked)
+        self.frame_skip = frame_skip
+        self.skip_locked = skip_locked
+        self.single_action_space = single.action_space
+        self.single_observation_space = single.observation_space
+        self.action_space = batch_space(self.single_action_space, num_envs)
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+
+        self._obs = np.zeros((num_envs, 7), dtype=np.float32)
+        self._rewards = np.zeros(num_envs, dtype=np.float64)
+        self._tick_rewards = np.zeros(num_envs, dtype=np.float64)
+        self._terminations = np.zeros(num_envs, dtype=bool)
+        self._truncations = np.zeros(num_envs, dtype=bool)
+        self._autoreset = np.zeros(num_envs, dtype=bool)
+        self._actions = np.zeros((num_envs, 2), dtype=np.int8)
+        self._rows = np.arange(num_envs)
+
+        self._rngs = [None] * num_envs
+        self._rolls = np.zeros((num_envs, self.RNG_BLOCK), dtype=np.float64)
+        self._roll_index = np.zeros(num_envs, dtype=np.intp)
+
+    def _seed(self, index: int, seed):
+        rng, _ = seeding.np_random(seed)
+        self._rngs[index] = rng
+        self._rolls[index] = rng.random(self.RNG_BLOCK)
+        self._roll_index[index] = 0
+
+    def _next_rolls(self, mask: np.ndarray) -> np.ndarray:
+        rolls = self._rolls[self._rows, np.minimum(self._roll_index, self.RNG_BLOCK - 1)]
+        self._roll_index += mask
+        for i in np.flatnonzero(self._roll_index == self.RNG_BLOCK):
+            self._rolls[i] = self._rngs[i].random(self.RNG_BLOCK)
+            self._roll_index[i] = 0
+        return rolls
+
+    def _write_obs(self):
+        obs = self._obs
+        obs[:, 0] = self.engine.distance
+        obs[:, 1:3] = self.engine.position
+        obs[:, 3:5] = self.engine.state
+        obs[:, 5:7] = self.engine.score
+        return obs.copy() if self.copy else obs
+
+    def reset(self, *, seed=None, options=None):
+        mask = np.ones(self.num_envs, dtype=bool)
+        if options is not None and "reset_mask" in options:
+            mask = np.asarray(options["reset_mask"], dtype=bool)
+
+        if isinstance(seed, int):
+            seeds = [seed + i for i in range(self.num_envs)]
+        elif seed is None:
+            seeds = [None] * self.num_envs
+        else:
+            seeds = list(seed)
+        for i in np.flatnonzero(mask):
+            if seeds[i] is not None or self._rngs[i] is None:
+                self._seed(i, seeds[i])
+
+        self.engine.reset(mask)
+        self._autoreset[mask] = False
+        return self._write_obs(), {}
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        engine = self.engine
+
+        # Next-step autoreset of the envs that finished last step
+        resetting = self._autoreset.copy()
+        stepping = ~resetting
+        if resetting.any():
+            engine.reset(resetting)
+
+        # P1: agent action (anything outside the Discrete(5) range is IDLE, like ACT_MAP.get)
+        valid = (actions >= 0) & (actions < len(ACT_MAP))
+        p1_actions = np.where(valid, actions, ACTION_CODES[ActionType.IDLE])
+
+        rewards = self._rewards
+        rewards.fill(0.0)
+        active = stepping.copy()
+        for _ in range(self.frame_skip):
+            frozen = engine.reset_timer > 0
+            self._tick(p1_actions, active)
+            event = engine.last_event
+            touched = ~frozen & ((event == EVENT_P1_POINT) | (event == EVENT_P2_POINT) | (event == EVENT_DOUBLE_TOUCH))
+            active &= ~(engine.game_over | touched)
+            if not active.any():
+                break
+        if self.skip_locked:
+            idle = ACTION_CODES[ActionType.IDLE]
+            while True:
+                locked = stepping & ~engine.game_over & ((engine.reset_timer > 0) | (engine.state[:, 0] != NEUTRAL))
+                if not locked.any():
+                    break
+                self._tick(idle, locked)
+
+        terminated = self._terminations
+        np.copyto(terminated, engine.game_over & stepping)
+        np.copyto(self._autoreset, terminated)
+        obs = self._write_obs()
+        if self.copy:
+            return obs, rewards.copy(), terminated.copy(), self._truncations.copy(), {}
+        return obs, rewards, terminated, self._truncations, {}
+
+    def _tick(self, p1_actions, mask: np.ndarray):
+        """One engine tick of the masked sub-envs against the scripted opponent; adds its reward."""
+        engine = self.engine
+        self._actions[:, 0] = p1_actions
+
+        # P2: scripted opponent, same rules as FencingEnv._tick
+        rolls = self._next_rolls(mask)
+        dist = engine.distance
+        self._actions[:, 1] = np.where(dist > OPPONENT_CLOSE_IN_DISTANCE, ACTION_CODES[ActionType.STEP_FORWARD],
+                              np.where(dist < OPPONENT_BACK_OFF_DISTANCE, ACTION_CODES[ActionType.STEP_BACK],
+                              np.where(rolls < OPPONENT_THRUST_CHANCE, ACTION_CODES[ActionType.THRUST],
+                                       ACTION_CODES[ActionType.IDLE])))
+
+        engine.step(self._actions, mask=mask)
+
+        # Reward Calculation (same terms and order as FencingEnv._tick)
+        event = engine.last_event
+        tick_rewards = self._tick_rewards
+        tick_rewards.fill(-0.001)
+        tick_rewards += np.where(event == EVENT_P1_POINT, 1.0,
+                        np.where(event == EVENT_P2_POINT, -1.0,
+                        np.where(event == EVENT_DOUBLE_TOUCH, -0.2, 0.0)))
+        over = engine.game_over & mask
+        tick_rewards += np.where(over & (engine.winner == 0), 10.0,
+                        np.where(over & (engine.winner == 1), -10.0, 0.0))
+        self._rewards += np.where(mask, tick_rewards, 0.0)
@@ -0,0 +1,97 @@
+import time
+from typing import List, Optional
+import numpy as np
+from .scheduler import CostStats
+from .metrics import REGISTRY, SAMPLING
+
+# One forward pass for every PVE room's decision this tick
+BATCHED_DECISION_SECONDS = REGISTRY.histogram(
+    "ftg_ai_decision_seconds", "AI decision latency (batched: one flush for all rooms; sampled frames)", {"ai": "batched"})
+
+
+class InferenceBroker:
+    """
+    Batches the policy decisions of every PVE room into one forward pass per tick.
+
+    Each tick the scheduler lets rooms submit() their (reaction-delayed) observation,
+    calls flush() once, and rooms then pick their action up with result(ticket)
+    before the engines step. The batch is run in chunks of at most max_batch rows.
+    The first chunk always runs; each further chunk runs only if, at the per-row
+    cost measured so far in this flush, it would finish within latency_budget
+    seconds of the flush start. result() returns None for the rooms of skipped
+    chunks, so they fall back to SimpleAI for that tick. Nothing carries over
+    between flushes, so one slow flush (GC pause, first predict) cannot starve
+    the next ones.
+
+    The model may be None while it is still loading (see set_model()).
+    """
+
+    def __init__(self, model=None, latency_budget: float = 0.004, max_batch: int = 1024):
+        self.model = model
+        self.latency_budget = latency_budget
+        self.max_batch = max_batch
+
+        self._obs: List[np.ndarray] = []
+        self._actions: Optional[np.ndarray] = None
+
+        self.flush_stats = CostStats()
+        self.batch_rows = CostStats()  # reuses CostStats for batch sizes (rows, not seconds)
+        self.decisions = 0
+        self.misses = 0
+
+    def set_model(self, model):
+        # Called from the model loader thread; rooms switch over on their next prepare()
+        self.model = model
+
+    def submit(self, obs: np.ndarray) -> int:
+        """Queue one observation for this tick's batch; returns the ticket for result()."""
+        self._obs.append(obs)
+        return len(self._obs) - 1
+
+    def result(self, ticket: int) -> Optional[int]:
+        """Action index for a ticket from the last flush, or None if it missed the deadline."""
+        if self._actions is None or ticket >= len(self._actions):
+            return None
+        action = self._actions[ticket]
+        return None if action < 0 else int(action)
+
+    def flush(self):
+        """Run this tick's forward pass(es) over every submitted observation."""
+        rows = len(self._obs)
+        if rows == 0 or self.model is None:
+            self._actions = None
+            self._obs = []
+            return
+
+        start = time.perf_counter()
+        deadline = start + self.latency_budget
+        obs = np.stack(self._obs)
+        actions = np.full(rows, -1, dtype=np.int64)
+        for lo in range(0, rows, self.max_batch):
+            hi = min(lo + self.max_batch, rows)
+            now = time.perf_counter()
+            if lo and now + (now - start) / lo * (hi - lo) > deadline:
+                break  # would miss the budget: these rooms use the fallback AI this tick
+            actions[lo:hi], _ = self.model.predict(obs[lo:hi], deterministic=True)
+
+        missed = int(np.count_nonzero(actions < 0))
+        self.decisions += rows - missed
+        self.misses += missed
+        cost = time.perf_counter() - start
+        self.flush_stats.record(cost)
+        if SAMPLING.on:
+            BATCHED_DECISION_SECONDS.observe(cost)
+        self.batch_rows.record(rows)
+        self._actions = actions
+        self._obs = []
+
+    def report(self) -> dict:
+        return {
+            "model": type(self.model).__name__ if self.model is not None else None,
+            "decisions": self.decisions,
+            "misses": self.misses,
+            "latency_budget_us": self.latency_budget * 1e6,
+            "flush": self.flush_stats.report(),
+            "avg_batch": self.batch_rows.total / self.batch_rows.count if self.batch_rows.count else 0.0,
+            "max_batch": self.batch_rows.max,
+        }
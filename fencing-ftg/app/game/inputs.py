@@ -0,0 +1,89 @@
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+from .models import ActionType
+
+
+class PlayerInputs:
+    __slots__ = ("pending", "received", "applied", "dropped", "invalid", "saved", "late_ticks", "max_late")
+
+    def __init__(self):
+        self.pending: Deque[Tuple[ActionType, Optional[int]]] = deque()
+        self.received = 0
+        self.applied = 0
+        self.dropped = 0     # lost: queue overflow
+        self.invalid = 0     # malformed messages
+        self.saved = 0       # inputs that arrived while another was waiting (one input slot lost those)
+        self.late_ticks = 0  # sum over applied inputs of (tick applied - tick stamped)
+        self.max_late = 0
+
+    def report(self) -> dict:
+        return {
+            "received": self.received,
+            "applied": self.applied,
+            "pending": len(self.pending),
+            "dropped": self.dropped,
+            "invalid": self.invalid,
+            "saved": self.saved,
+            "mean_late_ticks": self.late_ticks / self.applied if self.applied else 0.0,
+            "max_late_ticks": self.max_late,
+        }
+
+
+class InputQueue:
+    """
+    Per-player FIFO of (action, stamped tick) between the websocket and the tick loop.
+
+    The tick loop takes at most one input per player per tick (pop), so presses that
+    arrive between two ticks are applied on consecutive ticks instead of overwriting
+    each other: a tap (LUNGE then IDLE) always gets its frame. The stamp is the
+    tick_count the client was looking at; a stamped input is due at that tick or the
+    next free one after the player's previous input, which is never earlier than now
+    without rollback (see GameService.tick for the rollback case).
+
+    At most max_pending inputs wait per player; beyond that the oldest is dropped
+    (counted, like malformed messages, per player in report()).
+    """
+
+    def __init__(self, max_pending: int = 16):
+        self.max_pending = max_pending
+        self.players: Dict[int, PlayerInputs] = {}
+
+    def _player(self, player_id: int) -> PlayerInputs:
+        inputs = self.players.get(player_id)
+        if inputs is None:
+            inputs = self.players[player_id] = PlayerInputs()
+        return inputs
+
+    def push(self, player_id: int, action: ActionType, tick: Optional[int] = None):
+        inputs = self._player(player_id)
+        inputs.received += 1
+        if inputs.pending:
+            inputs.saved += 1
+            if len(inputs.pending) >= self.max_pending:
+                inputs.pending.popleft()
+                inputs.dropped += 1
+        inputs.pending.append((action, tick))
+
+    def pop(self, player_id: int, tick: int) -> Optional[Tuple[ActionType, Optional[int]]]:
+        """The player's next input, to apply on this tick (tick = the engine's tick_count), or None."""
+        inputs = self.players.get(player_id)
+        if inputs is None or not inputs.pending:
+            return None
+        action, stamp = inputs.pending.popleft()
+        inputs.applied += 1
+        if stamp is not None and 0 <= tick - stamp:
+            inputs.late_ticks += tick - stamp
+            inputs.max_late = max(inputs.max_late, tick - stamp)
+        return action, stamp
+
+    def reject(self, player_id: int):
+        """Count a malformed message from the player."""
+        self._player(player_id).invalid += 1
+
+    def clear(self, player_id: Optional[int] = None):
+        for pid, inputs in self.players.items():
+            if player_id is None or pid == player_id:
+                inputs.pending.clear()
+
+    def report(self) -> dict:
+        return {player_id: inputs.report() for player_id, inputs in self.players.items()}
@@ -0,0 +1,153 @@
+import math
+import os
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Upper bounds (seconds) for hot-path timings: a few us (serialization) up to a whole frame and beyond
+LATENCY_BUCKETS = (5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 1.67e-2, 2.5e-2, 5e-2, 0.1)
+
+
+def _format_labels(labels: Dict[str, str], extra: str = "") -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels.items()]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. observe() is a bisect and two additions, so it can sit on
+    the tick path; the cumulative bucket counts Prometheus wants are built at scrape time.
+    """
+    __slots__ = ("labels", "bounds", "counts", "sum")
+
+    def __init__(self, labels: Dict[str, str], buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.labels = labels
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot: above every bound (+Inf only)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def samples(self, name: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(f"{name}_bucket{_format_labels(self.labels, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(self.labels)} {_format_value(self.sum)}")
+        lines.append(f"{name}_count{_format_labels(self.labels)} {cumulative}")
+        return lines
+
+
+class Sampled:
+    """A gauge or counter whose value is read from the server's own state when scraped."""
+    __slots__ = ("labels", "read")
+
+    def __init__(self, labels: Dict[str, str], read: Callable[[], float]):
+        self.labels = labels
+        self.read = read
+
+    def samples(self, name: str) -> List[str]:
+        return [f"{name}{_format_labels(self.labels)} {_format_value(self.read())}"]
+
+
+class Registry:
+    """
+    Metric families by name, rendered in the Prometheus text exposition format (0.0.4).
+
+    Histograms are observed where the code already times things; gauges and
+    counters are callbacks over existing state (rooms, clients, CostStats), so
+    they cost nothing until /metrics is scraped.
+    """
+
+    def __init__(self):
+        self._families: Dict[str, Tuple[str, str, list]] = {}  # name -> (type, help, children)
+
+    def _family(self, name: str, kind: str, help: str) -> list:
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = (kind, help, [])
+        elif family[0] != kind:
+            raise ValueError(f"metric {name} is already registered as a {family[0]}")
+        return family[2]
+
+    def histogram(self, name: str, help: str, labels: Optional[Dict[str, str]] = None,
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        """The histogram for (name, labels), created on first use."""
+        labels = labels or {}
+        children = self._family(name, "histogram", help)
+        for child in children:
+            if child.labels == labels:
+                return child
+        child = Histogram(labels, buckets)
+        children.append(child)
+        return child
+
+    def gauge(self, name: str, help: str, read: Callable[[], float], labels: Optional[Dict[str, str]] = None):
+        self._sampled(name, "gauge", help, read, labels)
+
+    def counter(self, name: str, help: str, read: Callable[[], float], labels: Optional[Dict[str, str]] = None):
+        """read() returns a monotonically increasing total; name should end in _total."""
+        self._sampled(name, "counter", help, read, labels)
+
+    def _sampled(self, name, kind, help, read, labels):
+        labels = labels or {}
+        children = self._family(name, kind, help)
+        children[:] = [child for child in children if child.labels != labels]  # re-registering replaces
+        children.append(Sampled(labels, read))
+
+    def render(self) -> str:
+        lines = []
+        for name, (kind, help, children) in self._families.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for child in children:
+                try:
+                    lines.extend(child.samples(name))
+                except Exception as e:
+                    lines.append(f"# {name}{_format_labels(child.labels)} unavailable: {e!r}")
+        return "\n".join(lines) + "\n"
+
+
+class Sampling:
+    """
+    Which frames the hot-path histograms time. TickScheduler calls next_frame() once
+    per frame; timing sites check `on` (a few ns) and only take their perf_counter()
+    pair and observe() on one frame in `every` (0: never). Histogram counts are
+    then sampled frames, not all frames; rates come from the counters.
+    """
+    __slots__ = ("every", "on", "_frame")
+
+    def __init__(self, every: int):
+        self.every = every
+        self.on = False
+        self._frame = 0
+
+    def next_frame(self) -> bool:
+        self._frame += 1
+        self.on = self.every > 0 and self._frame % self.every == 0
+        return self.on
+
+
+# Process-wide registry, served by GET /metrics
+REGISTRY = Registry()
+# FTG_METRICS_SAMPLE: time one frame in N for the histograms (1 = every frame, 0 = off)
+SAMPLING = Sampling(int(os.environ.get("FTG_METRICS_SAMPLE", "64")))
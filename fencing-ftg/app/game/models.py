@@ -1,6 +1,6 @@
 from enum import Enum
 from pydantic import BaseModel, ConfigDict
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 
 class ActionType(Enum):
     IDLE = "IDLE"
@@ -19,6 +19,23 @@ class FencerState(Enum):
     RECOVERY = "RECOVERY"
     HIT = "HIT"
 
+# Integer codes for the array-backed engine and the Gym observation.
+# The order follows the enum declaration order, so code 0 is always IDLE/NEUTRAL.
+ACTION_TYPES = tuple(ActionType)
+FENCER_STATES = tuple(FencerState)
+ACTION_CODES = {action: code for code, action in enumerate(ACTION_TYPES)}
+STATE_CODES = {state: code for code, state in enumerate(FENCER_STATES)}
+
+# Discrete(5) action index of the policy -> ActionType, shared by training (FencingEnv)
+# and serving (TrainedAI); indices match ACTION_CODES. BEAT is not in the action space.
+ACT_MAP = {
+    0: ActionType.IDLE,
+    1: ActionType.STEP_FORWARD,
+    2: ActionType.STEP_BACK,
+    3: ActionType.THRUST,
+    4: ActionType.LUNGE
+}
+
 class GameMode(Enum):
     PVP = "PVP"
     PVE = "PVE"
@@ -59,3 +76,66 @@ class GameState(BaseModel):
         if len(self.fencers) == 2:
             self.distance = abs(self.fencers[0].position - self.fencers[1].position)
 
+
+# What GameEngine.state returns: a snapshot of the bout built from GameEngine.core.
+# Frozen, so code still writing to engine.state.* fails loudly instead of being ignored.
+class FencerView(Fencer):
+    model_config = ConfigDict(frozen=True)
+
+class GameStateView(GameState):
+    model_config = ConfigDict(frozen=True)
+    fencers: Tuple[FencerView, ...]
+
+
+# Compact mirrors of Fencer / GameState for the engine's hot path: plain __slots__ objects,
+# with state / last_action held as integer codes (STATE_CODES / ACTION_CODES).
+# Converted to the Pydantic models only at the API boundary (GameEngine.state).
+class FencerCore:
+    __slots__ = ("id", "score", "position", "state", "state_timer", "last_action",
+                 "move_speed", "lunge_speed", "reach")
+
+    def __init__(self, id: int, position: float):
+        defaults = Fencer.model_fields
+        self.id = id
+        self.score = 0
+        self.position = position
+        self.state = 0        # FencerState code
+        self.state_timer = 0
+        self.last_action = 0  # ActionType code
+        self.move_speed = defaults["move_speed"].default
+        self.lunge_speed = defaults["lunge_speed"].default
+        self.reach = defaults["reach"].default
+
+    def to_model(self) -> FencerView:
+        return FencerView(
+            id=self.id, score=self.score, position=self.position,
+            state=FENCER_STATES[self.state], state_timer=self.state_timer,
+            last_action=ACTION_TYPES[self.last_action],
+            move_speed=self.move_speed, lunge_speed=self.lunge_speed, reach=self.reach,
+        )
+
+
+class GameCore:
+    __slots__ = ("tick_count", "fencers", "distance", "game_over", "winner", "last_event")
+
+    def __init__(self, fencers: List[FencerCore]):
+        self.tick_count = 0
+        self.fencers = fencers
+        self.distance = 0.0
+        self.game_over = False
+        self.winner: Optional[int] = None
+        self.last_event: Optional[str] = None
+
+    def update_distance(self):
+        self.distance = abs(self.fencers[0].position - self.fencers[1].position)
+
+    def to_model(self) -> GameStateView:
+        return GameStateView(
+            tick_count=self.tick_count,
+            fencers=tuple(fencer.to_model() for fencer in self.fencers),
+            distance=self.distance,
+            game_over=self.game_over,
+            winner=self.winner,
+            last_event=self.last_event,
+        )
+
@@ -0,0 +1,64 @@
+import hashlib
+import numpy as np
+
+# Activations SB3 policies are commonly built with, by torch module name
+ACTIVATIONS = {
+    "Tanh": np.tanh,
+    "ReLU": lambda x: np.maximum(x, 0, out=x),
+}
+
+
+def file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class NumpyPolicy:
+    """
+    Pure-NumPy forward pass of an exported SB3 PPO MlpPolicy actor
+    (see export_policy.py): Linear/activation layers, then action_net.
+
+    predict() mirrors PPO.predict(obs, deterministic=True) for a Discrete action
+    space, for one observation or a batch, without importing torch.
+    """
+
+    def __init__(self, weights: list, biases: list, activation: str = "Tanh", source_sha256: str = ""):
+        self.source_sha256 = source_sha256  # hash of the PPO zip this was exported from
+        self.weights = [np.ascontiguousarray(w.T, dtype=np.float32) for w in weights]  # stored (in, out)
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activation = activation
+        self._act = ACTIVATIONS[activation]
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyPolicy":
+        with np.load(path) as data:
+            layers = int(data["num_layers"])
+            weights = [data[f"w{i}"] for i in range(layers)]
+            biases = [data[f"b{i}"] for i in range(layers)]
+            activation = str(data["activation"])
+            source = str(data["source_sha256"]) if "source_sha256" in data else ""
+        return cls(weights, biases, activation, source)
+
+    def logits(self, obs: np.ndarray) -> np.ndarray:
+        x = np.asarray(obs, dtype=np.float32).reshape(-1, self.weights[0].shape[0])
+        last = len(self.weights) - 1
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            x = x @ w
+            x += b
+            if i < last:  # no activation after action_net
+                x = self._act(x)
+        return x
+
+    def predict(self, obs, state=None, episode_start=None, deterministic=True, rng=None):
+        obs = np.asarray(obs)
+        logits = self.logits(obs)
+        if deterministic:
+            actions = logits.argmax(axis=1)
+        else:
+            rng = rng or np.random.default_rng()
+            probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs /= probs.sum(axis=1, keepdims=True)
+            actions = (probs.cumsum(axis=1) > rng.random((len(probs), 1))).argmax(axis=1)
+        if obs.ndim == 1:
+            return actions[0], state  # single observation, like PPO.predict
+        return actions, state
@@ -0,0 +1,108 @@
+import atexit
+import json
+import os
+import sys
+import threading
+from typing import Dict, List
+
+# process_tick phases, in the order they run (see GameEngine.process_tick_profiled)
+PHASES = ("update_fencer_state", "handle_movement", "enforce_boundaries", "check_hits", "timers_and_win")
+
+
+class PhaseProfile:
+    """
+    Cumulative time and call counts per process_tick phase, for one engine (or room).
+
+    Filled by GameEngine.enable_profiling(); ticks that return early (freeze after
+    a touch, game over) are counted on their own, since they run no phase.
+    """
+    __slots__ = ("name", "totals", "calls", "ticks", "frozen_ticks", "game_over_ticks", "tick_total")
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.totals: List[float] = [0.0] * len(PHASES)
+        self.calls: List[int] = [0] * len(PHASES)
+        self.ticks = 0             # process_tick calls, early returns included
+        self.frozen_ticks = 0
+        self.game_over_ticks = 0
+        self.tick_total = 0.0      # whole process_tick, early returns included
+
+    def reset(self):
+        self.__init__(self.name)
+
+    def report(self) -> dict:
+        phase_total = sum(self.totals)
+        return {
+            "ticks": self.ticks,
+            "frozen_ticks": self.frozen_ticks,
+            "game_over_ticks": self.game_over_ticks,
+            "tick_total_us": self.tick_total * 1e6,
+            "tick_avg_us": self.tick_total / self.ticks * 1e6 if self.ticks else 0.0,
+            "phases": {
+                phase: {
+                    "calls": calls,
+                    "total_us": total * 1e6,
+                    "avg_us": total / calls * 1e6 if calls else 0.0,
+                    "share": total / phase_total if phase_total else 0.0,
+                }
+                for phase, total, calls in zip(PHASES, self.totals, self.calls)
+            },
+        }
+
+    def format(self) -> str:
+        report = self.report()
+        lines = [f"{self.name or 'engine'}: {report['ticks']} ticks ({report['frozen_ticks']} frozen, "
+                 f"{report['game_over_ticks']} after game over), {report['tick_avg_us']:.2f} us/tick",
+                 f"  {'phase':<22}{'calls':>10}{'total ms':>11}{'avg us':>9}{'share':>8}"]
+        for phase, stats in report["phases"].items():
+            lines.append(f"  {phase:<22}{stats['calls']:>10}{stats['total_us'] / 1000:>11.2f}"
+                         f"{stats['avg_us']:>9.3f}{stats['share'] * 100:>7.1f}%")
+        return "\n".join(lines)
+
+
+# Every profile created in this process, by name, so the exit dump includes closed rooms
+PROFILES: Dict[str, PhaseProfile] = {}
+_lock = threading.Lock()
+_dump_registered = False
+_dumped = False
+
+
+def get_profile(name: str) -> PhaseProfile:
+    """The process-wide profile for name (created on first use; the exit dump covers it)."""
+    global _dump_registered
+    with _lock:
+        profile = PROFILES.get(name)
+        if profile is None:
+            profile = PROFILES[name] = PhaseProfile(name)
+        if not _dump_registered:
+            atexit.register(dump)
+            _dump_registered = True
+        return profile
+
+
+def report() -> dict:
+    return {name: profile.report() for name, profile in list(PROFILES.items())}
+
+
+def dump():
+    """
+    Print every profile that recorded ticks; also write them as JSON to
+    FTG_PROFILE_DUMP if set. Registered with atexit by get_profile(), and called
+    by the server on shutdown (uvicorn ends with SIGTERM, which skips atexit).
+    Only the first call dumps.
+    """
+    global _dumped
+    profiles = [profile for profile in list(PROFILES.values()) if profile.ticks]
+    if _dumped or not profiles:
+        return
+    _dumped = True
+    print("process_tick phase profile:", file=sys.stderr)
+    for profile in profiles:
+        print(profile.format(), file=sys.stderr)
+    path = os.environ.get("FTG_PROFILE_DUMP")
+    if path:
+        try:
+            with open(path, "w") as f:
+                json.dump({profile.name: profile.report() for profile in profiles}, f, indent=2)
+        except OSError as e:
+            print(f"Could not write phase profile to {path}: {e}", file=sys.stderr)
@@ -0,0 +1,198 @@
+"""
+Compact input-log recording of bouts, and headless replay.
+
+A log holds everything needed to re-run a bout through GameEngine.process_tick:
+the AI seed, the GameConfig and the per-tick (P1, P2) action pairs, run-length
+encoded (long idle/hold stretches cost one run) and zlib-compressed, plus a
+summary of the final state to verify the replay against.
+
+File layout (little-endian):
+    HEADER   magic "FTGR", u8 version, u64 seed, u32 ticks, u16 config length
+    CONFIG   GameConfig as JSON
+    FINAL    final-state summary (see FINAL_FIELDS)
+    RUNS     zlib of repeated (u8 action pair, u16 run length)
+"""
+import struct
+import zlib
+from typing import Iterable, List
+import numpy as np
+from .engine import GameEngine
+from .batched_engine import BatchedGameEngine, EVENT_CODES, NO_WINNER
+from .models import ActionType, GameConfig, ACTION_TYPES, ACTION_CODES
+
+MAGIC = b"FTGR"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sBQIH")
+_RUN = struct.Struct("<BH")
+MAX_RUN = 0xFFFF
+
+# Final-state summary, enough to catch any divergence of a replay
+FINAL_FIELDS = (
+    "tick_count", "distance", "game_over", "winner", "last_event",
+    "p1_position", "p2_position", "p1_score", "p2_score",
+    "p1_state", "p2_state", "p1_state_timer", "p2_state_timer", "p1_last_action", "p2_last_action",
+)
+_FINAL = struct.Struct("<Id?bBddHHBBHHBB")
+
+# One byte per action pair: P1 code in the high bits, P2 code in the low 3 bits
+_PAIR_SHIFT = 3
+
+
+class ReplayMismatch(ValueError):
+    pass
+
+
+def final_summary(engine: GameEngine) -> tuple:
+    """Summary of a GameEngine's state in FINAL_FIELDS order."""
+    s = engine.core
+    f1, f2 = s.fencers
+    return (
+        s.tick_count, s.distance, s.game_over,
+        NO_WINNER if s.winner is None else s.winner, EVENT_CODES[s.last_event],
+        f1.position, f2.position, f1.score, f2.score,
+        f1.state, f2.state, f1.state_timer, f2.state_timer, f1.last_action, f2.last_action,
+    )
+
+
+def batched_summary(batch: BatchedGameEngine, index: int) -> tuple:
+    """Same as final_summary, for one bout of a BatchedGameEngine."""
+    pos, score, state, timer, action = (batch.position[index], batch.score[index], batch.state[index],
+                                        batch.state_timer[index], batch.last_action[index])
+    return (
+        int(batch.tick_count[index]), float(batch.distance[index]), bool(batch.game_over[index]),
+        int(batch.winner[index]), int(batch.last_event[index]),
+        float(pos[0]), float(pos[1]), int(score[0]), int(score[1]),
+        int(state[0]), int(state[1]), int(timer[0]), int(timer[1]), int(action[0]), int(action[1]),
+    )
+
+
+class MatchLog:
+    def __init__(self, seed: int, config: GameConfig, runs: bytes, ticks: int, final: tuple):
+        self.seed = seed
+        self.config = config
+        self.runs = runs    # packed (pair, length) runs, uncompressed
+        self.ticks = ticks
+        self.final = final
+
+    def to_bytes(self) -> bytes:
+        config = self.config.model_dump_json().encode()
+        return b"".join((
+            _HEADER.pack(MAGIC, VERSION, self.seed, self.ticks, len(config)),
+            config,
+            _FINAL.pack(*self.final),
+            zlib.compress(self.runs, 9),
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "MatchLog":
+        magic, version, seed, ticks, config_len = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"not a v{VERSION} match log")
+        offset = _HEADER.size
+        config = GameConfig.model_validate_json(data[offset:offset + config_len])
+        offset += config_len
+        final = _FINAL.unpack_from(data, offset)
+        runs = zlib.decompress(data[offset + _FINAL.size:])
+        return cls(seed, config, runs, ticks, final)
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> "MatchLog":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    def iter_runs(self):
+        """(p1 code, p2 code, run length) per run."""
+        for pair, length in _RUN.iter_unpack(self.runs):
+            yield pair >> _PAIR_SHIFT, pair & ((1 << _PAIR_SHIFT) - 1), length
+
+    def action_codes(self) -> np.ndarray:
+        """Per-tick action codes, shape (ticks, 2)."""
+        runs = np.frombuffer(self.runs, dtype=np.dtype([("pair", "u1"), ("length", "<u2")]))
+        pairs = np.repeat(runs["pair"], runs["length"])
+        return np.stack((pairs >> _PAIR_SHIFT, pairs & ((1 << _PAIR_SHIFT) - 1)), axis=1)
+
+
+class MatchRecorder:
+    """Builds a MatchLog one tick at a time (call record() for every process_tick of the bout)."""
+
+    def __init__(self, seed: int, config: GameConfig):
+        self.seed = seed
+        self.config = config.model_copy()
+        self.ticks = 0
+        self._runs = bytearray()
+        self._pair = None
+        self._length = 0
+
+    def record(self, p1_action: ActionType, p2_action: ActionType):
+        pair = ACTION_CODES[p1_action] << _PAIR_SHIFT | ACTION_CODES[p2_action]
+        self.ticks += 1
+        if pair == self._pair and self._length < MAX_RUN:
+            self._length += 1
+            return
+        self._flush_run()
+        self._pair = pair
+        self._length = 1
+
+    def _flush_run(self):
+        if self._length:
+            self._runs += _RUN.pack(self._pair, self._length)
+
+    def finish(self, engine: GameEngine) -> MatchLog:
+        self._flush_run()
+        self._pair = None
+        self._length = 0
+        return MatchLog(self.seed, self.config, bytes(self._runs), self.ticks, final_summary(engine))
+
+
+def replay(log: MatchLog, verify: bool = True) -> GameEngine:
+    """Re-run a log through a fresh GameEngine; raises ReplayMismatch if the final state differs."""
+    engine = GameEngine(log.config.model_copy())
+    actions = {}
+    for p1, p2, length in log.iter_runs():
+        actions[0] = ACTION_TYPES[p1]
+        actions[1] = ACTION_TYPES[p2]
+        for _ in range(length):
+            engine.process_tick(actions)
+    if verify:
+        got = final_summary(engine)
+        if got != log.final:
+            raise ReplayMismatch(f"replay diverged: {got} != {log.final}")
+    return engine
+
+
+def replay_batch(logs: Iterable[MatchLog], chunk: int = 4096) -> List[int]:
+    """
+    Replay many logs at once on a BatchedGameEngine (same config per batch of bouts).
+    Returns the indices of the logs whose final state did not match.
+    """
+    logs = list(logs)
+    groups = {}
+    for i, log in enumerate(logs):
+        groups.setdefault(log.config.model_dump_json(exclude={"mode"}), []).append(i)
+
+    mismatches = []
+    for indices in groups.values():
+        indices.sort(key=lambda i: logs[i].ticks)  # similar lengths per chunk: less masked-out stepping
+        for lo in range(0, len(indices), chunk):
+            mismatches += _replay_chunk(logs, indices[lo:lo + chunk])
+    return sorted(mismatches)
+
+
+def _replay_chunk(logs: List[MatchLog], indices: List[int]) -> List[int]:
+    batch = BatchedGameEngine(len(indices), logs[indices[0]].config)
+    lengths = np.array([logs[i].ticks for i in indices])
+    actions = np.zeros((lengths.max(initial=0), len(indices), 2), dtype=np.int8)
+    for j, i in enumerate(indices):
+        actions[:lengths[j], j] = logs[i].action_codes()
+    for t in range(len(actions)):
+        batch.step(actions[t], mask=lengths > t)
+    return [i for j, i in enumerate(indices) if batched_summary(batch, j) != logs[i].final]
+
+
+def load_logs(paths: Iterable[str]) -> List[MatchLog]:
+    return [MatchLog.load(path) for path in paths]
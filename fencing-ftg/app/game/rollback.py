@@ -0,0 +1,140 @@
+import time
+from typing import Dict, List, Optional, Tuple
+from .engine import GameEngine
+from .models import ActionType
+from .scheduler import CostStats
+
+
+class Frame:
+    __slots__ = ("number", "game_over", "snapshot", "actions")
+
+    def __init__(self, number: int, engine: GameEngine, actions: List[ActionType]):
+        self.number = number
+        self.actions = actions  # [P1, P2] actions the frame ran with
+        self.capture(engine)
+
+    def capture(self, engine: GameEngine):
+        # Engine state before the frame ran
+        self.game_over = engine.core.game_over
+        self.snapshot = engine.snapshot()
+
+
+class RollbackBuffer:
+    """
+    Server-side rollback for PVP bouts with tick-stamped inputs.
+
+    Keeps the last max_frames frames (engine snapshot + actions). Until an input
+    arrives the player is predicted to hold their last action, which is what the
+    frame ran with. Clients stamp an input with the tick_count they were looking
+    at; it is applied from the first frame that started from that tick_count on.
+    correct() queues it, and resimulate() restores the snapshot of the earliest
+    corrected frame and runs the buffered frames again. Inputs older than the
+    buffer are applied from its oldest frame (counted in `clamped`). A player's
+    inputs never share a frame: one stamped for a frame that already has an
+    input of theirs goes to the next one, so a quick tap is not overwritten.
+
+    Frames leave the buffer in order through push() / drain(), with their final
+    actions, which is when they can be recorded (see replay.py). Likewise a game
+    over is only final once `settled` (a late input could still undo it).
+    """
+
+    def __init__(self, max_frames: int = 8):
+        self.max_frames = max_frames
+        self.frames: List[Frame] = []
+        self.frame_count = 0
+        # tick_count -> first frame that started from it, as published at the time
+        # (the tick_count a client saw; not rewritten by re-simulation)
+        self._tick_frames: Dict[int, int] = {}
+        self._last_tick = -1
+        self._corrections: List[Tuple[int, int, ActionType]] = []  # (frame index, player, action)
+        self._input_frames: Dict[int, int] = {}  # player -> frame number their last input applies from
+
+        self.rollbacks = 0
+        self.resimulated_frames = 0
+        self.clamped = 0
+        self.resim_stats = CostStats()
+
+    def push(self, engine: GameEngine, p1_action: ActionType, p2_action: ActionType) -> List[Tuple[ActionType, ActionType]]:
+        """Buffer the frame about to run; returns the actions of the frame that fell out, if any."""
+        tick = engine.core.tick_count
+        self._tick_frames.setdefault(tick, self.frame_count)
+        self._last_tick = tick
+        self.frames.append(Frame(self.frame_count, engine, [p1_action, p2_action]))
+        self.frame_count += 1
+        if len(self.frames) > self.max_frames:
+            oldest = self.frames.pop(0)
+            for tick in [t for t, number in self._tick_frames.items() if number <= oldest.number]:
+                del self._tick_frames[tick]
+            return [tuple(oldest.actions)]
+        return []
+
+    def drain(self) -> List[Tuple[ActionType, ActionType]]:
+        """Commit every buffered frame (bout over, mode change); pending corrections are dropped."""
+        committed = [tuple(frame.actions) for frame in self.frames]
+        self.clear()
+        return committed
+
+    @property
+    def settled(self) -> bool:
+        """True if no buffered frame can change the outcome any more (the oldest one already started game over)."""
+        return not self.frames or self.frames[0].game_over
+
+    def clear(self):
+        self.frames.clear()
+        self._tick_frames.clear()
+        self._last_tick = -1
+        self._corrections.clear()
+        self._input_frames.clear()
+
+    def correct(self, player_id: int, action: ActionType, tick: Optional[int]) -> bool:
+        """Queue an input stamped for tick; False if it is not in the past (apply it normally, to the next frame)."""
+        live = not self.frames or tick is None or tick > self._last_tick
+        if not live:
+            number = self._tick_frames.get(tick)
+            if number is None or number < self.frames[0].number:
+                self.clamped += 1
+                number = self.frames[0].number
+            number = max(number, self._input_frames.get(player_id, -1) + 1)
+            live = number >= self.frame_count
+        if live:
+            self._input_frames[player_id] = self.frame_count
+            return False
+        self._input_frames[player_id] = number
+        self._corrections.append((number - self.frames[0].number, player_id, action))
+        return True
+
+    def resimulate(self, engine: GameEngine):
+        """Apply queued corrections and re-run the buffered frames from the earliest one."""
+        if not self._corrections:
+            return
+        start = time.perf_counter()
+        # Per-player inputs arrive in order, so a later correction overrides an earlier one
+        first = len(self.frames)
+        for index, player_id, action in self._corrections:
+            for i in range(index, len(self.frames)):
+                frame_actions = self.frames[i].actions
+                if frame_actions[player_id] != action:
+                    frame_actions[player_id] = action
+                    first = min(first, i)
+        self._corrections.clear()
+        if first == len(self.frames):
+            return  # prediction was right
+
+        engine.restore(self.frames[first].snapshot)
+        actions = {}
+        for frame in self.frames[first:]:
+            frame.capture(engine)  # later frames now start from the corrected state
+            actions[0], actions[1] = frame.actions
+            engine.process_tick(actions)
+        self.rollbacks += 1
+        self.resimulated_frames += len(self.frames) - first
+        self.resim_stats.record(time.perf_counter() - start)
+
+    def report(self) -> dict:
+        return {
+            "max_frames": self.max_frames,
+            "rollbacks": self.rollbacks,
+            "resimulated_frames": self.resimulated_frames,
+            "clamped": self.clamped,
+            "resim": self.resim_stats.report(),
+        }
@@ -0,0 +1,172 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+
+def _path_roots():
+    # Longest first, so site-packages wins over the stdlib directory it sits in
+    return sorted((os.path.abspath(root) for root in sys.path if root), key=len, reverse=True)
+
+
+class StackSampler:
+    """
+    Statistical CPU profiler: a daemon thread reads the Python stack of one thread
+    (or of every thread) every `interval` seconds and counts identical stacks.
+
+    The sampled thread is never stopped or traced; a sample costs the sampler one
+    sys._current_frames() call and a walk up the frame chain while holding the GIL,
+    so the default 200 samples/s take a fraction of a percent of the server's time.
+    Native code (numpy, torch) shows up as the Python function that called it.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.005, max_depth: int = 128):
+        self.thread_id = thread_id  # None: every thread but the sampler's own
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+        self._labels: Dict[object, str] = {}  # code object -> frame label
+        self._roots = _path_roots()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _label(self, code) -> str:
+        # Function and where it is defined, so samples on different lines of it merge
+        label = self._labels.get(code)
+        if label is None:
+            path = code.co_filename
+            for root in self._roots:
+                if path.startswith(root + os.sep):
+                    path = path[len(root) + 1:]
+                    break
+            label = self._labels[code] = f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ",")
+        return label
+
+    def _stack(self, frame) -> tuple:
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def _run(self):
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        start = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if self.thread_id is not None:
+                frame = frames.get(self.thread_id)
+                if frame is not None:
+                    self.stacks[self._stack(frame)] += 1
+            else:
+                for thread_id, frame in frames.items():
+                    if thread_id == own:
+                        continue
+                    if thread_id not in names:
+                        names.update((thread.ident, f"thread {thread.name}") for thread in threading.enumerate())
+                    self.stacks[(names.get(thread_id, f"thread {thread_id}"),) + self._stack(frame)] += 1
+            self.samples += 1
+            frames = frame = None  # hold no frames (and their locals) between samples
+        self.elapsed = time.perf_counter() - start
+
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def rate(self) -> float:
+        return self.samples / self.elapsed if self.elapsed else 0.0
+
+    def collapsed(self) -> str:
+        """
+        One "root;caller;callee count" line per distinct stack, heaviest first: the
+        folded format read by flamegraph.pl, inferno and speedscope.
+        """
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class AllocationTrace:
+    """
+    Allocation sites per scheduler tick, with tracemalloc.
+
+    While attached to a TickScheduler (its alloc_trace), every frame is bracketed
+    by begin_tick() and end_tick(): the traces are cleared before the frame, so
+    the snapshot taken after it holds only the blocks the frame allocated and
+    still holds at its end (snapshots, encodings, queued messages, anything that
+    grows). Those are summed per site over the window. tracemalloc does not see
+    blocks that are freed again before the snapshot, so short-lived temporaries
+    only show in the per-tick peak (the most memory the frame's own blocks took
+    at once). Tracing slows the whole process down while it is on.
+
+    start(), stop() and report() do the expensive tracemalloc work; the server
+    runs them in a worker thread, not on the event loop.
+    """
+
+    def __init__(self, frames: int = 1):
+        self.frames = frames
+        self.ticks = 0
+        self.peak_total = 0
+        self.peak_max = 0
+        self._started = False
+        self._snapshots: List[tracemalloc.Snapshot] = []
+
+    def start(self) -> "AllocationTrace":
+        if not tracemalloc.is_tracing():  # leave tracing started elsewhere (PYTHONTRACEMALLOC) alone
+            tracemalloc.start(self.frames)
+            self._started = True
+        return self
+
+    def begin_tick(self):
+        tracemalloc.clear_traces()  # also zeroes the traced memory and its peak
+        tracemalloc.reset_peak()
+
+    def end_tick(self):
+        peak = tracemalloc.get_traced_memory()[1]
+        self._snapshots.append(tracemalloc.take_snapshot())  # only this tick's blocks: cheap
+        self.ticks += 1
+        self.peak_total += peak
+        self.peak_max = max(self.peak_max, peak)
+
+    def stop(self):
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def report(self, top: int = 25) -> dict:
+        """The `top` sites by bytes allocated per tick and still held at the end of it."""
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+        key = "traceback" if self.frames > 1 else "lineno"
+        sites: Dict[tracemalloc.Traceback, List[int]] = {}
+        for snapshot in self._snapshots:
+            for stat in snapshot.filter_traces(ignore).statistics(key):
+                site = sites.setdefault(stat.traceback, [0, 0])
+                site[0] += stat.size
+                site[1] += stat.count
+        ticks = self.ticks
+        ranked = sorted(sites.items(), key=lambda item: item[1][0], reverse=True)
+        return {
+            "ticks": ticks,
+            "tick_peak_bytes": {"avg": self.peak_total / ticks if ticks else 0.0, "max": self.peak_max},
+            "sites": [
+                {
+                    "traceback": [f"{frame.filename}:{frame.lineno}" for frame in traceback],
+                    "bytes": size,
+                    "blocks": count,
+                    "bytes_per_tick": size / ticks,
+                    "blocks_per_tick": count / ticks,
+                }
+                for traceback, (size, count) in ranked[:top]
+            ],
+        }
@@ -0,0 +1,222 @@
+import asyncio
+import time
+from typing import Dict, Protocol
+from .metrics import REGISTRY, SAMPLING
+
+# Per-room tick cost is in GET /rooms (room_stats) and ftg_process_tick_seconds; these are per frame
+FRAME_SECONDS = REGISTRY.histogram("ftg_frame_seconds", "All rooms' ticks in one scheduler pass (sampled frames)")
+PUBLISH_SECONDS = REGISTRY.histogram(
+    "ftg_publish_seconds",
+    "All rooms' publish() in one frame: encoding and handing snapshots to client queues (sampled frames)")
+
+
+class Tickable(Protocol):
+    def prepare(self) -> None: ...
+    def tick(self) -> None: ...
+    def publish(self) -> None: ...
+
+
+class CostStats:
+    """Running count / last / mean / max of a timed operation (seconds), plus a recent average."""
+    __slots__ = ("count", "total", "last", "max", "recent")
+
+    RECENT_WEIGHT = 0.05  # exponential moving average, ~20 samples
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+        self.recent = 0.0
+
+    def record(self, cost: float):
+        self.count += 1
+        self.total += cost
+        self.last = cost
+        if cost > self.max:
+            self.max = cost
+        self.recent += (cost - self.recent) * (self.RECENT_WEIGHT if self.count > 1 else 1.0)
+
+    def report(self) -> dict:
+        return {
+            "count": self.count,
+            "last_us": self.last * 1e6,
+            "avg_us": self.total / self.count * 1e6 if self.count else 0.0,
+            "max_us": self.max * 1e6,
+            "recent_us": self.recent * 1e6,
+        }
+
+
+CATCH_UP = "catch_up"  # run missed ticks back to back (up to max_catch_up per frame)
+DROP = "drop"          # skip missed ticks, stay on the frame grid
+TICK_POLICIES = (CATCH_UP, DROP)
+
+
+class FixedTimestep:
+    """
+    Deadline-based frame clock on time.monotonic.
+
+    Deadlines advance by exactly one period per tick (start + n * period), so the
+    work done in a frame does not stretch the tick period. If the loop falls
+    behind, `policy` decides whether the missed ticks are run or dropped.
+    """
+
+    def __init__(self, tick_rate: int = 60, policy: str = CATCH_UP, max_catch_up: int = 5):
+        if policy not in TICK_POLICIES:
+            raise ValueError(f"Invalid tick policy: {policy}")
+        self.period = 1 / tick_rate
+        self.policy = policy
+        self.max_catch_up = max_catch_up
+        self.deadline = None
+
+        self.frames = 0
+        self.lateness = CostStats()  # how late each frame started after its deadline
+        self.overruns = 0            # frames whose work ran past the next deadline
+        self.caught_up_ticks = 0     # extra ticks run to catch up
+        self.dropped_ticks = 0       # ticks skipped (drop policy, or beyond max_catch_up)
+
+    def reset(self):
+        self.deadline = time.monotonic()
+
+    def due(self) -> int:
+        """Number of ticks to run this frame (at least 1); advances the deadline past them."""
+        if self.deadline is None:
+            self.reset()
+        late = max(0.0, time.monotonic() - self.deadline)
+        self.frames += 1
+        self.lateness.record(late)
+
+        missed = int(late / self.period)  # whole periods we are behind
+        ticks = 1
+        if missed:
+            if self.policy == CATCH_UP:
+                extra = min(missed, self.max_catch_up)
+                ticks += extra
+                self.caught_up_ticks += extra
+                self.dropped_ticks += missed - extra
+            else:
+                self.dropped_ticks += missed
+        self.deadline += (1 + missed) * self.period
+        return ticks
+
+    async def sleep(self):
+        """Wait for the next deadline (yield at least once, so writers get to run)."""
+        delay = self.deadline - time.monotonic()
+        if delay <= 0:
+            self.overruns += 1
+            delay = 0
+        await asyncio.sleep(delay)
+
+    def report(self) -> dict:
+        return {
+            "tick_rate": 1 / self.period,
+            "policy": self.policy,
+            "frames": self.frames,
+            "lateness": self.lateness.report(),
+            "overruns": self.overruns,
+            "caught_up_ticks": self.caught_up_ticks,
+            "dropped_ticks": self.dropped_ticks,
+        }
+
+
+class TickScheduler:
+    """
+    One asyncio task that ticks every registered room each frame,
+    instead of one game_loop task (and one sleep) per room.
+
+    With a broker (InferenceBroker), every room first submits its AI observation
+    in prepare(), the broker runs one batched forward pass, then the rooms tick.
+    """
+
+    def __init__(self, tick_rate: int = 60, policy: str = CATCH_UP, max_catch_up: int = 5, broker=None):
+        self.clock = FixedTimestep(tick_rate, policy, max_catch_up)
+        self.broker = broker
+        self.rooms: Dict[str, Tickable] = {}
+        self.room_stats: Dict[str, CostStats] = {}
+        self.frame_stats = CostStats()    # all rooms' tick() calls in one frame
+        self.publish_stats = CostStats()  # all rooms' publish() in one frame
+        self.alloc_trace = None  # sampler.AllocationTrace while GET /debug/profile?mode=alloc runs
+        self._task = None
+
+    def add(self, room_id: str, room: Tickable):
+        self.rooms[room_id] = room
+        self.room_stats[room_id] = CostStats()
+        self.start()
+
+    def remove(self, room_id: str):
+        self.rooms.pop(room_id, None)
+        self.room_stats.pop(room_id, None)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self.run())
+
+    def tick_all(self):
+        perf_counter = time.perf_counter
+        sampled = SAMPLING.next_frame()  # whether this frame's hot-path timings go to /metrics
+        frame_start = perf_counter()
+        rooms = list(self.rooms.items())
+        prepare_cost = {}
+        if self.broker is not None:
+            for room_id, room in rooms:
+                start = perf_counter()
+                try:
+                    room.prepare()
+                except Exception as e:
+                    print(f"Room {room_id}: prepare failed: {e!r}")
+                prepare_cost[room_id] = perf_counter() - start
+            self.broker.flush()
+        for room_id, room in rooms:
+            start = perf_counter()
+            try:
+                room.tick()
+            except Exception as e:
+                print(f"Room {room_id}: tick failed: {e!r}")
+            cost = perf_counter() - start + prepare_cost.get(room_id, 0.0)
+            self.room_stats[room_id].record(cost)
+        cost = perf_counter() - frame_start
+        self.frame_stats.record(cost)
+        if sampled:
+            FRAME_SECONDS.observe(cost)
+
+    def publish_all(self):
+        # publish() only hands snapshots to per-client queues; it never waits on a socket
+        start = time.perf_counter()
+        for room_id, room in list(self.rooms.items()):
+            try:
+                room.publish()
+            except Exception as e:
+                print(f"Room {room_id}: publish failed: {e!r}")
+        cost = time.perf_counter() - start
+        self.publish_stats.record(cost)
+        if SAMPLING.on:
+            PUBLISH_SECONDS.observe(cost)
+
+    async def run(self):
+        # Stops by itself once the last room is gone; add() restarts it.
+        self.clock.reset()
+        while self.rooms:
+            trace = self.alloc_trace
+            if trace is not None:
+                trace.begin_tick()
+            for _ in range(self.clock.due()):
+                self.tick_all()
+            # Only the latest state is published, even after catch-up ticks
+            self.publish_all()
+            if trace is not None:
+                trace.end_tick()
+            await self.clock.sleep()
+
+    def report(self) -> dict:
+        return {
+            "rooms": len(self.rooms),
+            "clock": self.clock.report(),
+            "frame": self.frame_stats.report(),
+            "publish": self.publish_stats.report(),
+            "per_room": {room_id: stats.report() for room_id, stats in self.room_stats.items()},
+            "inference": self.broker.report() if self.broker is not None else None,
+        }
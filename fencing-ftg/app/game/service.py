@@ -1,59 +1,180 @@
-import asyncio
-from typing import Dict
+import os
+import random
+import time
+from typing import Dict, Optional
 from .engine import GameEngine
-from .models import ActionType, GameMode
+from .models import ActionType, GameMode, GameConfig
 from .ai import SimpleAI
-from .trained_ai import TrainedAI
+from .scheduler import FixedTimestep
+from .trained_ai import TrainedAI, ACT_MAP
+from .inference import InferenceBroker
+from .replay import MatchRecorder
+from .rollback import RollbackBuffer
+from .inputs import InputQueue
+from .metrics import REGISTRY, SAMPLING
+
+# Timed on sampled frames only (metrics.SAMPLING)
+PROCESS_TICK_SECONDS = REGISTRY.histogram("ftg_process_tick_seconds", "GameEngine.process_tick, per room tick (sampled frames)")
+_DECISION_HELP = "AI decision latency (batched: one flush for all rooms; sampled frames)"
+SIMPLE_DECISION_SECONDS = REGISTRY.histogram("ftg_ai_decision_seconds", _DECISION_HELP, {"ai": "simple"})
+TRAINED_DECISION_SECONDS = REGISTRY.histogram("ftg_ai_decision_seconds", _DECISION_HELP, {"ai": "trained"})
 
 class GameService:
-    def __init__(self):
-        self.engine = GameEngine()
-        self.inputs: Dict[int, ActionType] = {}
+    def __init__(self, broker: Optional[InferenceBroker] = None, replay_dir: Optional[str] = None,
+                 rollback_frames: int = 0):
+        # Own config per service: set_mode mutates it, and GameEngine's default config is shared
+        self.engine = GameEngine(GameConfig())
+        self.inputs: Dict[int, ActionType] = {}  # action each player holds
+        self.input_queue = InputQueue()          # inputs not applied yet, at most one per player per tick
         self.running = False
         
+        # With a broker, the shared model is evaluated for all rooms at once (see prepare()).
+        # SimpleAI plays until the broker's model has finished loading, and when it misses its deadline.
+        self.broker = broker
+        self._ticket: Optional[int] = None
+        self.fallback_ai = SimpleAI(player_id=1)
+
+        # Each bout is recorded as an input log (see replay.py) and saved to replay_dir when it ends
+        self.replay_dir = replay_dir
+        self.recorder: Optional[MatchRecorder] = None
+        self._start_recording()
+
+        # PVP only: with rollback_frames > 0, tick-stamped inputs that arrive late are applied
+        # at their tick by re-simulating the last frames (see rollback.py)
+        self.rollback = RollbackBuffer(rollback_frames) if rollback_frames > 0 else None
+
+        if broker is not None:
+            self.ai = self.fallback_ai
+            return
+
         # Try to load TrainedAI, fall back to SimpleAI
         print("Checking for Trained AI...")
         self.ai = TrainedAI()
         if not self.ai.model:
             print("Using SimpleAI (Rule-based)")
-            self.ai = SimpleAI(player_id=1)
+            self.ai = self.fallback_ai
         else:
             print("Using TrainedAI (PPO)")
         
-    def set_player_action(self, player_id: int, action: ActionType):
-        self.inputs[player_id] = action
+    def set_player_action(self, player_id: int, action: ActionType, tick: Optional[int] = None):
+        """Hold action from its tick on; tick is the tick_count the client saw when it was pressed."""
+        self.input_queue.push(player_id, action, tick)
+
+    def _next_input(self, player_id: int) -> ActionType:
+        # One queued input per player per tick; with rollback, a late one is applied from its stamped frame
+        entry = self.input_queue.pop(player_id, self.engine.core.tick_count)
+        if entry is not None:
+            action, tick = entry
+            if self.rollback is not None and self.engine.config.mode == GameMode.PVP:
+                self.rollback.correct(player_id, action, tick)
+            self.inputs[player_id] = action
+        return self.inputs.get(player_id, ActionType.IDLE)
+
+    def prepare(self):
+        """Submit this tick's AI observation to the broker (PVE with a trained model only)."""
+        self._ticket = None
+        if self.broker is None or self.engine.config.mode != GameMode.PVE:
+            return
+        if not isinstance(self.ai, TrainedAI):
+            if self.broker.model is None:
+                return  # still loading
+            self.ai = TrainedAI(model=self.broker.model)
+        self._ticket = self.broker.submit(self.ai.observe(self.engine, 1, 0))
+
+    def tick(self):
+        """Compute this frame's actions (inputs / AI) and advance the engine by one tick."""
+        # P1 Input (Human)
+        p1_action = self._next_input(0)
+        
+        # P2 Input (Human override or AI)
+        p2_action = self._next_input(1)
+        
+        sampled = SAMPLING.on
+        # AI Logic (Only if PVE)
+        if self.engine.config.mode == GameMode.PVE:
+            start = time.perf_counter() if sampled else 0.0
+            decision = SIMPLE_DECISION_SECONDS
+            if self._ticket is not None:
+                # Batched decision from the broker's last flush (timed there)
+                action_idx = self.broker.result(self._ticket)
+                self._ticket = None
+                if action_idx is None:
+                    p2_action = self.fallback_ai.decide(self.engine.core)
+                else:
+                    p2_action = ACT_MAP.get(action_idx, ActionType.IDLE)
+                    decision = None
+            elif isinstance(self.ai, SimpleAI):
+                p2_action = self.ai.decide(self.engine.core)
+            else:
+                # TrainedAI uses process(engine, my_index, op_index)
+                p2_action = self.ai.process(self.engine, 1, 0)
+                decision = TRAINED_DECISION_SECONDS
+            if sampled and decision is not None:
+                decision.observe(time.perf_counter() - start)
+        
+        current_actions = {
+            0: p1_action,
+            1: p2_action
+        }
+
+        # Frames are final (and recorded) once they leave the rollback buffer
+        committed = [(p1_action, p2_action)]
+        if self.rollback is not None:
+            if self.engine.config.mode == GameMode.PVP:
+                self.rollback.resimulate(self.engine)
+                committed = self.rollback.push(self.engine, p1_action, p2_action)
+            elif self.rollback.frames:
+                committed = self.rollback.drain() + committed
+
+        if sampled:
+            start = time.perf_counter()
+        if self.engine.profile is None:
+            self.engine.process_tick(current_actions)
+        else:
+            self.engine.process_tick_profiled(current_actions)  # opt-in per room (Lobby.set_profiling)
+        if sampled:
+            PROCESS_TICK_SECONDS.observe(time.perf_counter() - start)
+
+        if self.recorder is not None:
+            for actions in committed:
+                self.recorder.record(*actions)
+            if self.engine.core.game_over and (self.rollback is None or self.rollback.settled):
+                self._save_recording()
+
+    def _start_recording(self):
+        # New seed per bout, so the SimpleAI decisions of a bout follow from its log's seed
+        seed = random.getrandbits(64)
+        self.fallback_ai.rng.seed(seed)
+        self.recorder = MatchRecorder(seed, self.engine.config) if self.replay_dir else None
+
+    def _save_recording(self):
+        if self.rollback is not None:
+            for actions in self.rollback.drain():
+                self.recorder.record(*actions)
+        log = self.recorder.finish(self.engine)
+        self.recorder = None
+        path = os.path.join(self.replay_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{log.seed:016x}.ftgr")
+        try:
+            os.makedirs(self.replay_dir, exist_ok=True)
+            log.save(path)
+        except OSError as e:
+            print(f"Could not save replay {path}: {e}")
 
     async def game_loop(self, update_callback):
+        # Standalone loop for a single bout; the server ticks rooms through TickScheduler instead.
         self.running = True
+        clock = FixedTimestep(self.engine.config.tick_rate)
+        clock.reset()
         while self.running:
-            # 1. Process inputs and tick engine
-            
-            # P1 Input (Human)
-            p1_action = self.inputs.get(0, ActionType.IDLE)
-            
-            # P2 Input (Human override or AI)
-            p2_action = self.inputs.get(1, ActionType.IDLE)
-            
-            # AI Logic (Only if PVE)
-            if self.engine.config.mode == GameMode.PVE:
-                if isinstance(self.ai, SimpleAI):
-                    p2_action = self.ai.decide(self.engine.state)
-                else:
-                    # TrainedAI uses process(engine, my_index, op_index)
-                    p2_action = self.ai.process(self.engine, 1, 0)
-            
-            current_actions = {
-                0: p1_action,
-                1: p2_action
-            }
-            
-            self.engine.process_tick(current_actions)
+            # 1. Process inputs and tick engine (more than once if we fell behind)
+            for _ in range(clock.due()):
+                self.tick()
             
             # 2. Broadcast state
             await update_callback(self.engine.state)
             
-            # 3. Wait for next tick (60 FPS -> ~0.016s)
-            await asyncio.sleep(1/60)
+            # 3. Wait for the next tick deadline (60 FPS -> every ~0.016s, work time included)
+            await clock.sleep()
 
     
     def set_mode(self, mode_str: str):
@@ -67,6 +188,9 @@ class GameService:
 
     def restart_game(self):
         self.engine.reset_game()
+        if self.rollback is not None:
+            self.rollback.clear()  # tick_count starts over
+        self._start_recording()  # an unfinished bout is not saved
         print("Game Restarted")
 
     def stop(self):
@@ -0,0 +1,153 @@
+import multiprocessing as mp
+import traceback
+import numpy as np
+from gymnasium.vector import VectorEnv, AutoresetMode
+from gymnasium.vector.utils import batch_space
+from .gym_env import FencingEnv, FencingVectorEnv
+
+# Worker commands (written to the shared command slot before waking the workers)
+CMD_STEP, CMD_RESET, CMD_CLOSE = range(3)
+NO_SEED = -1
+
+# Slices at least this big are stepped with one FencingVectorEnv, smaller ones env by env
+VECTOR_THRESHOLD = 16
+
+
+def _worker(index, lo, hi, buffers, command, go, done, errors, frame_skip, skip_locked):
+    obs, rewards, terminations, truncations, actions = (
+        np.frombuffer(buf, dtype=dtype).reshape(shape)[lo:hi] for buf, dtype, shape in buffers)
+    n = hi - lo
+    try:
+        if n >= VECTOR_THRESHOLD:
+            envs = FencingVectorEnv(n, copy=False, frame_skip=frame_skip, skip_locked=skip_locked)
+        else:
+            envs = [FencingEnv(frame_skip=frame_skip, skip_locked=skip_locked) for _ in range(n)]
+            autoreset = [False] * n
+        while True:
+            go.acquire()
+            cmd, seed = command[0], command[1]
+            if cmd == CMD_CLOSE:
+                return
+            if cmd == CMD_RESET:
+                seed = None if seed == NO_SEED else seed + lo
+                if isinstance(envs, FencingVectorEnv):
+                    obs[:] = envs.reset(seed=seed)[0]
+                else:
+                    for i, env in enumerate(envs):
+                        obs[i] = env.reset(seed=None if seed is None else seed + i)[0]
+                        autoreset[i] = False
+                rewards[:] = 0.0
+                terminations[:] = False
+            elif isinstance(envs, FencingVectorEnv):
+                o, r, term, trunc, _ = envs.step(actions)
+                obs[:], rewards[:], terminations[:], truncations[:] = o, r, term, trunc
+            else:
+                # Next-step autoreset, as in FencingVectorEnv
+                for i, env in enumerate(envs):
+                    if autoreset[i]:
+                        obs[i] = env.reset()[0]
+                        rewards[i], terminations[i] = 0.0, False
+                    else:
+                        obs[i], rewards[i], terminations[i], truncations[i], _ = env.step(int(actions[i]))
+                    autoreset[i] = terminations[i]
+            done.release()
+    except Exception:
+        errors.put((index, traceback.format_exc()))
+        done.release()
+
+
+class SharedMemoryVectorEnv(VectorEnv):
+    """
+    num_envs FencingEnv copies split over num_workers processes that exchange data
+    through shared memory only.
+
+    Observations, rewards, terminations and truncations live in shared NumPy arrays
+    that the workers write their slice of; actions are written to a shared array
+    the workers read. A step is one semaphore release per worker and one acquire
+    per worker back, so nothing is pickled per step.
+
+    Same API and results as FencingVectorEnv(num_envs) (next-step autoreset;
+    sub-env i seeded with `seed` behaves like FencingEnv reset with `seed + i`).
+    With copy=False step() returns the shared arrays, overwritten by the next step.
+    Call close() to stop the workers.
+    """
+    metadata = {"render_modes": [], "render_fps": 60, "autoreset_mode": AutoresetMode.NEXT_STEP}
+
+    def __init__(self, num_envs: int, num_workers: int = None, copy: bool = True,
+                 frame_skip: int = 1, skip_locked: bool = False, context: str = None):
+        self.num_envs = num_envs
+        self.num_workers = min(num_workers or mp.cpu_count(), num_envs)
+        self.copy = copy
+
+        single = FencingEnv()
+        self.single_action_space = single.action_space
+        self.single_observation_space = single.observation_space
+        self.action_space = batch_space(self.single_action_space, num_envs)
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+
+        ctx = mp.get_context(context or ("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"))
+        layout = (
+            (np.float32, (num_envs, 7)),  # observations
+            (np.float64, (num_envs,)),    # rewards
+            (np.bool_, (num_envs,)),      # terminations
+            (np.bool_, (num_envs,)),      # truncations
+            (np.int64, (num_envs,)),      # actions
+        )
+        buffers = [(ctx.RawArray("b", int(np.prod(shape)) * np.dtype(dtype).itemsize), dtype, shape)
+                   for dtype, shape in layout]
+        self._obs, self._rewards, self._terminations, self._truncations, self._actions = (
+            np.frombuffer(buf, dtype=dtype).reshape(shape) for buf, dtype, shape in buffers)
+        self._command = ctx.RawArray("q", 2)
+        self._go = [ctx.Semaphore(0) for _ in range(self.num_workers)]
+        self._done = ctx.Semaphore(0)
+        self._errors = ctx.SimpleQueue()
+
+        bounds = [int(b) for b in np.linspace(0, num_envs, self.num_workers + 1)]
+        self._processes = [
+            ctx.Process(target=_worker, name=f"fencing-env-{w}", daemon=True,
+                        args=(w, bounds[w], bounds[w + 1], buffers, self._command, self._go[w], self._done,
+                              self._errors, frame_skip, skip_locked))
+            for w in range(self.num_workers)
+        ]
+        for process in self._processes:
+            process.start()
+        self.closed = False
+
+    def _run(self, cmd: int, seed: int = NO_SEED):
+        self._command[0], self._command[1] = cmd, seed
+        for go in self._go:
+            go.release()
+        for _ in range(self.num_workers):
+            # Poll so a worker that died without reporting does not hang us
+            while not self._done.acquire(timeout=1.0):
+                dead = [p.name for p in self._processes if not p.is_alive()]
+                if dead:
+                    raise RuntimeError(f"env worker(s) exited: {', '.join(dead)}")
+        if not self._errors.empty():
+            index, tb = self._errors.get()
+            raise RuntimeError(f"env worker {index} failed:\n{tb}")
+
+    def _result(self, array: np.ndarray) -> np.ndarray:
+        return array.copy() if self.copy else array
+
+    def reset(self, *, seed=None, options=None):
+        if seed is not None and not isinstance(seed, int):
+            raise ValueError("SharedMemoryVectorEnv.reset takes a single int seed (sub-env i gets seed + i)")
+        self._run(CMD_RESET, NO_SEED if seed is None else seed)
+        return self._result(self._obs), {}
+
+    def step(self, actions):
+        self._actions[:] = actions
+        self._run(CMD_STEP)
+        return (self._result(self._obs), self._result(self._rewards), self._result(self._terminations),
+                self._result(self._truncations), {})
+
+    def close_extras(self, **kwargs):
+        self._command[0] = CMD_CLOSE
+        for go, process in zip(self._go, self._processes):
+            if process.is_alive():
+                go.release()
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
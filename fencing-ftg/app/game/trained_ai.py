@@ -1,39 +1,67 @@
-from stable_baselines3 import PPO
-from .models import ActionType, FencerState
+from .models import ActionType, ACT_MAP
 from .engine import GameEngine
+from .numpy_policy import NumpyPolicy, file_sha256
 import numpy as np
 import os
+import threading
 from collections import deque
 
+DEFAULT_MODEL_PATH = "app/models/ppo_fencing.zip"
+
+def load_model(model_path=DEFAULT_MODEL_PATH):
+    """
+    Load the policy, or None if there is no trained model.
+    Uses the torch-free NumPy export next to the zip (<name>.npz, see export_policy.py)
+    when it is up to date, and only falls back to stable_baselines3 otherwise.
+    """
+    npz_path = os.path.splitext(model_path)[0] + ".npz"
+    if os.path.exists(npz_path):
+        policy = NumpyPolicy.load(npz_path)
+        if not os.path.exists(model_path) or policy.source_sha256 == file_sha256(model_path):
+            print(f"Loaded trained policy from {npz_path}")
+            return policy
+        print(f"{npz_path} was exported from a different {model_path}, ignoring it.")
+    if os.path.exists(model_path):
+        print(f"Loading trained model from {model_path} (run export_policy.py to skip torch)...")
+        from stable_baselines3 import PPO
+        return PPO.load(model_path)
+    print(f"No trained model found at {model_path}.")
+    return None
+
+# Process-wide model cache: every room/AI shares one loaded policy per path
+_models = {}
+_models_lock = threading.Lock()
+
+def get_model(model_path=DEFAULT_MODEL_PATH):
+    """load_model() once per process and path; later calls return the same object."""
+    with _models_lock:
+        if model_path not in _models:
+            _models[model_path] = load_model(model_path)
+        return _models[model_path]
+
+def load_model_in_background(model_path=DEFAULT_MODEL_PATH, on_loaded=None) -> threading.Thread:
+    """Fill the cache from a daemon thread; on_loaded(model) is called from that thread when done."""
+    def run():
+        model = get_model(model_path)
+        if on_loaded is not None:
+            on_loaded(model)
+    thread = threading.Thread(target=run, name="model-loader", daemon=True)
+    thread.start()
+    return thread
+
 class TrainedAI:
-    def __init__(self, model_path="app/models/ppo_fencing.zip", reaction_delay=15):
-        self.model = None
-        if os.path.exists(model_path):
-            print(f"Loading trained model from {model_path}...")
-            self.model = PPO.load(model_path)
-        else:
-            print(f"No trained model found at {model_path}.")
+    def __init__(self, model_path=DEFAULT_MODEL_PATH, reaction_delay=15, model=None):
+        # Pass `model` to use an already loaded policy (see InferenceBroker); otherwise use the shared cache
+        self.model = model if model is not None else get_model(model_path)
             
-        self.state_map = {
-            FencerState.NEUTRAL: 0,
-            FencerState.MOVING_FORWARD: 1,
-            FencerState.MOVING_BACKWARD: 2,
-            FencerState.ATTACK_STARTUP: 3,
-            FencerState.ATTACK_ACTIVE: 4,
-            FencerState.RECOVERY: 5,
-            FencerState.HIT: 6
-        }
-        
         # Reaction Delay
         self.reaction_delay = reaction_delay
         self.obs_buffer = deque(maxlen=reaction_delay)
 
-    def process(self, engine: GameEngine, my_player_index: int, opponent_index: int) -> ActionType:
-        if not self.model:
-            return ActionType.IDLE
-
+    def observe(self, engine: GameEngine, my_player_index: int, opponent_index: int) -> np.ndarray:
+        """Record this tick's observation and return the (reaction-delayed) one to act on."""
         # Construct Observation matching Gym Env
-        eng = engine.state
+        eng = engine.core
         p1 = eng.fencers[opponent_index] # Opponent (usually P1 if AI is P2)
         p2 = eng.fencers[my_player_index] # AI (usually P2)
         
@@ -46,15 +74,20 @@ class TrainedAI:
         # Real P2 Pos = 12.0 -> Virtual P1 Pos = 14.0 - 12.0 = 2.0 (Matches training)
         # Real P1 Pos = 2.0  -> Virtual P2 Pos = 14.0 - 2.0 = 12.0 (Matches training)
         
-        my_virtual_pos = 14.0 - p2.position
-        op_virtual_pos = 14.0 - p1.position
+        # Playing as Player 1 (e.g. AI-vs-AI tournaments) needs no mirroring.
+        if my_player_index == 1:
+            my_virtual_pos = 14.0 - p2.position
+            op_virtual_pos = 14.0 - p1.position
+        else:
+            my_virtual_pos = p2.position
+            op_virtual_pos = p1.position
         
         current_obs = np.array([
             eng.distance,
             my_virtual_pos,   # My Virtual Pos (looks like P1)
             op_virtual_pos,   # Op Virtual Pos (looks like P2)
-            self.state_map.get(p2.state, 0), # My State
-            self.state_map.get(p1.state, 0), # Op State
+            p2.state,         # My State (state code)
+            p1.state,         # Op State
             p2.score,         # My Score
             p1.score          # Op Score
         ], dtype=np.float32)
@@ -65,18 +98,15 @@ class TrainedAI:
         # If buffer isn't full yet (start of game), just use current
         # But effectively we want the "delayed" obs which is at the LEFT of the deque
         if len(self.obs_buffer) < self.reaction_delay:
-             delayed_obs = current_obs
-        else:
-             delayed_obs = self.obs_buffer[0] # The oldest observation
-        
+             return current_obs
+        return self.obs_buffer[0] # The oldest observation
+
+    def process(self, engine: GameEngine, my_player_index: int, opponent_index: int) -> ActionType:
+        if not self.model:
+            return ActionType.IDLE
+
+        delayed_obs = self.observe(engine, my_player_index, opponent_index)
         action_idx, _ = self.model.predict(delayed_obs, deterministic=True)
         
         # Map back to ActionType
-        act_map = {
-            0: ActionType.IDLE,
-            1: ActionType.STEP_FORWARD,
-            2: ActionType.STEP_BACK,
-            3: ActionType.THRUST,
-            4: ActionType.LUNGE
-        }
-        return act_map.get(int(action_idx), ActionType.IDLE)
+        return ACT_MAP.get(int(action_idx), ActionType.IDLE)
@@ -0,0 +1,293 @@
+"""
+Gateway mode: shard rooms across a pool of worker processes.
+
+    uvicorn app.gateway:app --host 0.0.0.0 --port 8000
+
+The game state lives in the globals of app/ws.py, so a single server process
+holds every room. The gateway instead spawns FTG_WORKERS (default: one per core)
+ordinary servers (app.main:app) on loopback ports, pins each room to one worker
+the first time someone joins it and forwards the /ws traffic of that room to it.
+New rooms go to the worker with the lowest projected frame cost, from the /load
+report every worker is polled for (FTG_GATEWAY_POLL seconds).
+
+GET /workers reports the pool, the placements and each worker's last load.
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.staticfiles import StaticFiles
+from fastapi.responses import RedirectResponse
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed, InvalidHandshake
+
+WORKER_HOST = "127.0.0.1"
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Seconds before a worker that died is started again; doubles while it keeps dying before its first /load
+RESTART_BACKOFF = 0.5
+MAX_RESTART_BACKOFF = 30.0
+
+
+def _listen_socket() -> socket.socket:
+    # Bound here and handed to every process of the worker (uvicorn --fd): the port is
+    # never free between choosing it and the worker binding it, and survives restarts
+    sock = socket.socket()
+    sock.bind((WORKER_HOST, 0))
+    sock.set_inheritable(True)
+    return sock
+
+
+class Worker:
+    """One app.main:app process on a loopback port (the same port across restarts)."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.socket = _listen_socket()
+        self.port = self.socket.getsockname()[1]
+        self.process: Optional[subprocess.Popen] = None
+        self.healthy = False
+        self.load: dict = {}
+        self.rooms: Dict[str, int] = {}  # rooms pinned here -> gateway connections in the room
+        self.restarts = 0
+        self.backoff = RESTART_BACKOFF
+        self.restart_at = 0.0  # monotonic time before which a dead worker is not started again
+
+    @property
+    def url(self) -> str:
+        return f"http://{WORKER_HOST}:{self.port}"
+
+    def spawn(self):
+        self.healthy = False
+        self.load = {}
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app",
+             "--fd", str(self.socket.fileno()), "--log-level", "warning"],
+            cwd=APP_DIR,
+            pass_fds=(self.socket.fileno(),),
+        )
+        print(f"Worker {self.index} started on port {self.port} (pid {self.process.pid})")
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def poll_load(self, timeout: float = 1.0) -> dict:
+        # Blocking; called through asyncio.to_thread
+        with urllib.request.urlopen(self.url + "/load", timeout=timeout) as response:
+            return json.loads(response.read())
+
+    def projected_cost(self, room_cost: float) -> float:
+        """Reported frame cost plus an estimate for rooms placed here since the last report."""
+        unreported = max(0, len(self.rooms) - self.load.get("rooms", 0))
+        return self.load.get("frame_recent_us", 0.0) + unreported * room_cost
+
+    def stop(self):
+        if self.alive:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.socket.close()
+
+    def report(self) -> dict:
+        return {
+            "port": self.port,
+            "pid": self.process.pid if self.process else None,
+            "healthy": self.healthy,
+            "restarts": self.restarts,
+            "restart_backoff": self.backoff,
+            "rooms": dict(self.rooms),
+            "load": self.load,
+        }
+
+
+class Gateway:
+    def __init__(self, num_workers: int, poll_interval: float = 0.5):
+        self.workers: List[Worker] = [Worker(i) for i in range(num_workers)]
+        self.poll_interval = poll_interval
+        self.placements: Dict[str, Worker] = {}
+        self._poller = None
+
+    async def start(self, startup_timeout: float = 60.0):
+        for worker in self.workers:
+            worker.spawn()
+        deadline = time.monotonic() + startup_timeout
+        while not all(worker.healthy for worker in self.workers):
+            if time.monotonic() > deadline:
+                raise RuntimeError("workers did not become healthy in time")
+            await self.poll()
+            await asyncio.sleep(0.1)
+        self._poller = asyncio.create_task(self._poll_loop())
+
+    async def stop(self):
+        if self._poller is not None:
+            self._poller.cancel()
+        for worker in self.workers:
+            worker.stop()
+
+    async def poll(self):
+        await asyncio.gather(*(self._poll_worker(worker) for worker in self.workers))
+
+    async def _poll_worker(self, worker: Worker):
+        if not worker.alive:
+            if worker.process is not None:
+                self._worker_lost(worker)
+            return
+        try:
+            worker.load = await asyncio.to_thread(worker.poll_load)
+            worker.healthy = True
+            worker.backoff = RESTART_BACKOFF  # up and serving: the next crash restarts right away
+        except Exception:
+            pass  # Still starting up, or busy; keep the last report
+
+    def _worker_lost(self, worker: Worker):
+        # Also covers a worker that dies while starting up, before it was ever healthy
+        worker.healthy = False
+        for room_id in worker.rooms:
+            self.placements.pop(room_id, None)
+        worker.rooms.clear()
+        now = time.monotonic()
+        if now < worker.restart_at:
+            return  # died again soon after the last restart: wait out the backoff
+        print(f"Worker {worker.index} exited (code {worker.process.returncode}), restarting")
+        worker.restarts += 1
+        worker.restart_at = now + worker.backoff
+        worker.backoff = min(worker.backoff * 2, MAX_RESTART_BACKOFF)
+        worker.spawn()
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self.poll()
+
+    def _room_cost(self) -> float:
+        # Mean reported per-room frame cost across the pool, for rooms not yet in a report
+        rooms = sum(worker.load.get("rooms", 0) for worker in self.workers)
+        cost = sum(worker.load.get("frame_recent_us", 0.0) for worker in self.workers)
+        return cost / rooms if rooms else 0.0
+
+    def acquire(self, room_id: str) -> Optional[Worker]:
+        """Worker that hosts room_id, placing the room on the least-loaded worker if it is new."""
+        worker = self.placements.get(room_id)
+        if worker is None:
+            candidates = [w for w in self.workers if w.healthy]
+            if not candidates:
+                return None
+            room_cost = self._room_cost()
+            worker = min(candidates, key=lambda w: (w.projected_cost(room_cost), len(w.rooms)))
+            self.placements[room_id] = worker
+        worker.rooms[room_id] = worker.rooms.get(room_id, 0) + 1
+        return worker
+
+    def release(self, room_id: str, worker: Worker):
+        count = worker.rooms.get(room_id, 0) - 1
+        if count > 0:
+            worker.rooms[room_id] = count
+            return
+        # Last connection gone: the worker closes the room too, so it may be placed anew
+        worker.rooms.pop(room_id, None)
+        if self.placements.get(room_id) is worker:
+            del self.placements[room_id]
+
+    def report(self) -> dict:
+        return {
+            "workers": [worker.report() for worker in self.workers],
+            "placements": {room_id: worker.index for room_id, worker in self.placements.items()},
+        }
+
+
+gateway = Gateway(
+    num_workers=int(os.environ.get("FTG_WORKERS", os.cpu_count() or 1)),
+    poll_interval=float(os.environ.get("FTG_GATEWAY_POLL", "0.5")),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await gateway.start()
+    try:
+        yield
+    finally:
+        await gateway.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def _client_to_worker(websocket: WebSocket, upstream):
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+        if message.get("bytes") is not None:
+            await upstream.send(message["bytes"])
+        elif message.get("text") is not None:
+            await upstream.send(message["text"])
+
+
+async def _worker_to_client(websocket: WebSocket, upstream):
+    try:
+        async for message in upstream:
+            if isinstance(message, bytes):
+                await websocket.send_bytes(message)
+            else:
+                await websocket.send_text(message)
+    except ConnectionClosed:
+        pass
+    # Pass the worker's close code on (e.g. "Room full", "Too slow")
+    try:
+        await websocket.close(code=upstream.close_code or 1000, reason=upstream.close_reason or "")
+    except RuntimeError:
+        pass  # Client already gone
+
+
+@app.websocket("/ws")
+async def websocket_proxy(websocket: WebSocket):
+    room_id = websocket.query_params.get("room", "default")
+    worker = gateway.acquire(room_id)
+    if worker is None:
+        await websocket.close(code=1013, reason="No worker available")
+        return
+    try:
+        url = f"ws://{WORKER_HOST}:{worker.port}/ws?{websocket.url.query}"
+        try:
+            upstream = await connect(url, max_size=None, compression=None)
+        except (OSError, InvalidHandshake):
+            # Worker rejected the query (invalid room/proto) or is down
+            await websocket.close()
+            return
+        async with upstream:
+            await websocket.accept()
+            pumps = [
+                asyncio.create_task(_client_to_worker(websocket, upstream)),
+                asyncio.create_task(_worker_to_client(websocket, upstream)),
+            ]
+            done, pending = await asyncio.wait(pumps, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            for task in done:
+                if not task.cancelled() and task.exception() is not None and \
+                        not isinstance(task.exception(), (WebSocketDisconnect, ConnectionClosed)):
+                    print(f"Proxy error in room {room_id}: {task.exception()!r}")
+    finally:
+        gateway.release(room_id, worker)
+
+
+@app.get("/workers")
+async def workers_report():
+    return gateway.report()
+
+
+app.mount("/static", StaticFiles(directory=os.path.join(APP_DIR, "static")), name="static")
+
+@app.get("/")
+async def get():
+    return RedirectResponse(url="/static/index.html")
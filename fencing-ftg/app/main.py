@@ -1,9 +1,16 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import RedirectResponse
 from .ws import router as ws_router
+from .game import profiling
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    profiling.dump()  # phase profiles of rooms profiled via POST /rooms/<id>/profile
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(ws_router)
 
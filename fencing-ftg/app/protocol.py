@@ -0,0 +1,314 @@
+"""
+Wire formats for GameState snapshots.
+
+Clients pick a format with /ws?proto=bin|json (json is the default):
+
+* json: the GameState.model_dump(mode="json") object, as before.
+* bin:  little-endian packed frames.
+    KEYFRAME  u8 type=1, u32 seq, then every field of FIELDS in order
+    DELTA     u8 type=2, u32 seq, u32 base_seq, u32 changed-field mask,
+              then only the changed fields (in FIELDS order)
+    HEARTBEAT u8 type=3, u32 seq: nothing changed since frame seq
+  A delta applies to the state of frame base_seq; a client that missed a frame
+  is sent a keyframe instead (see SnapshotEncoder / Snapshot.binary_for).
+
+Each tick is encoded at most once per format, however many clients are connected.
+Rooms only publish frames whose state changed (SnapshotEncoder.encode_changed);
+in between, a Heartbeat keeps idle connections alive (json: the last state again).
+
+Player inputs (client -> server), either format whatever proto the client picked:
+
+* json text: {"action": "STEP_FORWARD", "tick": <tick_count shown when pressed, optional>},
+  {"action": "SET_MODE", "value": "PVP"} or {"action": "RESTART"}.
+* binary:    INPUT u8 type=4, u32 tick (NO_TICK = not stamped), u8 action code (ACTION_TYPES order)
+"""
+import json
+import struct
+import time
+from typing import Optional, Tuple
+from .game.models import GameState, GameCore, ActionType, ACTION_TYPES, FENCER_STATES, ACTION_CODES, STATE_CODES
+from .game.batched_engine import EVENTS, EVENT_CODES, NO_WINNER
+from .game.metrics import REGISTRY, SAMPLING
+
+FORMAT_JSON = "json"
+FORMAT_BINARY = "bin"
+FORMATS = (FORMAT_JSON, FORMAT_BINARY)
+
+MSG_KEYFRAME = 1
+MSG_DELTA = 2
+MSG_HEARTBEAT = 3
+MSG_INPUT = 4
+
+NO_TICK = 0xFFFFFFFF
+
+# (name, struct code) of the flattened GameState, fencer fields repeated for P1 and P2
+STATE_FIELDS = (
+    ("tick_count", "I"),
+    ("distance", "d"),
+    ("game_over", "?"),
+    ("winner", "b"),
+    ("last_event", "B"),
+)
+FENCER_FIELDS = (
+    ("id", "B"),
+    ("score", "H"),
+    ("position", "d"),
+    ("state", "B"),
+    ("state_timer", "H"),
+    ("last_action", "B"),
+    ("move_speed", "d"),
+    ("lunge_speed", "d"),
+    ("reach", "d"),
+)
+FIELDS = STATE_FIELDS + FENCER_FIELDS + FENCER_FIELDS
+NUM_STATE_FIELDS = len(STATE_FIELDS)
+NUM_FENCER_FIELDS = len(FENCER_FIELDS)
+
+_HEADER = struct.Struct("<BI")
+_DELTA_HEADER = struct.Struct("<BIII")
+_KEYFRAME = struct.Struct("<BI" + "".join(code for _, code in FIELDS))
+_INPUT = struct.Struct("<BIB")
+_delta_structs = {}
+
+# Each encoding is built once per published frame (the first client that needs it pays); timed on sampled frames
+_SERIALIZE_HELP = "Encoding one snapshot, per wire format (sampled frames)"
+KEYFRAME_SECONDS = REGISTRY.histogram("ftg_serialize_seconds", _SERIALIZE_HELP, {"format": "keyframe"})
+DELTA_SECONDS = REGISTRY.histogram("ftg_serialize_seconds", _SERIALIZE_HELP, {"format": "delta"})
+JSON_SECONDS = REGISTRY.histogram("ftg_serialize_seconds", _SERIALIZE_HELP, {"format": "json"})
+
+
+def _delta_struct(mask: int) -> struct.Struct:
+    packer = _delta_structs.get(mask)
+    if packer is None:
+        codes = "".join(code for i, (_, code) in enumerate(FIELDS) if mask >> i & 1)
+        packer = _delta_structs[mask] = struct.Struct("<BIII" + codes)
+    return packer
+
+
+def flatten(state: GameState) -> tuple:
+    """GameState -> tuple of wire values in FIELDS order."""
+    f1, f2 = state.fencers
+    return (
+        state.tick_count,
+        state.distance,
+        state.game_over,
+        NO_WINNER if state.winner is None else state.winner,
+        EVENT_CODES[state.last_event],
+        f1.id, f1.score, f1.position, STATE_CODES[f1.state], f1.state_timer, ACTION_CODES[f1.last_action],
+        f1.move_speed, f1.lunge_speed, f1.reach,
+        f2.id, f2.score, f2.position, STATE_CODES[f2.state], f2.state_timer, ACTION_CODES[f2.last_action],
+        f2.move_speed, f2.lunge_speed, f2.reach,
+    )
+
+
+def flatten_core(core: GameCore) -> tuple:
+    """GameEngine.core -> the same tuple as flatten(engine.state), without building the Pydantic state."""
+    f1, f2 = core.fencers
+    return (
+        core.tick_count,
+        core.distance,
+        core.game_over,
+        NO_WINNER if core.winner is None else core.winner,
+        EVENT_CODES[core.last_event],
+        f1.id, f1.score, f1.position, f1.state, f1.state_timer, f1.last_action,
+        f1.move_speed, f1.lunge_speed, f1.reach,
+        f2.id, f2.score, f2.position, f2.state, f2.state_timer, f2.last_action,
+        f2.move_speed, f2.lunge_speed, f2.reach,
+    )
+
+
+def unflatten(values) -> dict:
+    """Wire values -> the same dict as GameState.model_dump(mode="json")."""
+    fencers = []
+    for i in range(2):
+        base = NUM_STATE_FIELDS + i * NUM_FENCER_FIELDS
+        fencer = dict(zip((name for name, _ in FENCER_FIELDS), values[base:base + NUM_FENCER_FIELDS]))
+        fencer["state"] = FENCER_STATES[fencer["state"]].value
+        fencer["last_action"] = ACTION_TYPES[fencer["last_action"]].value
+        fencers.append(fencer)
+    winner = values[3]
+    return {
+        "tick_count": values[0],
+        "fencers": fencers,
+        "distance": values[1],
+        "game_over": values[2],
+        "winner": None if winner == NO_WINNER else winner,
+        "last_event": EVENTS[values[4]],
+    }
+
+
+class Snapshot:
+    """One published tick. Each encoding is built lazily and cached, so it costs one encode per tick."""
+    __slots__ = ("seq", "values", "base_values", "_keyframe", "_delta", "_json")
+
+    def __init__(self, seq: int, values: tuple, base_values: Optional[tuple]):
+        self.seq = seq
+        self.values = values
+        self.base_values = base_values  # None -> no delta for this tick (forced keyframe)
+        self._keyframe = None
+        self._delta = None
+        self._json = None
+
+    @property
+    def keyframe(self) -> bytes:
+        if self._keyframe is None:
+            start = time.perf_counter() if SAMPLING.on else None
+            self._keyframe = _KEYFRAME.pack(MSG_KEYFRAME, self.seq, *self.values)
+            if start is not None:
+                KEYFRAME_SECONDS.observe(time.perf_counter() - start)
+        return self._keyframe
+
+    @property
+    def delta(self) -> Optional[bytes]:
+        if self.base_values is None:
+            return None
+        if self._delta is None:
+            start = time.perf_counter() if SAMPLING.on else None
+            mask = 0
+            changed = []
+            for i, (old, new) in enumerate(zip(self.base_values, self.values)):
+                if old != new:
+                    mask |= 1 << i
+                    changed.append(new)
+            self._delta = _delta_struct(mask).pack(MSG_DELTA, self.seq, self.seq - 1, mask, *changed)
+            if start is not None:
+                DELTA_SECONDS.observe(time.perf_counter() - start)
+        return self._delta
+
+    @property
+    def json(self) -> str:
+        if self._json is None:
+            # Same text as WebSocket.send_json(state.model_dump(mode="json")) would produce.
+            # Built from the frozen wire values: the engine keeps mutating its GameState.
+            start = time.perf_counter() if SAMPLING.on else None
+            self._json = json.dumps(unflatten(self.values), separators=(",", ":"), ensure_ascii=False)
+            if start is not None:
+                JSON_SECONDS.observe(time.perf_counter() - start)
+        return self._json
+
+    def binary_for(self, last_seq: Optional[int]) -> bytes:
+        """Delta if the client holds the previous frame, keyframe otherwise."""
+        if last_seq == self.seq - 1:
+            delta = self.delta
+            if delta is not None:
+                return delta
+        return self.keyframe
+
+
+class Heartbeat:
+    """Stands in for an unchanged frame: sent as-is to clients that hold `snapshot`, as its keyframe otherwise."""
+    __slots__ = ("snapshot", "seq", "_bytes")
+
+    def __init__(self, snapshot: Snapshot):
+        self.snapshot = snapshot
+        self.seq = snapshot.seq
+        self._bytes = _HEADER.pack(MSG_HEARTBEAT, snapshot.seq)
+
+    @property
+    def json(self) -> str:
+        return self.snapshot.json
+
+    def binary_for(self, last_seq: Optional[int]) -> bytes:
+        return self._bytes if last_seq == self.seq else self.snapshot.keyframe
+
+
+class SnapshotEncoder:
+    """Turns the room's GameState into a Snapshot per tick (one per room, shared by all clients)."""
+
+    def __init__(self, keyframe_interval: int = 60):
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self.last: Optional[Snapshot] = None
+        self._last_values = None
+        self._heartbeat: Optional[Heartbeat] = None
+
+    def encode(self, state: GameState) -> Snapshot:
+        return self.encode_values(flatten(state))
+
+    def encode_core(self, core: GameCore) -> Snapshot:
+        return self.encode_values(flatten_core(core))
+
+    def encode_values(self, values: tuple) -> Snapshot:
+        self.seq += 1
+        base = self._last_values
+        if self.seq % self.keyframe_interval == 0:
+            base = None  # periodic keyframe for everyone
+        self._last_values = values
+        self.last = Snapshot(self.seq, values, base)
+        return self.last
+
+    def encode_changed(self, values: tuple, skip_fields: int = 0) -> Optional[Snapshot]:
+        """
+        encode_values(), or None if values equal the last frame's (nothing new to send;
+        the seq is not advanced, so later deltas still chain). The first skip_fields
+        fields (e.g. 1 = tick_count) don't count as a change on their own.
+        """
+        last = self._last_values
+        if last is not None and values[skip_fields:] == last[skip_fields:]:
+            return None
+        return self.encode_values(values)
+
+    def heartbeat(self) -> Optional[Heartbeat]:
+        """Heartbeat for the last frame (one object per frame, shared by all clients)."""
+        if self.last is None:
+            return None
+        if self._heartbeat is None or self._heartbeat.snapshot is not self.last:
+            self._heartbeat = Heartbeat(self.last)
+        return self._heartbeat
+
+
+class SnapshotDecoder:
+    """Client side of the binary format (used by tools and benchmarks; the browser has its own copy)."""
+
+    def __init__(self):
+        self.seq = None
+        self.values = None
+
+    def decode(self, data: bytes) -> Optional[dict]:
+        """The state carried by a frame, or None for a heartbeat (state unchanged)."""
+        msg_type, seq = _HEADER.unpack_from(data)
+        if msg_type == MSG_HEARTBEAT:
+            if seq != self.seq:
+                raise ValueError(f"heartbeat for frame {seq}, have {self.seq}")
+            return None
+        if msg_type == MSG_KEYFRAME:
+            self.values = list(_KEYFRAME.unpack(data)[2:])
+        elif msg_type == MSG_DELTA:
+            _, _, base_seq, mask = _DELTA_HEADER.unpack_from(data)
+            if base_seq != self.seq:
+                raise ValueError(f"delta for frame {base_seq}, have {self.seq}")
+            changed = iter(_delta_struct(mask).unpack(data)[4:])
+            for i in range(len(FIELDS)):
+                if mask >> i & 1:
+                    self.values[i] = next(changed)
+        else:
+            raise ValueError(f"unknown message type {msg_type}")
+        self.seq = seq
+        return unflatten(self.values)
+
+
+def encode_input(action: ActionType, tick: Optional[int] = None) -> bytes:
+    return _INPUT.pack(MSG_INPUT, NO_TICK if tick is None else tick, ACTION_CODES[action])
+
+
+def decode_input(data: bytes) -> Tuple[ActionType, Optional[int]]:
+    """Binary INPUT message -> (action, stamped tick or None); ValueError if malformed."""
+    if len(data) != _INPUT.size:
+        raise ValueError(f"input message is {len(data)} bytes, expected {_INPUT.size}")
+    msg_type, tick, code = _INPUT.unpack(data)
+    if msg_type != MSG_INPUT:
+        raise ValueError(f"unknown input message type {msg_type}")
+    if code >= len(ACTION_TYPES):
+        raise ValueError(f"unknown action code {code}")
+    return ACTION_TYPES[code], None if tick == NO_TICK else tick
+
+
+def decode_json_input(text: str) -> Tuple[str, Optional[str], Optional[int]]:
+    """JSON input message -> (action, value, stamped tick or None); ValueError if malformed."""
+    msg = json.loads(text)
+    if not isinstance(msg, dict) or not isinstance(msg.get("action"), str):
+        raise ValueError("input message needs an \"action\" string")
+    tick = msg.get("tick")
+    value = msg.get("value")
+    return (msg["action"], value if isinstance(value, str) else None,
+            tick if isinstance(tick, int) and not isinstance(tick, bool) and tick >= 0 else None)
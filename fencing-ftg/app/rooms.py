@@ -0,0 +1,310 @@
+import asyncio
+from typing import Dict, Iterator, Optional, Set
+from fastapi import WebSocket
+from .game.service import GameService
+from .game.scheduler import TickScheduler
+from .game.inference import InferenceBroker
+from .game import profiling
+from .protocol import SnapshotEncoder, Snapshot, Heartbeat, FORMAT_JSON, flatten_core
+from .connections import Client
+
+MAX_PLAYERS = 2
+SPECTATOR_RATES = (60, 30, 10)  # Hz a spectator can ask for
+
+
+# Connection manager for one room (P1 vs P2)
+class ConnectionManager:
+    def __init__(self):
+        self.players: Dict[int, Client] = {}
+
+    @property
+    def active_connections(self) -> list:
+        return list(self.players.values())
+
+    async def connect(self, websocket: WebSocket, fmt: str = FORMAT_JSON) -> Optional[int]:
+        """Accept the socket and give it the lowest free player slot, or close it if the room is full."""
+        await websocket.accept()
+        for player_id in range(MAX_PLAYERS):
+            if player_id not in self.players:
+                self.players[player_id] = Client(websocket, fmt)
+                return player_id
+        await websocket.close(code=1000, reason="Room full")
+        return None
+
+    def disconnect(self, player_id: int):
+        client = self.players.pop(player_id, None)
+        if client is not None:
+            client.close("disconnected")
+
+    def broadcast(self, snapshot: Snapshot):
+        # Non-blocking: each client's writer task does the actual send
+        for connection in self.active_connections:
+            connection.offer(snapshot)
+
+    def refresh(self, heartbeat: Heartbeat, keepalive: bool):
+        """Unchanged frame: heartbeat everyone on keepalive, otherwise only clients missing the last frame."""
+        for connection in self.active_connections:
+            if keepalive or (connection.last_seq != heartbeat.seq and connection.idle):
+                connection.offer(heartbeat)
+
+    def report(self) -> dict:
+        return {player_id: client.report() for player_id, client in self.players.items()}
+
+
+class SpectatorHub:
+    """
+    Pub/sub fan-out of a room's snapshots to spectators (no player slot, no input).
+
+    Spectators get the same Snapshot objects as the players, so every encoding is
+    still built once per tick however many watch. Each one subscribes at 60, 30
+    or 10 Hz and is a Client: a newer frame replaces one it has not sent yet.
+    publish() only keeps the latest snapshot; the fan-out runs in a callback after
+    the players' writers have sent the frame, so watchers don't add to the
+    players' tick or delivery.
+    """
+
+    def __init__(self, frame_rate: int = 60, max_subscribers: int = 500):
+        self.frame_rate = frame_rate
+        self.max_subscribers = max_subscribers
+        self.groups: Dict[int, Set[Client]] = {}  # frame interval -> subscribers
+        self._next_seq: Dict[int, int] = {}       # frame interval -> first seq the group is due again
+        self._sent_seq: Dict[int, int] = {}       # frame interval -> last seq offered to the group
+        self.last: Optional[Snapshot] = None      # last frame published, for new subscribers
+        self._latest = None                       # Snapshot or Heartbeat waiting for the fan-out
+        self._keepalive = False
+        self._scheduled = False
+        self.evicted = 0
+
+    @property
+    def count(self) -> int:
+        return sum(len(clients) for clients in self.groups.values())
+
+    async def subscribe(self, websocket: WebSocket, fmt: str = FORMAT_JSON, rate: int = 60) -> Optional[Client]:
+        await websocket.accept()
+        if self.count >= self.max_subscribers:
+            await websocket.close(code=1000, reason="Too many spectators")
+            return None
+        interval = max(1, self.frame_rate // rate)
+        client = Client(websocket, fmt)
+        self.groups.setdefault(interval, set()).add(client)
+        self._next_seq.setdefault(interval, 0)
+        self._sent_seq.setdefault(interval, 0)
+        if self.last is not None:
+            client.offer(self.last)  # current state right away, even if the room is idle
+        return client
+
+    def unsubscribe(self, client: Client):
+        client.close("disconnected")
+        for interval, clients in list(self.groups.items()):
+            clients.discard(client)
+            if not clients:
+                del self.groups[interval]
+                del self._next_seq[interval]
+                del self._sent_seq[interval]
+
+    def publish(self, snapshot: Snapshot):
+        self.last = snapshot
+        if self.groups:
+            self._schedule(snapshot, False)
+
+    def refresh(self, heartbeat: Heartbeat, keepalive: bool):
+        """Unchanged frame: heartbeat everyone on keepalive, otherwise only groups that skipped the last frame."""
+        if keepalive or any(seq != heartbeat.seq for seq in self._sent_seq.values()):
+            if not isinstance(self._latest, Snapshot):  # never replace a frame not fanned out yet
+                self._schedule(heartbeat, keepalive)
+
+    def _schedule(self, item, keepalive: bool):
+        self._latest = item
+        self._keepalive = keepalive
+        if not self._scheduled:
+            self._scheduled = True
+            asyncio.get_running_loop().call_soon(self._defer_fan_out)
+
+    def _defer_fan_out(self):
+        # One more loop pass: a player's writer (woken in broadcast) needs two passes to
+        # reach its send (wake-up, then the wait_for task), and should go first
+        asyncio.get_running_loop().call_soon(self._fan_out)
+
+    def _fan_out(self):
+        self._scheduled = False
+        snapshot = self._latest
+        self._latest = None
+        if snapshot is None:
+            return
+        heartbeat = isinstance(snapshot, Heartbeat)
+        for interval, clients in self.groups.items():
+            if heartbeat:
+                if not self._keepalive and self._sent_seq[interval] == snapshot.seq:
+                    continue  # already has the last frame
+            elif snapshot.seq < self._next_seq[interval]:
+                continue  # decimated stream: not due yet
+            else:
+                self._next_seq[interval] = snapshot.seq + interval
+            self._sent_seq[interval] = snapshot.seq
+            gone = []
+            for client in clients:
+                client.offer(snapshot)
+                if client.closed:
+                    gone.append(client)  # evicted for lagging; its socket is being closed
+            if gone:
+                self.evicted += len(gone)
+                clients.difference_update(gone)
+
+    def report(self) -> dict:
+        clients = [client for group in self.groups.values() for client in group]
+        return {
+            "count": len(clients),
+            "by_rate": {self.frame_rate // interval: len(group) for interval, group in self.groups.items()},
+            "sent": sum(client.sent for client in clients),
+            "dropped": sum(client.dropped for client in clients),
+            "evicted": self.evicted,
+        }
+
+
+class Room:
+    """
+    One bout and its connections. publish() only sends frames whose state changed
+    (not during the freeze after a touch, after game over, or while only tick_count
+    moves); in between, clients get a Heartbeat every keepalive_frames frames (0 = never).
+    With rollback every tick_count change is sent, since clients stamp inputs with it.
+    """
+
+    def __init__(self, room_id: str, broker: Optional[InferenceBroker] = None, replay_dir: Optional[str] = None,
+                 rollback_frames: int = 0, max_spectators: int = 500, keepalive_frames: int = 60):
+        self.room_id = room_id
+        self.service = GameService(broker, replay_dir, rollback_frames)
+        self.manager = ConnectionManager()
+        self.spectators = SpectatorHub(self.service.engine.config.tick_rate, max_spectators)
+        self.encoder = SnapshotEncoder()
+        self.keepalive_frames = keepalive_frames
+        self._skip_fields = 0 if rollback_frames else 1  # tick_count alone is not a change
+        self.idle_frames = 0  # consecutive unchanged frames
+        self.skipped = 0
+
+    @property
+    def empty(self) -> bool:
+        return not self.manager.players and not self.spectators.count
+
+    def prepare(self):
+        self.service.prepare()
+
+    def tick(self):
+        self.service.tick()
+
+    def publish(self):
+        # Encoded once here; every client and spectator reuses the same bytes/text
+        snapshot = self.encoder.encode_changed(flatten_core(self.service.engine.core), self._skip_fields)
+        if snapshot is not None:
+            self.idle_frames = 0
+            self.manager.broadcast(snapshot)
+            self.spectators.publish(snapshot)
+            return
+        self.idle_frames += 1
+        self.skipped += 1
+        heartbeat = self.encoder.heartbeat()
+        if heartbeat is not None:
+            keepalive = self.keepalive_frames > 0 and self.idle_frames % self.keepalive_frames == 0
+            self.manager.refresh(heartbeat, keepalive)
+            self.spectators.refresh(heartbeat, keepalive)
+
+    def report(self) -> dict:
+        return {"frames": self.encoder.seq, "skipped": self.skipped}
+
+
+class Lobby:
+    """Creates rooms on first join, tears them down when the last player or spectator leaves."""
+
+    def __init__(self, scheduler: TickScheduler, replay_dir: Optional[str] = None, rollback_frames: int = 0,
+                 max_spectators: int = 500, keepalive_frames: int = 60):
+        self.scheduler = scheduler
+        self.replay_dir = replay_dir
+        self.rollback_frames = rollback_frames
+        self.max_spectators = max_spectators
+        self.keepalive_frames = keepalive_frames
+        self.rooms: Dict[str, Room] = {}
+
+    def get_or_create(self, room_id: str) -> Room:
+        room = self.rooms.get(room_id)
+        if room is None:
+            room = Room(room_id, self.scheduler.broker, self.replay_dir, self.rollback_frames, self.max_spectators,
+                        self.keepalive_frames)
+            self.rooms[room_id] = room
+            print(f"Room {room_id} created ({len(self.rooms)} active)")
+        return room
+
+    async def join(self, room_id: str, websocket: WebSocket, fmt: str = FORMAT_JSON):
+        """Returns (room, player_id); player_id is None if the room was full."""
+        room = self.get_or_create(room_id)
+        player_id = await room.manager.connect(websocket, fmt)
+        if player_id is None:
+            self.release(room)
+        elif room_id not in self.scheduler.rooms:
+            self.scheduler.add(room_id, room)
+        return room, player_id
+
+    def leave(self, room: Room, player_id: int):
+        room.manager.disconnect(player_id)
+        room.service.inputs.pop(player_id, None)  # don't leave a held key behind
+        room.service.input_queue.clear(player_id)
+        self.release(room)
+
+    async def watch(self, room_id: str, websocket: WebSocket, fmt: str = FORMAT_JSON, rate: int = 60):
+        """Returns (room, spectator client); the client is None if the room has too many spectators."""
+        room = self.get_or_create(room_id)
+        client = await room.spectators.subscribe(websocket, fmt, rate)
+        if client is None:
+            self.release(room)
+        elif room_id not in self.scheduler.rooms:
+            self.scheduler.add(room_id, room)
+        return room, client
+
+    def unwatch(self, room: Room, client: Client):
+        room.spectators.unsubscribe(client)
+        self.release(room)
+
+    def set_profiling(self, room_id: str, enabled: bool) -> bool:
+        """Start/stop the process_tick phase profile of one room; False if there is no such room."""
+        room = self.rooms.get(room_id)
+        if room is None:
+            return False
+        engine = room.service.engine
+        if enabled:
+            engine.enable_profiling(profiling.get_profile(room_id))
+        else:
+            engine.disable_profiling()
+        return True
+
+    def clients(self, spectators: bool = False) -> Iterator[Client]:
+        """Every player connection (or every spectator connection) in every room."""
+        for room in list(self.rooms.values()):
+            if spectators:
+                for group in list(room.spectators.groups.values()):
+                    yield from list(group)
+            else:
+                yield from list(room.manager.players.values())
+
+    def pending_inputs(self) -> int:
+        return sum(len(inputs.pending) for room in list(self.rooms.values())
+                   for inputs in room.service.input_queue.players.values())
+
+    def report(self) -> dict:
+        return {room_id: room.manager.report() for room_id, room in self.rooms.items()}
+
+    def input_report(self) -> dict:
+        return {room_id: room.service.input_queue.report() for room_id, room in self.rooms.items()}
+
+    def publish_report(self) -> dict:
+        return {room_id: room.report() for room_id, room in self.rooms.items()}
+
+    def spectator_report(self) -> dict:
+        return {room_id: room.spectators.report() for room_id, room in self.rooms.items() if room.spectators.count}
+
+    def rollback_report(self) -> dict:
+        return {room_id: room.service.rollback.report() for room_id, room in self.rooms.items()
+                if room.service.rollback is not None}
+
+    def release(self, room: Room):
+        if room.empty and self.rooms.get(room.room_id) is room:
+            del self.rooms[room.room_id]
+            self.scheduler.remove(room.room_id)
+            print(f"Room {room.room_id} closed ({len(self.rooms)} active)")
@@ -1,70 +1,203 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from .game.service import GameService
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from .game.models import ActionType
-import json
+from .game.scheduler import TickScheduler, CATCH_UP
+from .game.inference import InferenceBroker
+from .game.trained_ai import load_model_in_background
+from .game.metrics import REGISTRY
+from .game import profiling
+from .game.sampler import StackSampler, AllocationTrace
+from .rooms import Lobby, SPECTATOR_RATES
+from .protocol import FORMAT_JSON, decode_input, decode_json_input
+from typing import Optional
 import asyncio
+import hmac
+import os
+import threading
 
 router = APIRouter()
-game_service = GameService()
+# FTG_TICK_POLICY=catch_up|drop, FTG_MAX_CATCH_UP=<ticks>: what to do with ticks missed under load
+# FTG_AI_BUDGET_MS: per-tick latency budget of the batched PVE policy inference.
+# The model loads in the background so the server accepts connections right away (SimpleAI until then).
+broker = InferenceBroker(latency_budget=float(os.environ.get("FTG_AI_BUDGET_MS", "4")) / 1000)
+load_model_in_background(on_loaded=broker.set_model)
+scheduler = TickScheduler(
+    policy=os.environ.get("FTG_TICK_POLICY", CATCH_UP),
+    max_catch_up=int(os.environ.get("FTG_MAX_CATCH_UP", "5")),
+    broker=broker,
+)
+# FTG_REPLAY_DIR: where finished bouts are saved as input logs (empty to disable)
+# FTG_ROLLBACK_FRAMES: rollback depth for late tick-stamped PVP inputs (0 = off)
+# FTG_MAX_SPECTATORS: spectator connections allowed per room
+# FTG_KEEPALIVE: seconds between heartbeats while a room's state is unchanged (0 = none)
+lobby = Lobby(
+    scheduler,
+    replay_dir=os.environ.get("FTG_REPLAY_DIR", "replays") or None,
+    rollback_frames=int(os.environ.get("FTG_ROLLBACK_FRAMES", "0")),
+    max_spectators=int(os.environ.get("FTG_MAX_SPECTATORS", "500")),
+    keepalive_frames=round(float(os.environ.get("FTG_KEEPALIVE", "1")) / scheduler.clock.period),
+)
 
-# Global connection manager (Simple version for P1 vs P2)
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        if len(self.active_connections) >= 2:
-            await websocket.close(code=1000, reason="Room full")
-            return False
-        self.active_connections.append(websocket)
-        return True
-
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            await connection.send_json(message)
-
-manager = ConnectionManager()
+# Gauges / counters for /metrics, read from the live objects when scraped
+REGISTRY.gauge("ftg_rooms", "Rooms being ticked", lambda: len(scheduler.rooms))
+REGISTRY.gauge("ftg_connections", "Open websocket connections", lambda: sum(1 for _ in lobby.clients()),
+               {"role": "player"})
+REGISTRY.gauge("ftg_connections", "Open websocket connections",
+               lambda: sum(1 for _ in lobby.clients(spectators=True)), {"role": "spectator"})
+REGISTRY.gauge("ftg_send_queue_depth", "Snapshots waiting in client send queues",
+               lambda: sum(client.queue_depth for client in lobby.clients()), {"role": "player"})
+REGISTRY.gauge("ftg_send_queue_depth", "Snapshots waiting in client send queues",
+               lambda: sum(client.queue_depth for client in lobby.clients(spectators=True)), {"role": "spectator"})
+REGISTRY.gauge("ftg_input_queue_depth", "Player inputs waiting for their tick", lobby.pending_inputs)
+REGISTRY.counter("ftg_tick_overruns_total", "Frames that started late (missed their deadline)",
+                 lambda: scheduler.clock.overruns)
+REGISTRY.counter("ftg_ticks_caught_up_total", "Missed ticks run back to back", lambda: scheduler.clock.caught_up_ticks)
+REGISTRY.counter("ftg_ticks_dropped_total", "Missed ticks skipped", lambda: scheduler.clock.dropped_ticks)
+REGISTRY.counter("ftg_ai_decisions_total", "Batched AI decisions", lambda: broker.decisions, {"result": "ok"})
+REGISTRY.counter("ftg_ai_decisions_total", "Batched AI decisions", lambda: broker.misses, {"result": "missed"})
 
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    connected = await manager.connect(websocket)
-    if not connected:
+async def websocket_endpoint(websocket: WebSocket,
+                             room: str = Query("default", min_length=1, max_length=64),
+                             proto: str = Query(FORMAT_JSON, pattern="^(json|bin)$"),
+                             role: str = Query("player", pattern="^(player|spectator)$"),
+                             rate: int = Query(60)):
+    if role == "spectator":
+        await spectate(websocket, room, proto, rate)
         return
-
-    player_id = len(manager.active_connections) - 1 # 0 or 1
-    
-    # Start game loop if 2 players connected (or just start for testing)
-    # For prototype, we start loop immediately if not running
-    if not game_service.running:
-        asyncio.create_task(game_service.game_loop(update_callback))
+    game_room, player_id = await lobby.join(room, websocket, proto)
+    if player_id is None:
+        return
+    game_service = game_room.service
 
     try:
         while True:
-            data = await websocket.receive_text()
-            # Parse input from client
-            # Format: {"action": "STEP_FORWARD"}
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            # Parse input from client: binary INPUT frames or JSON text (see protocol.py)
             try:
-                msg = json.loads(data)
-                action_str = msg.get("action")
+                if message.get("bytes") is not None:
+                    action, tick = decode_input(message["bytes"])
+                    game_service.set_player_action(player_id, action, tick)
+                    continue
+                action_str, value, tick = decode_json_input(message["text"])
                 if action_str == "SET_MODE":
-                    mode_val = msg.get("value")
-                    if mode_val:
-                        game_service.set_mode(mode_val)
+                    if value:
+                        game_service.set_mode(value)
                 elif action_str == "RESTART":
                     game_service.restart_game()
-                elif action_str and action_str in ActionType.__members__:
-                    game_service.set_player_action(player_id, ActionType[action_str])
-            except:
-                pass
+                elif action_str in ActionType.__members__:
+                    game_service.set_player_action(player_id, ActionType[action_str], tick)
+                else:
+                    raise ValueError(f"unknown action {action_str!r}")
+            except (ValueError, KeyError, TypeError):
+                game_service.input_queue.reject(player_id)  # malformed: counted, connection kept
+    except WebSocketDisconnect:
+        pass
+    finally:
+        lobby.leave(game_room, player_id)
+
+async def spectate(websocket: WebSocket, room: str, proto: str, rate: int):
+    # Watch-only: snapshots at `rate` Hz (one of SPECTATOR_RATES), incoming messages are ignored
+    if rate not in SPECTATOR_RATES:
+        await websocket.close(code=1008, reason=f"rate must be one of {SPECTATOR_RATES}")
+        return
+    game_room, client = await lobby.watch(room, websocket, proto, rate)
+    if client is None:
+        return
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
-        game_service.stop()
+        pass
+    finally:
+        lobby.unwatch(game_room, client)
+
+@router.get("/rooms")
+async def rooms_report():
+    # Per-room and aggregate tick cost from the shared scheduler, plus per-connection queue stats
+    report = scheduler.report()
+    report["connections"] = lobby.report()
+    report["rollback"] = lobby.rollback_report()
+    report["spectators"] = lobby.spectator_report()
+    report["publish"] = lobby.publish_report()
+    report["inputs"] = lobby.input_report()
+    return report
+
+@router.get("/profile")
+async def profile_report():
+    # process_tick phase profiles of every room profiled since start (closed rooms included)
+    return profiling.report()
+
+@router.post("/rooms/{room_id}/profile")
+async def set_profiling(room_id: str, enabled: bool = True):
+    # Opt-in per room at runtime: POST /rooms/<id>/profile (?enabled=false to stop)
+    if not lobby.set_profiling(room_id, enabled):
+        raise HTTPException(status_code=404, detail=f"no room {room_id!r}")
+    return {"room": room_id, "enabled": enabled, "profile": profiling.report().get(room_id)}
+
+@router.get("/metrics")
+async def metrics():
+    # Prometheus text exposition format; point any Prometheus-compatible scraper here
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
-async def update_callback(game_state):
-    # Convert Pydantic model to dict for JSON serialization
-    await manager.broadcast(game_state.model_dump(mode="json"))
+@router.get("/load")
+async def load_report():
+    # Compact load summary, polled by the gateway (app/gateway.py) for room placement
+    return {
+        "rooms": len(scheduler.rooms),
+        "connections": sum(len(room.manager.players) for room in lobby.rooms.values()),
+        "spectators": sum(room.spectators.count for room in lobby.rooms.values()),
+        "frame_recent_us": scheduler.frame_stats.recent * 1e6,
+        "overruns": scheduler.clock.overruns,
+    }
+
+# FTG_ADMIN_TOKEN: enables /debug/* for requests with "Authorization: Bearer <token>" (unset = disabled)
+_capturing = False  # one capture at a time
+
+def _require_admin(authorization: Optional[str]):
+    token = os.environ.get("FTG_ADMIN_TOKEN")
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if authorization is None or not hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+        raise HTTPException(status_code=401, detail="admin token required")
+
+@router.get("/debug/profile")
+async def debug_profile(seconds: float = Query(10, gt=0, le=120),
+                        mode: str = Query("cpu", pattern="^(cpu|alloc)$"),
+                        interval_ms: float = Query(5, ge=1, le=1000),
+                        threads: str = Query("loop", pattern="^(loop|all)$"),
+                        top: int = Query(25, ge=1, le=500),
+                        frames: int = Query(1, ge=1, le=50),
+                        authorization: Optional[str] = Header(None)):
+    # mode=cpu: collapsed stacks of the event loop thread (threads=all: every thread), for flamegraphs.
+    # mode=alloc: top tracemalloc allocation sites per scheduler tick, and each tick's peak.
+    # The capture awaits, so rooms keep ticking and serving meanwhile; one capture at a time.
+    global _capturing
+    _require_admin(authorization)
+    if _capturing:
+        raise HTTPException(status_code=409, detail="a capture is already running")
+    _capturing = True
+    try:
+        if mode == "alloc":
+            # Starting/stopping tracemalloc and building the report can take a while: off the event loop
+            trace = await asyncio.to_thread(AllocationTrace(frames).start)
+            scheduler.alloc_trace = trace
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                scheduler.alloc_trace = None
+                await asyncio.to_thread(trace.stop)
+            report = await asyncio.to_thread(trace.report, top)
+            report["seconds"] = seconds
+            return report
+        sampler = StackSampler(threading.get_ident() if threads == "loop" else None, interval_ms / 1000).start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+    finally:
+        _capturing = False
+    return PlainTextResponse(sampler.collapsed(), headers={
+        "X-Samples": str(sampler.samples), "X-Sample-Rate": f"{sampler.rate:.1f}"})
@@ -0,0 +1,98 @@
+"""
+Equivalence check and ticks/sec benchmark for BatchedGameEngine.
+
+Run from the fencing-ftg directory:
+    python -m benchmarks.batched_engine
+"""
+import argparse
+import time
+import numpy as np
+from app.game.engine import GameEngine
+from app.game.batched_engine import BatchedGameEngine, EVENTS, NO_WINNER
+from app.game.models import ACTION_TYPES, ACTION_CODES, STATE_CODES
+
+# Mostly movement with a sprinkle of attacks, roughly like real play
+ACTION_WEIGHTS = np.array([0.45, 0.25, 0.15, 0.08, 0.05, 0.02])
+
+
+def random_actions(rng, n):
+    return rng.choice(len(ACTION_TYPES), size=(n, 2), p=ACTION_WEIGHTS)
+
+
+def compare(engines, batch):
+    for i, engine in enumerate(engines):
+        s = engine.state
+        winner = NO_WINNER if s.winner is None else s.winner
+        expected = (s.tick_count, s.distance, s.game_over, winner, s.last_event, getattr(engine, "reset_timer", 0))
+        got = (int(batch.tick_count[i]), float(batch.distance[i]), bool(batch.game_over[i]),
+               int(batch.winner[i]), EVENTS[batch.last_event[i]], int(batch.reset_timer[i]))
+        assert expected == got, f"bout {i}: {expected} != {got}"
+        for j, f in enumerate(s.fencers):
+            expected = (f.position, STATE_CODES[f.state], f.state_timer, ACTION_CODES[f.last_action], f.score)
+            got = (float(batch.position[i, j]), int(batch.state[i, j]), int(batch.state_timer[i, j]),
+                   int(batch.last_action[i, j]), int(batch.score[i, j]))
+            assert expected == got, f"bout {i} fencer {j}: {expected} != {got}"
+
+
+def check_equivalence(num_bouts=256, ticks=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    engines = [GameEngine() for _ in range(num_bouts)]
+    batch = BatchedGameEngine(num_bouts)
+    compare(engines, batch)
+    for _ in range(ticks):
+        actions = random_actions(rng, num_bouts)
+        for i, engine in enumerate(engines):
+            engine.process_tick({0: ACTION_TYPES[actions[i, 0]], 1: ACTION_TYPES[actions[i, 1]]})
+        batch.step(actions)
+
+        # Restart finished bouts now and then so resets are covered too
+        restart = batch.game_over & (rng.random(num_bouts) < 0.05)
+        for i in np.flatnonzero(restart):
+            engines[i].reset_game()
+        batch.reset(restart)
+        compare(engines, batch)
+    print(f"equivalence: OK ({num_bouts} bouts x {ticks} ticks)")
+
+
+def bench_scalar(ticks=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    codes = random_actions(rng, ticks)
+    actions = [{0: ACTION_TYPES[a], 1: ACTION_TYPES[b]} for a, b in codes]
+    engine = GameEngine()
+    start = time.perf_counter()
+    for act in actions:
+        if engine.core.game_over:
+            engine.reset_game()
+        engine.process_tick(act)
+    return ticks / (time.perf_counter() - start)
+
+
+def bench_batched(num_bouts, steps, seed=0):
+    rng = np.random.default_rng(seed)
+    # A small pool of pre-generated action frames keeps RNG cost out of the timing
+    pool = [random_actions(rng, num_bouts) for _ in range(16)]
+    batch = BatchedGameEngine(num_bouts)
+    start = time.perf_counter()
+    for k in range(steps):
+        batch.step(pool[k % len(pool)])
+        if k % 64 == 0:
+            batch.reset(batch.game_over)
+    return num_bouts * steps / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--skip-check", action="store_true", help="skip the equivalence check")
+    args = parser.parse_args()
+
+    if not args.skip_check:
+        check_equivalence()
+
+    print(f"{'engine':<24}{'ticks/sec':>16}")
+    print(f"{'GameEngine (scalar)':<24}{bench_scalar():>16,.0f}")
+    for num_bouts, steps in ((1, 20000), (1000, 2000), (100000, 100)):
+        print(f"{f'Batched N={num_bouts}':<24}{bench_batched(num_bouts, steps):>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
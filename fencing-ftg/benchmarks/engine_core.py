@@ -0,0 +1,77 @@
+"""
+Per-tick cost and per-bout memory of GameEngine, whose hot path runs on the compact
+GameEngine.core (__slots__ objects, integer codes); the Pydantic GameState is only
+built when engine.state is read. Also checks that the wire encoding taken straight
+from the core matches the one of the Pydantic state.
+
+Run from the fencing-ftg directory:
+    python -m benchmarks.engine_core
+"""
+import argparse
+import time
+import tracemalloc
+import numpy as np
+from app.game.engine import GameEngine
+from app.game.models import GameConfig, ACTION_TYPES
+from app.protocol import SnapshotEncoder, flatten, flatten_core
+from .batched_engine import random_actions
+
+
+def make_actions(ticks, seed=0):
+    codes = random_actions(np.random.default_rng(seed), ticks)
+    return [{0: ACTION_TYPES[a], 1: ACTION_TYPES[b]} for a, b in codes]
+
+
+def check_wire(actions):
+    engine = GameEngine(GameConfig())
+    for act in actions:
+        if engine.core.game_over:
+            engine.reset_game()
+        engine.process_tick(act)
+        assert flatten_core(engine.core) == flatten(engine.state)
+    print(f"core/Pydantic wire values: OK ({len(actions)} ticks)")
+
+
+def bench_ticks(actions, publish=None):
+    engine = GameEngine(GameConfig())
+    encoder = SnapshotEncoder()
+    start = time.perf_counter()
+    for act in actions:
+        if engine.core.game_over:
+            engine.reset_game()
+        engine.process_tick(act)
+        if publish == "core":
+            encoder.encode_core(engine.core)
+        elif publish == "state":
+            encoder.encode(engine.state)
+    return (time.perf_counter() - start) / len(actions)
+
+
+def bytes_per_bout(num_bouts=1000):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    engines = [GameEngine(GameConfig()) for _ in range(num_bouts)]
+    size = (tracemalloc.get_traced_memory()[0] - before) / num_bouts
+    with_state = [engine.state for engine in engines]  # noqa: F841 (kept alive for the measurement)
+    size_state = (tracemalloc.get_traced_memory()[0] - before) / num_bouts
+    tracemalloc.stop()
+    return size, size_state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=50000)
+    args = parser.parse_args()
+
+    actions = make_actions(args.ticks)
+    check_wire(actions[:5000])
+    print(f"{'path':<36}{'us/tick':>10}")
+    print(f"{'process_tick':<36}{bench_ticks(actions) * 1e6:>10.2f}")
+    print(f"{'process_tick + encode_core':<36}{bench_ticks(actions, 'core') * 1e6:>10.2f}")
+    print(f"{'process_tick + encode(state)':<36}{bench_ticks(actions, 'state') * 1e6:>10.2f}")
+    size, size_state = bytes_per_bout()
+    print(f"bytes/bout: {size:.0f} (core only), {size_state:.0f} (with a GameState built)")
+
+
+if __name__ == "__main__":
+    main()
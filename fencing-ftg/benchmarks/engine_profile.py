@@ -0,0 +1,90 @@
+"""
+process_tick phase profiling (GameEngine.process_tick_profiled, app/game/profiling.py):
+checks the profiled variant plays the same bouts as process_tick, measures what
+profiling costs when on and when switched off again (ticking as GameService does),
+and prints the phase breakdown of a mixed workload.
+
+Run from the fencing-ftg directory:
+    python -m benchmarks.engine_profile
+"""
+import argparse
+import time
+from app.game.engine import GameEngine
+from app.game.models import GameConfig
+from app.game.profiling import PhaseProfile
+from .engine_core import make_actions
+
+
+def run(engine, actions):
+    # Dispatch as GameService.tick does
+    start = time.perf_counter()
+    for act in actions:
+        if engine.core.game_over:
+            engine.reset_game()
+        if engine.profile is None:
+            engine.process_tick(act)
+        else:
+            engine.process_tick_profiled(act)
+    return (time.perf_counter() - start) / len(actions)
+
+
+def run_direct(engine, actions):
+    # process_tick without the profiling check, the baseline
+    start = time.perf_counter()
+    for act in actions:
+        if engine.core.game_over:
+            engine.reset_game()
+        engine.process_tick(act)
+    return (time.perf_counter() - start) / len(actions)
+
+
+def check_equivalence(actions):
+    plain = GameEngine(GameConfig())
+    profiled = GameEngine(GameConfig())
+    profile = profiled.enable_profiling()
+    for act in actions:
+        for engine in (plain, profiled):
+            if engine.core.game_over:
+                engine.reset_game()
+            engine.process_tick(act) if engine is plain else engine.process_tick_profiled(act)
+        assert plain.snapshot() == profiled.snapshot()
+    assert profile.ticks == len(actions)
+    print(f"profiled process_tick: OK (same bouts over {len(actions)} ticks)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    actions = make_actions(args.ticks)
+    check_equivalence(actions[:20000])
+
+    profile = PhaseProfile("mixed workload")
+    costs = {"process_tick, no check": [], "never profiled": [], "profiled, then disabled": [],
+             "profiling on": []}
+    for _ in range(args.repeat):
+        # A fresh engine per run, so every run plays the same bouts
+        costs["process_tick, no check"].append(run_direct(GameEngine(GameConfig()), actions))
+        costs["never profiled"].append(run(GameEngine(GameConfig()), actions))
+        toggled = GameEngine(GameConfig())
+        toggled.enable_profiling()
+        toggled.disable_profiling()
+        costs["profiled, then disabled"].append(run(toggled, actions))
+        profile.reset()
+        profiled = GameEngine(GameConfig())
+        profiled.enable_profiling(profile)
+        costs["profiling on"].append(run(profiled, actions))
+    base = min(costs["process_tick, no check"])
+    print(f"\n{'engine':<26}{'us/tick':>10}{'vs plain':>10}")
+    for name, samples in costs.items():
+        best = min(samples)
+        print(f"{name:<26}{best * 1e6:>10.3f}{(best / base - 1) * 100:>+9.1f}%")
+
+    print()
+    print(profile.format())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+PVE decisions/sec versus room count: one TrainedAI.process (model.predict) call per room
+against one InferenceBroker forward pass per tick for all rooms. First checks that one
+slow flush does not make later flushes miss their decisions.
+
+Run from the fencing-ftg directory:
+    python -m benchmarks.inference
+"""
+import argparse
+import time
+import numpy as np
+from app.game.inference import InferenceBroker
+from app.game.models import GameMode
+from app.game.scheduler import TickScheduler, CostStats
+from app.game.service import GameService
+from app.game.trained_ai import get_model
+
+
+class _Room:
+    # Minimal Tickable around a GameService, no sockets
+    def __init__(self, service):
+        self.service = service
+
+    def prepare(self):
+        self.service.prepare()
+
+    def tick(self):
+        self.service.tick()
+
+    def publish(self):
+        pass
+
+
+def make_scheduler(rooms, broker):
+    scheduler = TickScheduler(broker=broker)
+    for i in range(rooms):
+        # Without a broker every room's TrainedAI calls model.predict itself (the old path);
+        # both paths share the cached model
+        service = GameService(broker)
+        service.engine.config.mode = GameMode.PVE
+        scheduler.rooms[str(i)] = _Room(service)
+        scheduler.room_stats[str(i)] = CostStats()
+    return scheduler
+
+
+class _SpikyModel:
+    # predict() stalls once (a GC pause, the first torch call), then is fast
+    def __init__(self, spike: float):
+        self.spike = spike
+
+    def predict(self, obs, deterministic=True):
+        if self.spike:
+            time.sleep(self.spike)
+            self.spike = 0.0
+        return np.zeros(len(obs), dtype=np.int64), None
+
+
+def check_slow_flush(flushes=100, rows=4):
+    broker = InferenceBroker(_SpikyModel(0.05), latency_budget=0.004, max_batch=2)
+    for _ in range(flushes):
+        tickets = [broker.submit(np.zeros(9, dtype=np.float32)) for _ in range(rows)]
+        broker.flush()
+        results = [broker.result(ticket) for ticket in tickets]
+        assert results[0] is not None, "a flush ran no chunk"
+    # Only the slow flush may skip chunks: its first chunk ran, the rest were over budget
+    assert broker.misses <= rows - 2, (broker.decisions, broker.misses)
+    assert broker.decisions == flushes * rows - broker.misses
+    print(f"one slow flush: OK ({broker.decisions} decisions, {broker.misses} missed over {flushes} flushes)")
+
+
+def bench(scheduler, rooms, ticks):
+    start = time.perf_counter()
+    for _ in range(ticks):
+        scheduler.tick_all()
+    elapsed = time.perf_counter() - start
+    return rooms * ticks / elapsed, elapsed / ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=4.0, help="broker latency budget")
+    args = parser.parse_args()
+
+    check_slow_flush()
+    model = get_model()
+    if model is None:
+        raise SystemExit("No trained model to benchmark")
+
+    print(f"{'rooms':>8}{'path':>10}{'decisions/sec':>16}{'ms/tick':>10}{'misses':>10}")
+    for rooms in (1, 10, 100, 1000):
+        ticks = max(2000 // rooms, 20)
+        if rooms <= 100:
+            per_room = make_scheduler(rooms, None)
+            rate, tick_cost = bench(per_room, rooms, ticks)
+            print(f"{rooms:>8}{'per-room':>10}{rate:>16,.0f}{tick_cost * 1e3:>10.2f}{'-':>10}")
+        broker = InferenceBroker(model, latency_budget=args.budget_ms / 1000)
+        batched = make_scheduler(rooms, broker)
+        rate, tick_cost = bench(batched, rooms, ticks)
+        print(f"{rooms:>8}{'broker':>10}{rate:>16,.0f}{tick_cost * 1e3:>10.2f}{broker.misses:>10}")
+
+
+if __name__ == "__main__":
+    main()
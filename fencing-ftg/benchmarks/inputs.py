@@ -0,0 +1,116 @@
+"""
+Player input path (app/protocol.py, app/game/inputs.py): parse cost per message of
+the JSON text and binary INPUT formats, and how many quick taps get lost when
+inputs overwrite each other between ticks (the old single input slot) against the
+per-player input queue of GameService.
+
+Taps are a press and a release; each message reaches the server after a random
+network delay (in order per player), so with short taps both often land between
+the same two ticks.
+
+Run from the fencing-ftg directory:
+    python -m benchmarks.inputs
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import time
+from app.game.models import ActionType, ACTION_TYPES, GameMode
+from app.game.service import GameService
+from app.protocol import encode_input, decode_input, decode_json_input
+
+TICK_MS = 1000 / 60
+TAPS = (ActionType.LUNGE, ActionType.THRUST, ActionType.STEP_FORWARD, ActionType.STEP_BACK)
+
+
+def bench_parse(messages=100000, seed=0):
+    rng = random.Random(seed)
+    inputs = [(rng.choice(ACTION_TYPES[:5]), rng.randrange(100000)) for _ in range(messages)]
+    texts = [json.dumps({"action": action.value, "tick": tick}) for action, tick in inputs]
+    frames = [encode_input(action, tick) for action, tick in inputs]
+
+    start = time.perf_counter()
+    for text in texts:
+        # What the websocket handler does with a text message
+        action_str, _, tick = decode_json_input(text)
+        ActionType[action_str]
+    json_cost = (time.perf_counter() - start) / messages
+
+    start = time.perf_counter()
+    for frame in frames:
+        decode_input(frame)
+    binary_cost = (time.perf_counter() - start) / messages
+
+    assert [decode_input(frame) for frame in frames[:1000]] == inputs[:1000]
+    return (json_cost, len(texts[0].encode())), (binary_cost, len(frames[0]))
+
+
+def tap_schedule(taps, max_tap_ms, max_delay_ms, seed=0):
+    """[(arrival frame, sent frame, action)] for one player tapping every ~250 ms, in arrival order."""
+    rng = random.Random(seed)
+    messages = []
+    t = arrival = 0.0
+    for _ in range(taps):
+        t += rng.uniform(150, 350)
+        action = rng.choice(TAPS)
+        for sent, sent_action in ((t, action), (t + rng.uniform(10, max_tap_ms), ActionType.IDLE)):
+            arrival = max(arrival, sent + rng.uniform(0, max_delay_ms))  # one websocket: in order
+            messages.append((int(arrival // TICK_MS), int(sent // TICK_MS), sent_action))
+    return messages
+
+
+def count_lost(messages, queued):
+    """Taps that P1 never held for a tick, and the input queue's report."""
+    service = GameService(None, None)
+    service.engine.config.mode = GameMode.PVP
+    held = []
+    shown = []  # tick_count on screen at each frame, what the client stamps its input with
+    i = 0
+    for frame in range(messages[-1][0] + 4):
+        shown.append(service.engine.core.tick_count)
+        while i < len(messages) and messages[i][0] <= frame:
+            _, sent, action = messages[i]
+            if queued:
+                service.set_player_action(0, action, shown[sent])
+            else:
+                service.inputs[0] = action  # single slot: the last message before the tick wins
+            i += 1
+        service.tick()
+        if service.engine.core.game_over:
+            with contextlib.redirect_stdout(io.StringIO()):
+                service.restart_game()
+        held.append(service.inputs.get(0, ActionType.IDLE))
+    # Each tap is followed by a release, so every tap that got a tick starts a run of non-IDLE ticks
+    applied = sum(1 for prev, action in zip([ActionType.IDLE] + held, held)
+                  if action != ActionType.IDLE and prev == ActionType.IDLE)
+    taps = sum(1 for _, _, action in messages if action != ActionType.IDLE)
+    return taps - applied, service.input_queue.report().get(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--taps", type=int, default=2000)
+    args = parser.parse_args()
+
+    (json_cost, json_size), (binary_cost, binary_size) = bench_parse(args.messages)
+    print(f"{'format':<10}{'us/message':>12}{'bytes':>8}")
+    print(f"{'json':<10}{json_cost * 1e6:>12.2f}{json_size:>8}")
+    print(f"{'binary':<10}{binary_cost * 1e6:>12.2f}{binary_size:>8}")
+
+    print(f"\n{args.taps} taps per row")
+    print(f"{'tap ms':>8}{'delay ms':>10}{'lost (slot)':>13}{'lost (queue)':>14}{'mean late':>11}{'max late':>10}")
+    for max_tap_ms, max_delay_ms in ((80, 0), (40, 20), (25, 40), (15, 60)):
+        messages = tap_schedule(args.taps, max_tap_ms, max_delay_ms)
+        lost_slot, _ = count_lost(messages, queued=False)
+        lost_queue, report = count_lost(messages, queued=True)
+        assert lost_queue == report["dropped"] == 0, (lost_queue, report)
+        print(f"{max_tap_ms:>8}{max_delay_ms:>10}{lost_slot:>13}{lost_queue:>14}"
+              f"{report['mean_late_ticks']:>11.2f}{report['max_late_ticks']:>10}")
+    print("queue: OK (no tap lost)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""
+Capacity test: how many concurrent bouts one `app.main:app` process sustains.
+
+Fake players speak /ws the way static/index.html does: binary snapshots, binary
+INPUT frames stamped with the tick on screen, key presses held and released with
+human-like timing, SET_MODE from the first player of a room and RESTART a moment
+after game over. The load is stepped up (1, 2, 4, ... bouts, then bisected
+between the last good and the first bad step); every step is measured on its
+own set of rooms after a warm-up:
+
+    jitter     how far each snapshot lands from one frame period after the previous
+               one, for snapshots of consecutive ticks (the server skips frames where
+               nothing moved, and tick_count stands still while the bout is frozen)
+    late       share of snapshots more than a whole frame behind schedule
+    latency    key press sent -> first snapshot showing it as the fencer's last_action
+               (presses made while the fencer is NEUTRAL on screen, so the game applies
+               them on the next tick); "lost" presses never showed within a second
+    CPU        server process and load generator, % of one core (from /proc)
+
+The knee is the largest step whose p99 latency, late share, lost share and server
+CPU stay within the limits below. Everything runs on loopback: by default the
+tool starts its own server on 127.0.0.1; --url must point at a loopback address.
+The generator shares the machine with the server, so watch its CPU column: once
+it nears a core, the knee says more about the client than about the server.
+
+Run from the fencing-ftg directory:
+    python -m benchmarks.loadtest                                   # PVP bouts, own server
+    python -m benchmarks.loadtest --mode pve --max-bouts 64 --output load.json
+    python -m benchmarks.loadtest --url ws://127.0.0.1:8000 --pid <server pid>
+"""
+import argparse
+import asyncio
+import ipaddress
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
+from websockets.asyncio.client import connect
+from app.game.models import ActionType
+from app.protocol import SnapshotDecoder, encode_input
+from .startup import free_port
+
+PERIOD = 1 / 60
+PROBE_TIMEOUT = 1.0
+# Keys a player presses, with weights: mostly footwork, some attacks
+KEYS = (ActionType.STEP_FORWARD, ActionType.STEP_BACK, ActionType.THRUST, ActionType.LUNGE)
+KEY_WEIGHTS = (0.35, 0.3, 0.2, 0.15)
+HOLD_S = (0.06, 0.25)  # how long a key is held
+GAP_S = (0.08, 0.5)    # pause between presses
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _scores(state: dict) -> tuple:
+    return tuple(fencer["score"] for fencer in state["fencers"])
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def cpu_seconds(pid: int) -> Optional[float]:
+    # utime + stime of a process (Linux); None where /proc is not available
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class Window:
+    """The measurement window shared by the players of a step."""
+
+    def __init__(self):
+        self.measuring = False
+
+
+class FakePlayer:
+    def __init__(self, url: str, room: str, player_id: int, mode: str, window: Window, rng: random.Random):
+        self.url = f"{url}/ws?room={room}&proto=bin"
+        self.player_id = player_id
+        self.mode = mode
+        self.window = window
+        self.rng = rng
+        self.decoder = SnapshotDecoder()
+        self.state: Optional[dict] = None
+        self.first_state = asyncio.Event()
+        self.last_tick = None
+        self.last_arrival = 0.0
+        self.pending = None  # (action, sent at, scores at send) of the press being timed
+        self.restarting = False
+        # Measured while window.measuring
+        self.snapshots = 0
+        self.deviations: List[float] = []
+        self.latencies: List[float] = []
+        self.lost = 0
+        self.abandoned = 0
+        self.error: Optional[str] = None
+
+    async def run(self, stop: asyncio.Event):
+        try:
+            async with connect(self.url, max_queue=None) as ws:
+                receiver = asyncio.create_task(self._receive(ws))
+                keys = asyncio.create_task(self._press_keys(ws))
+                stopping = asyncio.create_task(stop.wait())
+                done, _ = await asyncio.wait((receiver, keys, stopping), return_when=asyncio.FIRST_COMPLETED)
+                for task in (receiver, keys, stopping):
+                    task.cancel()
+                for task in done:
+                    if task is not stopping and task.exception() is not None:
+                        raise task.exception()
+                if stopping not in done:
+                    self.error = "connection closed by the server"
+        except Exception as e:
+            self.error = repr(e)
+        finally:
+            self.first_state.set()  # never leave the connect sequence waiting
+
+    async def _receive(self, ws):
+        async for data in ws:
+            now = time.perf_counter()
+            state = self.decoder.decode(data)
+            if state is None:
+                continue  # heartbeat: the state on screen is unchanged
+            tick = state["tick_count"]
+            if self.window.measuring:
+                self.snapshots += 1
+                if self.last_tick is not None and tick == self.last_tick + 1:
+                    self.deviations.append(now - self.last_arrival - PERIOD)
+            self.last_tick = tick
+            self.last_arrival = now
+            self.state = state
+            self.first_state.set()
+            self._check_probe(state, now)
+            if state["game_over"] and self.player_id == 0 and not self.restarting:
+                self.restarting = True
+                asyncio.create_task(self._restart(ws))
+
+    def _check_probe(self, state: dict, now: float):
+        if self.pending is None:
+            return
+        action, sent, scores = self.pending
+        fencer = state["fencers"][self.player_id]
+        if fencer["last_action"] == action.value:
+            if self.window.measuring:
+                self.latencies.append(now - sent)
+            self.pending = None
+        elif state["last_event"] is not None or _scores(state) != scores or state["game_over"]:
+            # The bout moved on (touch, freeze, game over) before the press could apply
+            self.abandoned += self.window.measuring
+            self.pending = None
+        elif now - sent > PROBE_TIMEOUT:
+            self.lost += self.window.measuring
+            self.pending = None
+
+    async def _restart(self, ws):
+        await asyncio.sleep(self.rng.uniform(0.5, 1.5))  # a player reading the result, then clicking Restart
+        await ws.send(json.dumps({"action": "RESTART"}))
+        self.restarting = False
+
+    async def _press_keys(self, ws):
+        await self.first_state.wait()
+        if self.player_id == 0:
+            await ws.send(json.dumps({"action": "SET_MODE", "value": self.mode}))
+        rng = self.rng
+        while True:
+            await asyncio.sleep(rng.uniform(*GAP_S))
+            key = rng.choices(KEYS, KEY_WEIGHTS)[0]
+            now = time.perf_counter()
+            fencer = self.state["fencers"][self.player_id]
+            # Time presses the game applies on its next tick: fencer free, room live, not a touch (freeze follows)
+            if (self.pending is None and fencer["state"] == "NEUTRAL" and fencer["last_action"] != key.value
+                    and self.state["last_event"] is None and not self.state["game_over"]
+                    and now - self.last_arrival < 2 * PERIOD):
+                self.pending = (key, now, _scores(self.state))
+            await ws.send(encode_input(key, self.state["tick_count"]))
+            await asyncio.sleep(rng.uniform(*HOLD_S))
+            await ws.send(encode_input(ActionType.IDLE, self.state["tick_count"]))
+            if self.pending is not None and time.perf_counter() - self.pending[1] > PROBE_TIMEOUT:
+                self.lost += self.window.measuring  # no snapshot arrived to settle it
+                self.pending = None
+
+
+def get_load(url: str) -> dict:
+    # Blocking; called through asyncio.to_thread
+    with urllib.request.urlopen(url.replace("ws://", "http://", 1) + "/load", timeout=5) as response:
+        return json.loads(response.read())
+
+
+async def run_step(url: str, bouts: int, step: int, args, pid: Optional[int]) -> dict:
+    players_per_bout = 2 if args.mode == "PVP" else 1
+    window = Window()
+    stop = asyncio.Event()
+    rng = random.Random(args.seed + step)
+    players = []
+    tasks = []
+    connecting = asyncio.Semaphore(16)
+
+    async def start_bout(index: int):
+        room = f"load-{step}-{index}"
+        async with connecting:
+            for player_id in range(players_per_bout):
+                # One at a time, so the server hands out ids in this order
+                player = FakePlayer(url, room, player_id, args.mode, window, random.Random(rng.random()))
+                players.append(player)
+                tasks.append(asyncio.create_task(player.run(stop)))
+                await player.first_state.wait()
+
+    await asyncio.gather(*(start_bout(i) for i in range(bouts)))
+    await asyncio.sleep(args.warmup)
+
+    load_before = await asyncio.to_thread(get_load, url)
+    server_cpu = cpu_seconds(pid) if pid else None
+    client_cpu = time.process_time()
+    start = time.perf_counter()
+    window.measuring = True
+    await asyncio.sleep(args.duration)
+    window.measuring = False
+    elapsed = time.perf_counter() - start
+    client_cpu = (time.process_time() - client_cpu) / elapsed
+    if server_cpu is not None:
+        server_cpu = (cpu_seconds(pid) - server_cpu) / elapsed
+    load_after = await asyncio.to_thread(get_load, url)
+
+    stop.set()
+    await asyncio.gather(*tasks)
+    await asyncio.sleep(0.5)  # let the server close the rooms before the next step
+
+    deviations = [d for player in players for d in player.deviations]
+    latencies = [latency for player in players for latency in player.latencies]
+    lost = sum(player.lost for player in players)
+    probes = len(latencies) + lost
+    p = lambda values, q: None if percentile(values, q) is None else percentile(values, q) * 1000
+    return {
+        "bouts": bouts,
+        "clients": len(players),
+        "errors": sum(player.error is not None for player in players),
+        "snapshots_per_s": sum(player.snapshots for player in players) / elapsed,
+        "jitter_p50_ms": p([abs(d) for d in deviations], 0.5),
+        "jitter_p99_ms": p([abs(d) for d in deviations], 0.99),
+        "late_share": sum(d > PERIOD for d in deviations) / len(deviations) if deviations else None,
+        "latency_p50_ms": p(latencies, 0.5),
+        "latency_p99_ms": p(latencies, 0.99),
+        "probes": probes,
+        "lost_share": lost / probes if probes else None,
+        "abandoned": sum(player.abandoned for player in players),
+        "server_cpu": server_cpu,
+        "client_cpu": client_cpu,
+        "overruns": load_after["overruns"] - load_before["overruns"],
+        "frame_recent_us": load_after["frame_recent_us"],
+    }
+
+
+def failures(result: dict, args) -> List[str]:
+    """Limits a step breaks; empty when it is within capacity."""
+    reasons = []
+    if result["errors"]:
+        reasons.append(f"{result['errors']} connections failed")
+    if result["latency_p99_ms"] is None or result["latency_p99_ms"] > args.max_latency_ms:
+        reasons.append("p99 latency")
+    if result["late_share"] is None or result["late_share"] > args.max_late:
+        reasons.append("late snapshots")
+    if result["lost_share"] is not None and result["lost_share"] > args.max_lost:
+        reasons.append("lost inputs")
+    if result["server_cpu"] is not None and result["server_cpu"] > args.max_cpu:
+        reasons.append("server CPU")
+    return reasons
+
+
+def print_result(result: dict, reasons: List[str]):
+    fmt = lambda value, spec: "-" if value is None else format(value, spec)
+    print(f"{result['bouts']:>6}{result['clients']:>8}{result['snapshots_per_s']:>9.0f}"
+          f"{fmt(result['jitter_p50_ms'], '.2f'):>8}{fmt(result['jitter_p99_ms'], '.2f'):>8}"
+          f"{fmt(result['late_share'] and result['late_share'] * 100, '.2f'):>8}"
+          f"{fmt(result['latency_p50_ms'], '.1f'):>8}{fmt(result['latency_p99_ms'], '.1f'):>8}"
+          f"{fmt(result['lost_share'] and result['lost_share'] * 100, '.1f'):>7}"
+          f"{fmt(result['server_cpu'] and result['server_cpu'] * 100, '.0f'):>7}"
+          f"{result['client_cpu'] * 100:>7.0f}{result['overruns']:>6}  {', '.join(reasons) or 'ok'}", flush=True)
+
+
+async def find_knee(url: str, args, pid: Optional[int]) -> dict:
+    print(f"{'bouts':>6}{'clients':>8}{'snap/s':>9}{'jit50':>8}{'jit99':>8}{'late%':>8}"
+          f"{'lat50':>8}{'lat99':>8}{'lost%':>7}{'srv%':>7}{'gen%':>7}{'ovr':>6}  limits (ms, % of one core)")
+    results = {}
+
+    async def measure(bouts: int) -> bool:
+        result = await run_step(url, bouts, len(results), args, pid)
+        reasons = failures(result, args)
+        result["failures"] = reasons
+        results[bouts] = result
+        print_result(result, reasons)
+        return not reasons
+
+    good, bad = 0, None
+    bouts = args.start_bouts
+    while bouts <= args.max_bouts:
+        if not await measure(bouts):
+            bad = bouts
+            break
+        good = bouts
+        bouts *= 2
+    while args.refine and bad is not None and bad - good > max(1, good // 16):  # steps this close are noise
+        middle = (good + bad) // 2
+        if await measure(middle):
+            good = middle
+        else:
+            bad = middle
+    return {"knee_bouts": good, "first_failing_bouts": bad,
+            "failures": results[bad]["failures"] if bad is not None else [],
+            "steps": [results[bouts] for bouts in sorted(results)]}
+
+
+def start_server() -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        stdout=subprocess.DEVNULL,
+        env=dict(os.environ, FTG_REPLAY_DIR=""),  # don't fill replays/ with load-test bouts
+    )
+    url = f"ws://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            get_load(url)
+            return server, url
+        except OSError:
+            if server.poll() is not None or time.monotonic() > deadline:
+                server.kill()
+                raise RuntimeError("server did not start")
+            time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="running server, e.g. ws://127.0.0.1:8000 (default: start one)")
+    parser.add_argument("--pid", type=int, help="pid of the --url server, for its CPU")
+    parser.add_argument("--mode", choices=("pvp", "pve"), default="pvp")
+    parser.add_argument("--start-bouts", type=int, default=1)
+    parser.add_argument("--max-bouts", type=int, default=256)
+    parser.add_argument("--no-refine", dest="refine", action="store_false", help="skip the bisection")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds per step before measuring")
+    parser.add_argument("--duration", type=float, default=8.0, help="seconds measured per step")
+    parser.add_argument("--max-latency-ms", type=float, default=100.0)
+    parser.add_argument("--max-late", type=float, default=0.01, help="share of snapshots a frame late")
+    parser.add_argument("--max-lost", type=float, default=0.01, help="share of presses never shown")
+    parser.add_argument("--max-cpu", type=float, default=0.9, help="server CPU, share of one core")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write every step as JSON")
+    args = parser.parse_args()
+    args.mode = args.mode.upper()
+
+    server = None
+    if args.url:
+        host = urlparse(args.url).hostname or ""
+        if not is_loopback(host):
+            parser.error(f"{host} is not a loopback address; the load test only runs on this machine")
+        url, pid = args.url.rstrip("/"), args.pid
+    else:
+        server, url = start_server()
+        pid = server.pid
+    print(f"{args.mode} bouts against {url}, {args.duration:g}s per step")
+    try:
+        report = asyncio.run(find_knee(url, args, pid))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if report["first_failing_bouts"] is None:
+        print(f"\nno knee up to {args.max_bouts} bouts")
+    else:
+        limits = ", ".join(report["failures"])
+        print(f"\nknee: {report['knee_bouts']} concurrent bouts ({report['first_failing_bouts']} break: {limits})"
+              if report["knee_bouts"] else f"\nknee: below {args.start_bouts} bouts ({limits})")
+    if args.output:
+        report["settings"] = {key: value for key, value in vars(args).items() if key != "output"}
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Cost of the /metrics instrumentation (app/game/metrics.py) on the tick path, and
+a check that the exposition text is well formed.
+
+A room is ticked and published in-process (stub websockets, as in
+benchmarks.spectators) with the hot-path timings sampled one frame in N (the
+server default, FTG_METRICS_SAMPLE), on every frame, and off. Reports the
+observations per sampled frame, the cost of one observe() and of a
+perf_counter() pair, and the instrumentation cost against the room's own
+tick + publish time, both estimated and measured (best of --repeats, run
+interleaved, A/B against sampling off; the A/B noise is a few tenths of a us,
+so the check is on the estimate). The default must stay under 1% of a tick.
+
+Run from the fencing-ftg directory:
+    python -m benchmarks.metrics
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import re
+import time
+import timeit
+from app.game.metrics import REGISTRY, SAMPLING, Histogram
+from app.game.models import GameMode
+from app.protocol import FORMAT_BINARY, FORMAT_JSON
+from app.rooms import Room
+from .spectators import StubWebSocket
+
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="[^"]*",?)*\})? [-+0-9.eEInf]+$')
+
+
+def check_exposition(text: str):
+    """Every line is a HELP/TYPE comment or a sample; histogram buckets are cumulative and end in count."""
+    buckets = {}
+    for line in text.splitlines():
+        if line.startswith("# HELP ") or line.startswith("# TYPE "):
+            continue
+        assert SAMPLE.match(line), line
+        name, value = line.rsplit(" ", 1)
+        if "_bucket{" in name:
+            series = re.sub(r',?le="[^"]*"', "", name).replace("_bucket", "")
+            previous = buckets.get(series, 0)
+            assert float(value) >= previous, line
+            buckets[series] = float(value)
+        elif re.match(r"^\w+_count(\{|$)", name):
+            series = name.replace("_count", "")
+            if series in buckets:
+                assert float(value) == buckets[series], line
+    return len(buckets)
+
+
+def observations() -> int:
+    return sum(child.count for _, _, children in REGISTRY._families.values()
+               for child in children if isinstance(child, Histogram))
+
+
+async def run_room(frames: int, mode: GameMode, every: int):
+    SAMPLING.every = every
+    room = Room("bench")
+    room._skip_fields = 0  # publish every tick, the busiest case
+    room.service.engine.config.mode = mode
+    await room.manager.connect(StubWebSocket(), FORMAT_BINARY)
+    await room.manager.connect(StubWebSocket(), FORMAT_JSON)
+    before = observations()
+    elapsed = 0.0
+    sampled = 0
+    for _ in range(frames):
+        start = time.perf_counter()
+        sampled += SAMPLING.next_frame()  # what TickScheduler.tick_all does each frame
+        room.tick()
+        room.publish()
+        elapsed += time.perf_counter() - start
+        for _ in range(4):
+            await asyncio.sleep(0)  # let the writers send
+        if room.service.engine.core.game_over:
+            room.service.engine.reset_game()
+    per_sampled = (observations() - before) / sampled if sampled else 0.0
+    for client in list(room.manager.players.values()):
+        client.close()
+    return elapsed / frames, per_sampled
+
+
+def measure(frames: int, mode: GameMode, settings, repeats: int):
+    """Best tick + publish time and observations per sampled frame, per sampling setting; runs interleaved."""
+    runs = {every: [] for every in settings}
+    with contextlib.redirect_stdout(io.StringIO()):  # Room() reports which AI it loaded
+        for _ in range(repeats):
+            for every in settings:
+                runs[every].append(asyncio.run(run_room(frames, mode, every)))
+    return {every: (min(cost for cost, _ in result), max(per for _, per in result))
+            for every, result in runs.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--repeats", type=int, default=7)
+    args = parser.parse_args()
+    default_every = SAMPLING.every
+
+    histogram = Histogram({})
+    observe = timeit.timeit(lambda: histogram.observe(3e-5), number=200000) / 200000
+    empty_call = timeit.timeit(lambda: None, number=200000) / 200000
+    observe -= empty_call
+    pair = timeit.timeit("perf_counter(); perf_counter()", setup="from time import perf_counter",
+                         number=200000) / 200000
+    gate = timeit.timeit("if SAMPLING.on: pass", globals={"SAMPLING": SAMPLING}, number=200000) / 200000
+    gate -= timeit.timeit("pass", number=200000) / 200000
+    print(f"observe(): {observe * 1e9:.0f} ns, perf_counter() pair: {pair * 1e9:.0f} ns, "
+          f"SAMPLING.on check: {gate * 1e9:.0f} ns")
+
+    print(f"\n{'room':<22}{'sample':>8}{'tick+publish us':>16}{'obs/sampled':>13}{'est. us':>9}{'est. %':>8}"
+          f"{'A/B us':>8}{'A/B %':>8}")
+    worst = 0.0
+    for mode in (GameMode.PVP, GameMode.PVE):
+        results = measure(args.frames, mode, (0, default_every, 1), args.repeats)
+        baseline, _ = results[0]
+        for every in (default_every, 1):
+            cost, per_sampled = results[every]
+            # Upper bound: each observation with its own perf_counter pair (some reuse existing timers),
+            # plus one SAMPLING.on check per timing site and frame on the unsampled frames
+            estimate = per_sampled * (observe + pair) / every + (per_sampled + 1) * gate
+            if every == default_every:
+                worst = max(worst, estimate / baseline)
+            label = f"1/{every}" if every > 1 else "all"
+            print(f"{mode.value + ', 2 clients':<22}{label:>8}{cost * 1e6:>16.1f}{per_sampled:>13.1f}"
+                  f"{estimate * 1e6:>9.3f}{estimate / baseline * 100:>7.2f}%"
+                  f"{(cost - baseline) * 1e6:>8.2f}{(cost - baseline) / baseline * 100:>7.1f}%")
+    SAMPLING.every = default_every
+    assert worst < 0.01, f"sampled instrumentation costs {worst * 100:.2f}% of a room tick"
+    print(f"default sampling (1/{default_every}): {worst * 100:.2f}% of a room's tick + publish at most")
+
+    start = time.perf_counter()
+    text = REGISTRY.render()
+    render = time.perf_counter() - start
+    series = check_exposition(text)
+    print(f"\n/metrics: {len(text)} bytes, {series} histograms, rendered in {render * 1e6:.0f} us")
+    print("exposition: OK")
+
+
+if __name__ == "__main__":
+    main()
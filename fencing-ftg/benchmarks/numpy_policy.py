@@ -0,0 +1,72 @@
+"""
+NumPy policy backend versus stable_baselines3/torch: startup time, peak memory,
+per-decision latency, and argmax agreement on a test set of observations.
+
+Run from the fencing-ftg directory (needs stable_baselines3 for the comparison):
+    python -m benchmarks.numpy_policy
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+import numpy as np
+from export_policy import test_observations
+
+# Fresh interpreter per backend so imports and memory are measured from zero
+_STARTUP = """
+import json, resource, sys, time
+start = time.perf_counter()
+if sys.argv[1] == "numpy":
+    from app.game.numpy_policy import NumpyPolicy
+    NumpyPolicy.load("app/models/ppo_fencing.npz")
+else:
+    from stable_baselines3 import PPO
+    PPO.load("app/models/ppo_fencing.zip")
+seconds = time.perf_counter() - start
+try:
+    # Peak RSS of this process image (ru_maxrss would include the parent's peak from before exec)
+    with open("/proc/self/status") as f:
+        peak_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+except OSError:
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": seconds, "max_rss_mb": peak_kb / 1024}))
+"""
+
+
+def startup(backend):
+    out = subprocess.run([sys.executable, "-c", _STARTUP, backend], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def latency(model, obs, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.predict(obs, deterministic=True)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    from stable_baselines3 import PPO
+    from app.game.numpy_policy import NumpyPolicy
+    models = {"torch": PPO.load("app/models/ppo_fencing.zip"),
+              "numpy": NumpyPolicy.load("app/models/ppo_fencing.npz")}
+
+    obs = test_observations()
+    expected, _ = models["torch"].predict(obs, deterministic=True)
+    got, _ = models["numpy"].predict(obs, deterministic=True)
+    print(f"argmax agreement: {int(np.count_nonzero(expected == got))}/{len(obs)}")
+
+    print(f"{'backend':<8}{'startup s':>11}{'max RSS MB':>12}{'us/decision':>13}{'us/row @1024':>14}")
+    for name, model in models.items():
+        stats = startup(name)
+        single = latency(model, obs[0], 2000)
+        batch = latency(model, obs[:1024], 200) / 1024
+        print(f"{name:<8}{stats['seconds']:>11.2f}{stats['max_rss_mb']:>12.0f}{single * 1e6:>13.1f}{batch * 1e6:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Bytes per tick and encode us per tick: the old per-connection model_dump + send_json
+path against the encode-once JSON and binary keyframe/delta formats (app/protocol.py),
+and what skipping unchanged frames (freezes, game over, heartbeats) saves per client.
+
+Run from the fencing-ftg directory:
+    python -m benchmarks.protocol
+"""
+import argparse
+import json
+import time
+from app.game.engine import GameEngine
+from app.game.ai import SimpleAI
+from app.protocol import SnapshotEncoder, SnapshotDecoder, flatten
+
+
+def record_states(ticks, seed=0, stop_at_game_over=False):
+    """A bout of SimpleAI vs SimpleAI, as a list of GameState copies."""
+    engine = GameEngine()
+    ais = [SimpleAI(player_id=0, seed=seed), SimpleAI(player_id=1, seed=seed + 1)]
+    states = []
+    for _ in range(ticks):
+        if engine.core.game_over:
+            if stop_at_game_over:
+                break
+            engine.reset_game()
+        engine.process_tick({ai.player_id: ai.decide(engine.core) for ai in ais})
+        states.append(engine.state)  # a fresh GameState after every tick
+    return states
+
+
+def check_roundtrip(states):
+    encoder = SnapshotEncoder()
+    decoder = SnapshotDecoder()
+    for state in states:
+        snapshot = encoder.encode(state)
+        expected = state.model_dump(mode="json")
+        assert decoder.decode(snapshot.binary_for(decoder.seq)) == expected
+        assert json.loads(snapshot.json) == expected
+    print(f"roundtrip: OK ({len(states)} ticks)")
+
+
+def bench_skipping(states, keepalive_frames=60, skip_fields=1):
+    """
+    One binary client fed like Room.publish(): every frame, or changed frames plus
+    a heartbeat every keepalive_frames unchanged ones. Checks the decoded state always
+    matches the engine's (tick_count aside) and returns (messages, bytes, us/frame) for both.
+    """
+    results = {}
+    for skip in (False, True):
+        encoder = SnapshotEncoder()
+        decoder = SnapshotDecoder()
+        messages = size = idle = 0
+        state = None
+        elapsed = 0.0
+        for game_state in states:
+            values = flatten(game_state)
+            start = time.perf_counter()
+            if skip:
+                frame = encoder.encode_changed(values, skip_fields)
+                if frame is None:
+                    idle += 1
+                    if keepalive_frames and idle % keepalive_frames == 0:
+                        frame = encoder.heartbeat()
+                else:
+                    idle = 0
+            else:
+                frame = encoder.encode_values(values)
+            data = frame.binary_for(decoder.seq) if frame is not None else None
+            elapsed += time.perf_counter() - start
+            if data is not None:
+                messages += 1
+                size += len(data)
+                state = decoder.decode(data) or state
+            expected = game_state.model_dump(mode="json")
+            assert {**state, "tick_count": 0} == {**expected, "tick_count": 0}, (state, expected)
+        results[skip] = (messages, size, elapsed / len(states))
+    return results
+
+
+def bench_per_connection(states, clients):
+    # Old path: model_dump once, then send_json json.dumps it again for every connection
+    size = 0
+    start = time.perf_counter()
+    for state in states:
+        message = state.model_dump(mode="json")
+        for _ in range(clients):
+            size += len(json.dumps(message, separators=(",", ":"), ensure_ascii=False).encode())
+    return (time.perf_counter() - start) / len(states), size / len(states) / clients
+
+
+def bench_json_once(states, clients):
+    encoder = SnapshotEncoder()
+    size = 0
+    start = time.perf_counter()
+    for state in states:
+        snapshot = encoder.encode(state)
+        for _ in range(clients):
+            size += len(snapshot.json.encode())
+    return (time.perf_counter() - start) / len(states), size / len(states) / clients
+
+
+def bench_binary(states, clients):
+    encoder = SnapshotEncoder()
+    last_seq = [None] * clients
+    size = 0
+    start = time.perf_counter()
+    for state in states:
+        snapshot = encoder.encode(state)
+        for c in range(clients):
+            size += len(snapshot.binary_for(last_seq[c]))
+            last_seq[c] = snapshot.seq
+    return (time.perf_counter() - start) / len(states), size / len(states) / clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=5000)
+    args = parser.parse_args()
+
+    states = record_states(args.ticks)
+    check_roundtrip(states)
+
+    print(f"{'path':<28}{'clients':>8}{'us/tick':>10}{'bytes/tick/client':>20}")
+    for clients in (2, 10, 100):
+        for name, bench in (("model_dump + send_json", bench_per_connection),
+                            ("json (encode once)", bench_json_once),
+                            ("binary keyframe/delta", bench_binary)):
+            cost, size = bench(states, clients)
+            print(f"{name:<28}{clients:>8}{cost * 1e6:>10.1f}{size:>20.1f}")
+
+    # One bout to game over, then the room sitting on the game-over screen for as long again
+    bout = record_states(args.ticks, stop_at_game_over=True)
+    idle = bout + [bout[-1]] * len(bout)
+    print(f"\nunchanged-frame skipping, one binary client ({len(bout)} bout ticks, then as many idle)")
+    print(f"{'path':<34}{'msgs/s':>10}{'bytes/s':>12}{'us/frame':>10}")
+    for window, frames in (("bout", bout), ("bout + idle", idle)):
+        results = bench_skipping(frames)
+        for skip, (messages, size, cost) in results.items():
+            name = f"{window}: {'changed + heartbeat' if skip else 'every frame'}"
+            seconds = len(frames) / 60
+            print(f"{name:<34}{messages / seconds:>10.1f}{size / seconds:>12.0f}{cost * 1e6:>10.2f}")
+    print("skipping: OK (decoded state matches the engine on every frame)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Input-log size and headless replay speed (app/game/replay.py): records SimpleAI vs
+SimpleAI bouts, checks that every log replays to the recorded final state, and
+measures bouts/sec through GameEngine.process_tick and through BatchedGameEngine.
+
+Run from the fencing-ftg directory:
+    python -m benchmarks.replay
+    python -m benchmarks.replay --dir replays   # verify the server's saved bouts
+"""
+import argparse
+import glob
+import os
+import time
+from app.game.engine import GameEngine
+from app.game.ai import SimpleAI
+from app.game.models import GameConfig
+from app.game.replay import MatchLog, MatchRecorder, replay, replay_batch
+
+
+def record_bouts(num_bouts, seed=0, max_ticks=20000):
+    """SimpleAI vs SimpleAI bouts to game over (or max_ticks), as MatchLogs."""
+    logs = []
+    for b in range(num_bouts):
+        bout_seed = seed + b
+        engine = GameEngine(GameConfig())
+        ais = [SimpleAI(player_id=0, seed=bout_seed), SimpleAI(player_id=1, seed=bout_seed + 1_000_003)]
+        recorder = MatchRecorder(bout_seed, engine.config)
+        while not engine.core.game_over and recorder.ticks < max_ticks:
+            p1, p2 = (ai.decide(engine.core) for ai in ais)
+            engine.process_tick({0: p1, 1: p2})
+            recorder.record(p1, p2)
+        logs.append(MatchLog.from_bytes(recorder.finish(engine).to_bytes()))  # through the file format
+    return logs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bouts", type=int, default=200, help="distinct bouts to record")
+    parser.add_argument("--copies", type=int, default=20, help="times each log is repeated for the batched replay")
+    parser.add_argument("--dir", help="verify the .ftgr logs in this directory instead of recording")
+    args = parser.parse_args()
+
+    if args.dir:
+        paths = sorted(glob.glob(os.path.join(args.dir, "*.ftgr")))
+        logs = [MatchLog.load(path) for path in paths]
+        sizes = [os.path.getsize(path) for path in paths]
+    else:
+        logs = record_bouts(args.bouts)
+        sizes = [len(log.to_bytes()) for log in logs]
+    if not logs:
+        print("no logs")
+        return
+    ticks = sum(log.ticks for log in logs)
+    print(f"{len(logs)} bouts, {ticks / len(logs):.0f} ticks/bout, "
+          f"{sum(sizes) / len(logs):.0f} bytes/bout ({sum(sizes) * 8 / ticks:.2f} bits/tick), "
+          f"{sum(len(log.runs) for log in logs) // 3 / len(logs):.0f} runs/bout")
+
+    start = time.perf_counter()
+    for log in logs:
+        replay(log)  # raises ReplayMismatch on divergence
+    elapsed = time.perf_counter() - start
+    print(f"process_tick replay: OK, {len(logs) / elapsed:,.0f} bouts/s ({ticks / elapsed:,.0f} ticks/s)")
+
+    batch = logs * args.copies
+    start = time.perf_counter()
+    mismatches = replay_batch(batch)
+    elapsed = time.perf_counter() - start
+    assert not mismatches, f"batched replay diverged for logs {mismatches[:10]}"
+    print(f"batched replay: OK, {len(batch) / elapsed:,.0f} bouts/s ({ticks * args.copies / elapsed:,.0f} ticks/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Rollback netcode for PVP (app/game/rollback.py): checks that late tick-stamped
+inputs end in the same bout as inputs delivered on time (and that the recorded
+input log replays to it), and measures the cost of a rollback by depth.
+
+Run from the fencing-ftg directory:
+    python -m benchmarks.rollback
+"""
+import argparse
+import glob
+import os
+import random
+import tempfile
+import time
+from app.game.engine import GameEngine
+from app.game.models import ActionType, ACTION_TYPES
+from app.game.rollback import RollbackBuffer
+from app.game.replay import MatchLog, final_summary, replay
+from app.game.service import GameService
+
+# Mostly movement, some attacks
+ACTIONS = (ActionType.IDLE, ActionType.STEP_FORWARD, ActionType.STEP_BACK, ActionType.THRUST, ActionType.LUNGE)
+WEIGHTS = (0.3, 0.35, 0.15, 0.12, 0.08)
+
+
+def check_equivalence(frames, max_delay, rollback_frames, seed=0):
+    rng = random.Random(seed)
+    reference = GameEngine()
+    replay_dir = tempfile.mkdtemp()
+    service = GameService(None, replay_dir, rollback_frames)
+    in_flight = []  # (arrival frame, player, action, stamp)
+    held = [ActionType.IDLE, ActionType.IDLE]
+    arrival = [0, 0]
+
+    for frame in range(frames + max_delay + 1):
+        # Players change what they hold now and then; the server hears about it max_delay frames later at most
+        if frame < frames and not reference.state.game_over:
+            for player in (0, 1):
+                if rng.random() < 0.08:
+                    held[player] = rng.choices(ACTIONS, WEIGHTS)[0]
+                    # In order per player (one websocket each), stamped with the tick_count the client
+                    # is looking at (the server's last published state)
+                    arrival[player] = max(arrival[player], frame + rng.randint(0, max_delay))
+                    in_flight.append((arrival[player], player, held[player], service.engine.core.tick_count))
+            reference.process_tick({0: held[0], 1: held[1]})
+        for message in [m for m in in_flight if m[0] <= frame]:
+            in_flight.remove(message)
+            service.set_player_action(message[1], message[2], tick=message[3])
+        service.tick()
+
+    assert final_summary(service.engine) == final_summary(reference), \
+        f"{final_summary(service.engine)} != {final_summary(reference)}"
+    logs = glob.glob(os.path.join(replay_dir, "*.ftgr"))
+    for path in logs:
+        replay(MatchLog.load(path))  # raises ReplayMismatch if the recorded inputs diverge
+    report = service.rollback.report()
+    print(f"delay <= {max_delay} frames: OK ({report['rollbacks']} rollbacks, "
+          f"{report['resimulated_frames']} frames re-run, {len(logs)} replay(s) verified)")
+
+
+def bench_depth(depth, repeat=2000, seed=0):
+    rng = random.Random(seed)
+    engine = GameEngine()
+    rollback = RollbackBuffer(depth)
+    for _ in range(200):  # get into a mid-bout state
+        engine.process_tick({0: rng.choice(ACTIONS), 1: rng.choice(ACTIONS)})
+    ticks = []  # tick_count each buffered frame started from
+    elapsed = 0.0
+    for i in range(depth + repeat):
+        ticks.append(engine.core.tick_count)
+        rollback.push(engine, ActionType.STEP_FORWARD, ActionType.STEP_BACK)
+        engine.process_tick({0: ActionType.STEP_FORWARD, 1: ActionType.STEP_BACK})
+        if i >= depth:
+            # A correction for the oldest buffered frame, i.e. a full-depth rollback. The window
+            # moves on every time: a player's second input for the same frame would go to the next one
+            start = time.perf_counter()
+            rollback.correct(i % 2, ACTION_TYPES[i % 5], ticks[-depth])
+            rollback.resimulate(engine)
+            elapsed += time.perf_counter() - start
+    return elapsed / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--rollback-frames", type=int, default=8)
+    args = parser.parse_args()
+
+    for max_delay in (0, 2, args.rollback_frames - 1):
+        check_equivalence(args.frames, max_delay, args.rollback_frames)
+
+    budget = 1 / 60
+    print(f"{'depth':>6}{'us/rollback':>14}{'% of 60 Hz tick':>18}")
+    for depth in (1, 2, 4, 8, 16, 32):
+        cost = bench_depth(depth)
+        print(f"{depth:>6}{cost * 1e6:>14.1f}{cost / budget * 100:>17.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+On-demand profilers behind GET /debug/profile (app/game/sampler.py): what the stack
+sampler costs the thread it samples, and checks that its collapsed stacks and the
+tracemalloc report point at the right code.
+
+The engine is ticked on the main thread (the event loop thread on the server)
+with no sampler, then with a StackSampler on it at several rates. The allocation
+check brackets each tick as TickScheduler does while a capture runs: every tick
+queues a buffer that lives until the next tick (the site the report should put
+on top, at one block per tick) and allocates a larger temporary that only the
+per-tick peak can see.
+
+Run from the fencing-ftg directory:
+    python -m benchmarks.sampler
+"""
+import argparse
+import linecache
+import threading
+import time
+from app.game.engine import GameEngine
+from app.game.models import GameConfig
+from app.game.sampler import StackSampler, AllocationTrace
+from .engine_core import make_actions
+
+TEMPORARY = 4096
+
+
+def run(actions, trace=None):
+    engine = GameEngine(GameConfig())
+    pending = []
+    start = time.perf_counter()
+    for act in actions:
+        if trace is not None:
+            trace.begin_tick()
+        if engine.core.game_over:
+            engine.reset_game()
+        engine.process_tick(act)
+        if trace is not None:
+            pending.clear()
+            pending.append(bytearray(64))  # handed on past the tick: the site the report should find
+            scratch = bytearray(TEMPORARY)  # freed within the tick: only in the peak
+            del scratch
+            trace.end_tick()
+    return (time.perf_counter() - start) / len(actions)
+
+
+def check_collapsed(sampler: StackSampler):
+    total = 0
+    for line in sampler.collapsed().splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert stack and int(count) > 0, line
+        total += int(count)
+    assert total == sum(sampler.stacks.values())
+    in_tick = sum(count for stack, count in sampler.stacks.items() if any(f.startswith("process_tick ") for f in stack))
+    assert in_tick > total / 2, f"process_tick in {in_tick} of {total} samples"
+    print(f"collapsed stacks: OK ({len(sampler.stacks)} stacks, process_tick in {in_tick / total:.0%} of samples)")
+
+
+def check_allocations(actions):
+    trace = AllocationTrace().start()
+    try:
+        run(actions, trace)
+    finally:
+        trace.stop()
+    report = trace.report(top=5)
+    site = report["sites"][0]
+    filename, lineno = site["traceback"][-1].rsplit(":", 1)
+    assert "pending.append" in linecache.getline(filename, int(lineno)), site
+    assert report["ticks"] == len(actions) and site["blocks"] >= len(actions), (report["ticks"], site)
+    assert report["tick_peak_bytes"]["max"] >= TEMPORARY, report["tick_peak_bytes"]
+    print(f"allocation report: OK (top site {site['traceback'][-1]}, {site['bytes_per_tick']:.0f} B/tick, "
+          f"{site['blocks_per_tick']:.2f} blocks/tick; tick peak {report['tick_peak_bytes']['avg']:.0f} B avg)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=500000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    actions = make_actions(args.ticks)
+    main_thread = threading.get_ident()
+    rates = (None, 100, 200, 1000)
+    costs = {rate: [] for rate in rates}
+    last = None
+    for _ in range(args.repeat):
+        for rate in rates:
+            if rate is None:
+                costs[rate].append(run(actions))
+                continue
+            sampler = StackSampler(main_thread, 1 / rate).start()
+            try:
+                costs[rate].append(run(actions))
+            finally:
+                sampler.stop()
+            if rate == 200:
+                last = sampler
+    base = min(costs[None])
+    print(f"{'sampler':<16}{'us/tick':>10}{'overhead':>10}")
+    for rate, samples in costs.items():
+        best = min(samples)
+        name = "off" if rate is None else f"{rate} Hz"
+        print(f"{name:<16}{best * 1e6:>10.3f}{(best / base - 1) * 100:>+9.1f}%")
+    # The sampler needs the GIL for each sample, so a busy thread can delay it by up to sys.getswitchinterval()
+    print(f"(200 Hz sampler: {last.samples} samples in {last.elapsed:.2f} s, {last.rate:.0f}/s achieved)\n")
+
+    check_collapsed(last)
+    check_allocations(actions[:20000])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Equivalence check and steps/sec benchmark for SharedMemoryVectorEnv, against
+FencingVectorEnv (single process) and Gymnasium's AsyncVectorEnv (pipes).
+
+Run from the fencing-ftg directory:
+    python -m benchmarks.shm_env
+    python -m benchmarks.shm_env --envs 64 --workers 1,2,4,8
+"""
+import argparse
+import os
+import time
+import numpy as np
+from gymnasium.vector import AsyncVectorEnv
+from app.game.gym_env import FencingEnv, FencingVectorEnv
+from app.game.shm_vec_env import SharedMemoryVectorEnv, VECTOR_THRESHOLD
+
+
+def check_equivalence(num_envs, num_workers, steps=3000, seed=123):
+    rng = np.random.default_rng(seed)
+    ref = FencingVectorEnv(num_envs)
+    env = SharedMemoryVectorEnv(num_envs, num_workers)
+    try:
+        assert np.array_equal(ref.reset(seed=seed)[0], env.reset(seed=seed)[0])
+        for _ in range(steps):
+            actions = rng.integers(0, 5, size=num_envs)
+            for a, b in zip(ref.step(actions), env.step(actions)):
+                if isinstance(a, np.ndarray):
+                    assert np.array_equal(a, b), (a, b)
+    finally:
+        env.close()
+    print(f"equivalence: OK ({num_envs} envs on {num_workers} workers x {steps} steps)")
+
+
+def bench(env, steps, seed=0):
+    pool = [env.action_space.sample() for _ in range(16)]
+    env.reset(seed=seed)
+    start = time.perf_counter()
+    for k in range(steps):
+        env.step(pool[k % len(pool)])
+    rate = env.num_envs * steps / (time.perf_counter() - start)
+    env.close()
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--envs", type=int, default=32)
+    parser.add_argument("--workers", help="comma-separated worker counts (default: 1, 2, 4, ... up to the core count)")
+    parser.add_argument("--steps", type=int, default=2000, help="vector steps per run")
+    parser.add_argument("--skip-check", action="store_true", help="skip the equivalence check")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    workers = [int(w) for w in args.workers.split(",")] if args.workers else \
+        [w for w in (1, 2, 4, 8, 16, 32, 64) if w <= cores] or [1]
+
+    if not args.skip_check:
+        check_equivalence(4, 2)                               # FencingEnv per env in the workers
+        check_equivalence(2 * VECTOR_THRESHOLD + 3, 2)        # FencingVectorEnv slices
+
+    print(f"\n{args.envs} envs, {cores} cores")
+    print(f"{'env':<40}{'steps/sec':>16}")
+    print(f"{'FencingVectorEnv (1 process)':<40}{bench(FencingVectorEnv(args.envs, copy=False), args.steps):>16,.0f}")
+    for w in workers:
+        if w <= args.envs:
+            env = SharedMemoryVectorEnv(args.envs, w, copy=False)
+            print(f"{f'SharedMemoryVectorEnv workers={w}':<40}{bench(env, args.steps):>16,.0f}")
+    # Gymnasium's process-per-env vector env, pipes for actions/rewards (obs in shared memory)
+    async_env = AsyncVectorEnv([FencingEnv for _ in range(args.envs)], shared_memory=True,
+                               autoreset_mode="NextStep")
+    print(f"{'AsyncVectorEnv (1 process per env)':<40}{bench(async_env, max(args.steps // 10, 10)):>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Spectator fan-out: what N watchers cost the two players of a room (app/rooms.py SpectatorHub).
+
+In-process, with stub websockets that only record when they were written to.
+Per frame it measures the room's tick() + publish() (the players' critical path),
+the delay until both players' snapshots were handed to their sockets, and the
+deferred spectator fan-out; and checks every spectator got its 60/30/10 Hz share.
+
+Run from the fencing-ftg directory:
+    python -m benchmarks.spectators
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from app.rooms import Room, SPECTATOR_RATES
+from app.protocol import FORMAT_BINARY
+
+
+class StubWebSocket:
+    def __init__(self):
+        self.sent = 0
+        self.last_send = 0.0
+
+    async def accept(self):
+        pass
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+    async def send_bytes(self, data):
+        self.sent += 1
+        self.last_send = time.perf_counter()
+
+    send_text = send_bytes
+
+
+async def run(spectators: int, frames: int):
+    room = Room("bench")
+    room._skip_fields = 0  # publish every tick (as with rollback), so each frame exercises the fan-out
+    players = [StubWebSocket() for _ in range(2)]
+    for ws in players:
+        await room.manager.connect(ws, FORMAT_BINARY)
+    watchers = []
+    for i in range(spectators):
+        ws = StubWebSocket()
+        rate = SPECTATOR_RATES[i % len(SPECTATOR_RATES)]
+        await room.spectators.subscribe(ws, FORMAT_BINARY, rate)
+        watchers.append((ws, rate))
+
+    fan_out = room.spectators._fan_out
+    fan_out_times = []
+
+    def timed_fan_out():
+        start = time.perf_counter()
+        fan_out()
+        fan_out_times.append(time.perf_counter() - start)
+    room.spectators._fan_out = timed_fan_out
+
+    critical, delivery = [], []
+    for _ in range(frames):
+        start = time.perf_counter()
+        room.tick()
+        room.publish()
+        critical.append(time.perf_counter() - start)
+        # Let the writers and the fan-out run, as the scheduler's sleep until the next frame would
+        for _ in range(4):
+            await asyncio.sleep(0)
+        delivery.append(max(ws.last_send for ws in players) - start)
+        for _ in range(16):
+            await asyncio.sleep(0)
+
+    for ws, rate in watchers:
+        expected = frames * rate // 60
+        assert abs(ws.sent - expected) <= 1, (rate, ws.sent, expected)
+    assert all(ws.sent == frames for ws in players)
+    for client in list(room.manager.players.values()):
+        client.close()
+    for group in room.spectators.groups.values():
+        for client in group:
+            client.close()
+    return (statistics.median(critical), statistics.median(delivery),
+            statistics.median(fan_out_times) if fan_out_times else 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=600)
+    args = parser.parse_args()
+
+    print(f"{'spectators':>10}{'tick+publish us':>18}{'player delivery us':>20}{'fan-out us':>12}")
+    for spectators in (0, 10, 100, 500):
+        critical, delivery, fan_out = asyncio.run(run(spectators, args.frames))
+        print(f"{spectators:>10}{critical * 1e6:>18.1f}{delivery * 1e6:>20.1f}{fan_out * 1e6:>12.1f}")
+    print("delivery: OK (players every frame, spectators at their rate)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Server startup: time from launching `uvicorn app.main:app` to the first accepted
+websocket, and to the trained model being ready for PVE rooms.
+
+Run from the fencing-ftg directory:
+    python -m benchmarks.startup
+"""
+import argparse
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+import websockets
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_for_websocket(url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with websockets.connect(url) as ws:
+                await ws.recv()  # accepted and ticking
+                return
+        except OSError:
+            await asyncio.sleep(0.005)
+    raise TimeoutError(f"no websocket accepted within {timeout}s")
+
+
+def wait_for_model(base_url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        report = json.loads(urllib.request.urlopen(f"{base_url}/rooms").read())
+        if (report.get("inference") or {}).get("model"):
+            return report["inference"]["model"]
+        time.sleep(0.01)
+    raise TimeoutError(f"model not loaded within {timeout}s")
+
+
+def measure(timeout):
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        asyncio.run(wait_for_websocket(f"ws://127.0.0.1:{port}/ws?room=startup-bench", timeout))
+        first_ws = time.perf_counter() - start
+        model = wait_for_model(f"http://127.0.0.1:{port}", timeout)
+        model_ready = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    return first_ws, model_ready, model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    print(f"{'run':>4}{'first websocket s':>20}{'model ready s':>16}  model")
+    for run in range(args.runs):
+        first_ws, model_ready, model = measure(args.timeout)
+        print(f"{run:>4}{first_ws:>20.3f}{model_ready:>16.3f}  {model}")
+
+
+if __name__ == "__main__":
+    main()
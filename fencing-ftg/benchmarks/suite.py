@@ -0,0 +1,320 @@
+"""
+Benchmark suite: one reproducible run over the engine, the Gym env, snapshot
+serialization, input parsing, the AIs and headless stickftg stepping, written to JSON and
+optionally compared against a stored baseline.
+
+Run from the fencing-ftg directory:
+    python -m benchmarks.suite                                  # print results
+    python -m benchmarks.suite --output results.json            # keep them
+    python -m benchmarks.suite --baseline benchmarks/baseline.json
+    python -m benchmarks.suite --save-baseline                  # refresh the stored baseline
+    python -m benchmarks.suite --only engine,ai --quick
+
+Each benchmark runs a fixed, seeded workload `repeat` times and keeps the best run.
+With --baseline, metrics that got worse by more than --tolerance are listed and
+the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import numpy as np
+from app.game.engine import GameEngine
+from app.game.models import GameConfig, ActionType, ACTION_TYPES
+from app.game.ai import SimpleAI
+from app.protocol import SnapshotEncoder, encode_input, decode_input, decode_json_input
+from .batched_engine import random_actions
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+STICKFTG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "stickftg")
+
+# Neutral play: footwork only, so nobody ever scores
+NEUTRAL_ACTIONS = (ActionType.IDLE, ActionType.STEP_FORWARD, ActionType.STEP_BACK)
+
+
+class Skipped(Exception):
+    """A benchmark that cannot run here (e.g. an optional dependency is missing)."""
+
+
+def best_rate(run, count, repeat):
+    """Best-of-repeat rate of run() doing `count` operations."""
+    best = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = max(best, count / (time.perf_counter() - start))
+    return best
+
+
+def metric(value, unit, higher_is_better=True):
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+
+# --- engine ---------------------------------------------------------------
+
+def _tick_loop(engine, actions, setup=None):
+    def run():
+        for act in actions:
+            if setup is not None:
+                setup(engine)
+            elif engine.core.game_over:
+                engine.reset_game()
+            engine.process_tick(act)
+    return run
+
+
+def bench_engine(ticks, repeat):
+    rng = random.Random(0)
+    mixed = [{0: ACTION_TYPES[a], 1: ACTION_TYPES[b]} for a, b in random_actions(np.random.default_rng(0), ticks)]
+    neutral = [{0: rng.choice(NEUTRAL_ACTIONS), 1: rng.choice(NEUTRAL_ACTIONS)} for _ in range(ticks)]
+
+    def keep_frozen(engine):
+        if engine.reset_timer == 0:
+            engine.reset_timer = 60
+
+    def keep_over(engine):
+        engine.core.game_over = True
+
+    results = {}
+    for name, actions, setup in (("mixed", mixed, None), ("neutral", neutral, None),
+                                 ("freeze_frames", mixed, keep_frozen), ("game_over", mixed, keep_over)):
+        rate = best_rate(_tick_loop(GameEngine(GameConfig()), actions, setup), ticks, repeat)
+        results[f"engine.process_tick.{name}"] = metric(rate, "ticks/s")
+    return results
+
+
+# --- Gym env --------------------------------------------------------------
+
+def bench_env(steps, repeat):
+    try:
+        from app.game.gym_env import FencingEnv
+    except ImportError as e:
+        raise Skipped(f"gymnasium not available: {e}")
+    env = FencingEnv()
+    env.reset(seed=0)
+    actions = np.random.default_rng(0).integers(0, 5, steps)
+
+    def run():
+        for action in actions:
+            _, _, terminated, truncated, _ = env.step(int(action))
+            if terminated or truncated:
+                env.reset()
+    return {"env.FencingEnv.step": metric(best_rate(run, steps, repeat), "steps/s")}
+
+
+# --- serialization --------------------------------------------------------
+
+def bench_serialization(ticks, repeat):
+    engine = GameEngine(GameConfig())
+    ais = [SimpleAI(0, seed=0), SimpleAI(1, seed=1)]
+    cores, states = [], []
+    for _ in range(ticks):
+        if engine.core.game_over:
+            engine.reset_game()
+        engine.process_tick({ai.player_id: ai.decide(engine.core) for ai in ais})
+        states.append(engine.state)
+        cores.append(engine.snapshot())
+    replay = GameEngine(GameConfig())
+
+    def model_dump():
+        for state in states:
+            json.dumps(state.model_dump(mode="json"), separators=(",", ":"), ensure_ascii=False)
+
+    def encoded(fmt):
+        def run():
+            encoder = SnapshotEncoder()
+            for snapshot in cores:
+                replay.restore(snapshot)
+                out = encoder.encode_core(replay.core)
+                out.json if fmt == "json" else out.binary_for(out.seq - 1)
+        return run
+
+    results = {}
+    for name, run in (("model_dump_json", model_dump), ("snapshot_json", encoded("json")),
+                      ("snapshot_binary", encoded("bin"))):
+        rate = best_rate(run, ticks, repeat)
+        results[f"serialization.{name}"] = metric(1e6 / rate, "us/snapshot", higher_is_better=False)
+    return results
+
+
+def bench_inputs(messages, repeat):
+    rng = random.Random(0)
+    inputs = [(rng.choice(ACTION_TYPES[:5]), rng.randrange(100000)) for _ in range(messages)]
+    texts = [json.dumps({"action": action.value, "tick": tick}) for action, tick in inputs]
+    frames = [encode_input(action, tick) for action, tick in inputs]
+
+    def parse_json():
+        for text in texts:
+            action_str, _, tick = decode_json_input(text)
+            ActionType[action_str]
+
+    def parse_binary():
+        for frame in frames:
+            decode_input(frame)
+
+    results = {}
+    for name, run in (("parse_json", parse_json), ("parse_binary", parse_binary)):
+        rate = best_rate(run, messages, repeat)
+        results[f"inputs.{name}"] = metric(1e6 / rate, "us/message", higher_is_better=False)
+    return results
+
+
+# --- AIs ------------------------------------------------------------------
+
+def bench_ai(decisions, repeat):
+    engine = GameEngine(GameConfig())
+    rng = random.Random(0)
+    snapshots = []
+    for _ in range(decisions):
+        if engine.core.game_over:
+            engine.reset_game()
+        engine.process_tick({0: rng.choice(ACTION_TYPES[:5]), 1: rng.choice(ACTION_TYPES[:5])})
+        snapshots.append(engine.snapshot())
+
+    def decide(ai_call):
+        def run():
+            for snapshot in snapshots:
+                engine.restore(snapshot)
+                ai_call()
+        return run
+
+    simple = SimpleAI(1, seed=0)
+    results = {"ai.SimpleAI.decide": metric(best_rate(decide(lambda: simple.decide(engine.core)), decisions, repeat),
+                                            "decisions/s")}
+    from app.game.trained_ai import TrainedAI, get_model
+    model = get_model()
+    if model is None:
+        results["ai.TrainedAI.process"] = {"skipped": "no trained model"}
+    else:
+        trained = TrainedAI(model=model)
+        results["ai.TrainedAI.process"] = metric(
+            best_rate(decide(lambda: trained.process(engine, 1, 0)), decisions, repeat), "decisions/s")
+    return results
+
+
+# --- stickftg -------------------------------------------------------------
+
+def bench_stickftg(frames, repeat):
+    try:
+        import pygame  # noqa: F401 (stickftg imports it at module level, even headless)
+    except ImportError:
+        raise Skipped("pygame not installed")
+    if STICKFTG_DIR not in sys.path:
+        sys.path.insert(0, STICKFTG_DIR)
+    from game.core.game import Game
+
+    rng = np.random.default_rng(0)
+    actions = rng.integers(0, 5, (frames, 2))
+    game = Game(headless=True)
+
+    def run():
+        for a, b in actions:
+            if game.match.winner is not None:
+                game.restart()
+            game.apply_action(game.p1, int(a))
+            game.apply_action(game.p2, int(b))
+            game.step_one_frame()
+    return {"stickftg.Game.step_one_frame": metric(best_rate(run, frames, repeat), "frames/s")}
+
+
+# name -> (function, workload size, quick workload size)
+BENCHMARKS = {
+    "engine": (bench_engine, 50000, 5000),
+    "env": (bench_env, 20000, 2000),
+    "serialization": (bench_serialization, 5000, 1000),
+    "inputs": (bench_inputs, 50000, 5000),
+    "ai": (bench_ai, 5000, 500),
+    "stickftg": (bench_stickftg, 20000, 2000),
+}
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+
+
+def run_suite(names, quick=False, repeat=5) -> dict:
+    results = {}
+    for name in names:
+        func, size, quick_size = BENCHMARKS[name]
+        try:
+            results.update(func(quick_size if quick else size, 1 if quick else repeat))
+        except Skipped as e:
+            results[name] = {"skipped": str(e)}
+    return {"environment": environment(), "results": results}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Print current vs baseline; returns the names of metrics that regressed beyond tolerance."""
+    regressions = []
+    print(f"\n{'metric':<40}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, current in results["results"].items():
+        base = baseline["results"].get(name)
+        if "value" not in current or not base or "value" not in base:
+            continue
+        change = current["value"] / base["value"] - 1
+        better = change if current["higher_is_better"] else -change
+        flag = ""
+        if better < -tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<40}{base['value']:>14,.2f}{current['value']:>14,.2f}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", help=f"comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--quick", action="store_true", help="small workloads, single run (smoke test)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write the results to {BASELINE_PATH}")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown vs baseline (fraction)")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    results = run_suite(names, args.quick, args.repeat)
+    print(f"{'metric':<40}{'value':>14}  unit")
+    for name, result in results["results"].items():
+        if "skipped" in result:
+            print(f"{name:<40}{'skipped':>14}  ({result['skipped']})")
+        else:
+            print(f"{name:<40}{result['value']:>14,.2f}  {result['unit']}")
+
+    for path in filter(None, (args.output, BASELINE_PATH if args.save_baseline else None)):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"wrote {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
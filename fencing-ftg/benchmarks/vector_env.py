@@ -0,0 +1,117 @@
+"""
+Equivalence check and steps/sec benchmark for FencingVectorEnv.
+
+Run from the fencing-ftg directory:
+    python -m benchmarks.vector_env
+"""
+import argparse
+import time
+import numpy as np
+from gymnasium.vector import SyncVectorEnv
+from app.game.gym_env import FencingEnv, FencingVectorEnv
+
+
+def check_equivalence(num_envs=32, steps=5000, seed=123, frame_skip=1, skip_locked=False):
+    rng = np.random.default_rng(seed)
+    envs = [FencingEnv(frame_skip=frame_skip, skip_locked=skip_locked) for _ in range(num_envs)]
+    vec = FencingVectorEnv(num_envs, frame_skip=frame_skip, skip_locked=skip_locked)
+
+    obs = [env.reset(seed=seed + i)[0] for i, env in enumerate(envs)]
+    vec_obs, _ = vec.reset(seed=seed)
+    assert np.array_equal(np.stack(obs), vec_obs)
+
+    done = [False] * num_envs
+    episodes = 0
+    for _ in range(steps):
+        actions = rng.integers(0, 5, size=num_envs)
+        vec_obs, vec_rew, vec_term, vec_trunc, _ = vec.step(actions)
+        for i, env in enumerate(envs):
+            # Next-step autoreset, as in FencingVectorEnv
+            if done[i]:
+                o, _ = env.reset()
+                r, term = 0.0, False
+                episodes += 1
+            else:
+                o, r, term, trunc, _ = env.step(int(actions[i]))
+            done[i] = term
+            assert np.array_equal(o, vec_obs[i]), (i, o, vec_obs[i])
+            assert r == vec_rew[i] and term == vec_term[i], (i, r, vec_rew[i], term, vec_term[i])
+    print(f"equivalence: OK ({num_envs} envs x {steps} steps, frame_skip={frame_skip}, "
+          f"skip_locked={skip_locked}, {episodes} autoresets)")
+
+
+def check_frame_skip(steps=5000, seed=7, frame_skip=4, skip_locked=True):
+    """A frame-skipped step must equal its ticks run one by one on a frame_skip=1 env."""
+    rng = np.random.default_rng(seed)
+    skipped = FencingEnv(frame_skip=frame_skip, skip_locked=skip_locked)
+    single = FencingEnv()
+    skipped.reset(seed=seed)
+    single.reset(seed=seed)
+    for _ in range(steps):
+        action = int(rng.integers(0, 5))
+        obs, reward, term, _, info = skipped.step(action)
+        total = 0.0
+        for tick in range(info["ticks"]):
+            # repeated action for the frame-skip ticks, IDLE for the locked ones after them
+            o, r, t, _, _ = single.step(action if tick < frame_skip else 0)
+            total += r
+        assert np.array_equal(obs, o) and reward == total and term == t, (obs, o, reward, total)
+        if term:
+            skipped.reset()
+            single.reset()
+    print(f"frame skip: OK ({steps} steps, frame_skip={frame_skip}, skip_locked={skip_locked})")
+
+
+def bench_frame_skip(steps=20000, seed=0):
+    """FencingEnv decisions/sec and simulated ticks/sec per frame-skip setting."""
+    print(f"{'FencingEnv':<32}{'decisions/sec':>16}{'ticks/sec':>16}{'ticks/decision':>16}")
+    for frame_skip, skip_locked in ((1, False), (4, False), (1, True), (4, True)):
+        env = FencingEnv(frame_skip=frame_skip, skip_locked=skip_locked)
+        env.reset(seed=seed)
+        actions = np.random.default_rng(seed).integers(0, 5, steps)
+        ticks = 0
+        start = time.perf_counter()
+        for action in actions:
+            _, _, term, _, info = env.step(int(action))
+            ticks += info["ticks"]
+            if term:
+                env.reset()
+        elapsed = time.perf_counter() - start
+        name = f"frame_skip={frame_skip} skip_locked={skip_locked}"
+        print(f"{name:<32}{steps / elapsed:>16,.0f}{ticks / elapsed:>16,.0f}{ticks / steps:>16.1f}")
+
+
+def bench(env, steps, seed=0):
+    pool = [env.action_space.sample() for _ in range(16)]
+    env.reset(seed=seed)
+    start = time.perf_counter()
+    for k in range(steps):
+        env.step(pool[k % len(pool)])
+    return env.num_envs * steps / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--skip-check", action="store_true", help="skip the equivalence check")
+    args = parser.parse_args()
+
+    if not args.skip_check:
+        check_equivalence()
+        check_equivalence(frame_skip=4)
+        check_equivalence(frame_skip=4, skip_locked=True)
+        check_frame_skip()
+        check_frame_skip(frame_skip=1)
+
+    bench_frame_skip()
+
+    print(f"{'env':<32}{'steps/sec':>16}")
+    for num_envs in (1, 16, 256):
+        sync = SyncVectorEnv([FencingEnv for _ in range(num_envs)], autoreset_mode="NextStep")
+        print(f"{f'SyncVectorEnv N={num_envs}':<32}{bench(sync, max(20000 // num_envs, 20)):>16,.0f}")
+    for num_envs in (1, 16, 256, 4096):
+        vec = FencingVectorEnv(num_envs, copy=False)
+        print(f"{f'FencingVectorEnv N={num_envs}':<32}{bench(vec, max(200000 // num_envs, 200)):>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import numpy as np
+from stable_baselines3 import PPO
+from app.game.numpy_policy import NumpyPolicy, ACTIVATIONS, file_sha256
+
+def export(model_path, out_path):
+    """Write the actor network of a PPO MlpPolicy to a torch-free .npz (see app/game/numpy_policy.py)."""
+    model = PPO.load(model_path)
+    policy = model.policy
+    
+    # Linear layers of the actor: mlp_extractor.policy_net (Linear/activation pairs), then action_net
+    linears = [m for m in policy.mlp_extractor.policy_net if hasattr(m, "weight")]
+    activations = {type(m).__name__ for m in policy.mlp_extractor.policy_net if not hasattr(m, "weight")}
+    linears.append(policy.action_net)
+    if len(activations) > 1 or not activations <= set(ACTIVATIONS):
+        raise ValueError(f"Unsupported activation(s): {activations}")
+    
+    arrays = {
+        "num_layers": np.array(len(linears)),
+        "activation": np.array(activations.pop() if activations else "Tanh"),
+        "source_sha256": np.array(file_sha256(model_path)),  # lets load_model() spot a stale export
+    }
+    for i, layer in enumerate(linears):
+        arrays[f"w{i}"] = layer.weight.detach().cpu().numpy().astype(np.float32)
+        arrays[f"b{i}"] = layer.bias.detach().cpu().numpy().astype(np.float32)
+    np.savez_compressed(out_path, **arrays)
+    print(f"Policy exported to {out_path}")
+    return model
+
+def test_observations(count=100000, seed=0):
+    """Random observations over (and a little beyond) the FencingEnv observation space."""
+    rng = np.random.default_rng(seed)
+    obs = np.empty((count, 7), dtype=np.float32)
+    obs[:, 0] = rng.uniform(-1.0, 15.0, count)           # distance
+    obs[:, 1:3] = rng.uniform(-1.0, 15.0, (count, 2))    # positions
+    obs[:, 3:5] = rng.integers(0, 7, (count, 2))         # state codes
+    obs[:, 5:7] = rng.integers(0, 6, (count, 2))         # scores
+    return obs
+
+def check(model, out_path):
+    """Deterministic actions must match PPO.predict exactly."""
+    policy = NumpyPolicy.load(out_path)
+    obs = test_observations()
+    expected, _ = model.predict(obs, deterministic=True)
+    got, _ = policy.predict(obs, deterministic=True)
+    mismatches = int(np.count_nonzero(expected != got))
+    for single in obs[:1000]:
+        if int(model.predict(single, deterministic=True)[0]) != int(policy.predict(single)[0]):
+            mismatches += 1
+    print(f"Checked {len(obs) + 1000} observations: {mismatches} mismatches")
+    return mismatches == 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the trained PPO policy for the torch-free NumPy backend")
+    parser.add_argument("--model", default="app/models/ppo_fencing.zip")
+    parser.add_argument("--out", default="app/models/ppo_fencing.npz")
+    args = parser.parse_args()
+    
+    model = export(args.model, args.out)
+    if not check(model, args.out):
+        raise SystemExit("Exported policy does not reproduce PPO.predict")
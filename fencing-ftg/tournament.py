@@ -0,0 +1,333 @@
+"""
+Headless AI-vs-AI round-robin tournament.
+
+    python tournament.py simple app/models/ppo_fencing.zip old=checkpoints/ppo_fencing_500000_steps.zip
+    python tournament.py simple rush new=app/models/ppo_fencing.zip --bouts 2000 --gate new --min-score 0.55
+
+Entrants are `[name=]spec`, where spec is one of the scripted bots (see BOTS:
+simple, idle, random, rush, gym) or a PPO .zip / exported .npz (played by
+TrainedAI, with its reaction delay). Every pair plays --bouts bouts, half on
+each side, through GameEngine.process_tick at full speed: chunks of bouts are
+stepped in lockstep (one batched policy call per model and tick) and spread
+over a process pool. Reports each pairing's win rates and mean touch
+differential, and Elo ratings fitted to all results (draws count half; the
+ratings average 1500).
+
+With --gate NAME the exit status is 1 unless NAME scores at least --min-score
+(wins + draws/2, per bout) against every other entrant.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+import numpy as np
+from app.game.engine import GameEngine
+from app.game.models import ActionType, GameConfig
+from app.game.ai import SimpleAI
+from app.game.gym_env import OPPONENT_CLOSE_IN_DISTANCE, OPPONENT_BACK_OFF_DISTANCE, OPPONENT_THRUST_CHANCE
+
+ACTIONS = (ActionType.IDLE, ActionType.STEP_FORWARD, ActionType.STEP_BACK, ActionType.THRUST, ActionType.LUNGE)
+
+
+# --- entrants -------------------------------------------------------------
+# A scripted player is built per bout as factory(player_id, seed) and asked act(engine) once per tick.
+
+class SimplePlayer:
+    def __init__(self, player_id: int, seed: int):
+        self.ai = SimpleAI(player_id, seed=seed)
+
+    def act(self, engine: GameEngine) -> ActionType:
+        return self.ai.decide(engine.core)
+
+
+class IdlePlayer:
+    def __init__(self, player_id: int, seed: int):
+        pass
+
+    def act(self, engine: GameEngine) -> ActionType:
+        return ActionType.IDLE
+
+
+class RandomPlayer:
+    def __init__(self, player_id: int, seed: int):
+        self.rng = random.Random(seed)
+
+    def act(self, engine: GameEngine) -> ActionType:
+        return self.rng.choice(ACTIONS)
+
+
+class RushPlayer:
+    """Closes in and lunges as soon as the opponent is within lunge range."""
+
+    def __init__(self, player_id: int, seed: int):
+        pass
+
+    def act(self, engine: GameEngine) -> ActionType:
+        if engine.core.distance > 3.0:
+            return ActionType.STEP_FORWARD
+        return ActionType.LUNGE
+
+
+class GymOpponentPlayer:
+    """The scripted opponent FencingEnv trains against (P2 rules, from either side)."""
+
+    def __init__(self, player_id: int, seed: int):
+        self.rng = random.Random(seed)
+
+    def act(self, engine: GameEngine) -> ActionType:
+        dist = engine.core.distance
+        if dist > OPPONENT_CLOSE_IN_DISTANCE:
+            return ActionType.STEP_FORWARD
+        if dist < OPPONENT_BACK_OFF_DISTANCE:
+            return ActionType.STEP_BACK
+        if self.rng.random() < OPPONENT_THRUST_CHANCE:
+            return ActionType.THRUST
+        return ActionType.IDLE
+
+
+BOTS = {
+    "simple": SimplePlayer,
+    "idle": IdlePlayer,
+    "random": RandomPlayer,
+    "rush": RushPlayer,
+    "gym": GymOpponentPlayer,
+}
+
+
+class TrainedPlayer:
+    """TrainedAI; its observations are batched per model across the bouts of a chunk (see play_chunk)."""
+
+    def __init__(self, player_id: int, model, reaction_delay: int):
+        from app.game.trained_ai import TrainedAI
+        self.player_id = player_id
+        self.model = model
+        self.ai = TrainedAI(model=model, reaction_delay=reaction_delay)
+
+    def observe(self, engine: GameEngine):
+        return self.ai.observe(engine, self.player_id, 1 - self.player_id)
+
+
+def make_player(spec: str, player_id: int, seed: int, reaction_delay: int):
+    if spec in BOTS:
+        return BOTS[spec](player_id, seed)
+    from app.game.trained_ai import get_model
+    # load_model() takes the .zip path and prefers the up-to-date .npz next to it
+    model = get_model(os.path.splitext(spec)[0] + ".zip")  # cached per worker process
+    if model is None:
+        raise ValueError(f"no model at {spec}")
+    return TrainedPlayer(player_id, model, reaction_delay)
+
+
+def parse_entrant(text: str):
+    name, _, spec = text.rpartition("=")
+    spec = spec.strip()
+    if not name:
+        name = spec if spec in BOTS else os.path.splitext(os.path.basename(spec))[0]
+    if spec not in BOTS and not os.path.exists(spec):
+        raise argparse.ArgumentTypeError(f"{spec!r} is neither a bot ({', '.join(BOTS)}) nor a model file")
+    return name, spec
+
+
+# --- bouts ----------------------------------------------------------------
+
+def play_chunk(spec_a: str, spec_b: str, a_side: int, seeds, config: dict, max_ticks: int, reaction_delay: int) -> dict:
+    """
+    A batch of bouts of one pairing with A on a_side, stepped in lockstep so each
+    model runs one batched predict() per tick; returns totals from A's point of view.
+    A bout still running after max_ticks is a draw.
+    """
+    from app.game.trained_ai import ACT_MAP
+    config = GameConfig(**config)
+    specs = (spec_a, spec_b) if a_side == 0 else (spec_b, spec_a)
+    engines = [GameEngine(config) for _ in seeds]
+    players = [[make_player(specs[side], side, seed + side, reaction_delay) for side in (0, 1)] for seed in seeds]
+    actions = [{} for _ in seeds]
+
+    active = list(range(len(seeds)))
+    for _ in range(max_ticks):
+        if not active:
+            break
+        batches = {}  # id(model) -> (model, [(bout, side)], [observation])
+        for i in active:
+            for side, player in enumerate(players[i]):
+                if isinstance(player, TrainedPlayer):
+                    _, slots, obs = batches.setdefault(id(player.model), (player.model, [], []))
+                    slots.append((i, side))
+                    obs.append(player.observe(engines[i]))
+                else:
+                    actions[i][side] = player.act(engines[i])
+        for model, slots, obs in batches.values():
+            predicted, _ = model.predict(np.stack(obs), deterministic=True)
+            for (i, side), action in zip(slots, predicted):
+                actions[i][side] = ACT_MAP.get(int(action), ActionType.IDLE)
+        for i in active:
+            engines[i].process_tick(actions[i])
+        active = [i for i in active if not engines[i].core.game_over]
+
+    totals = {"bouts": len(seeds), "wins": 0, "losses": 0, "draws": 0, "touches_for": 0, "touches_against": 0}
+    for engine in engines:
+        core = engine.core
+        totals["touches_for"] += core.fencers[a_side].score
+        totals["touches_against"] += core.fencers[1 - a_side].score
+        if not core.game_over or core.winner not in (0, 1):
+            totals["draws"] += 1
+        elif core.winner == a_side:
+            totals["wins"] += 1
+        else:
+            totals["losses"] += 1
+    return totals
+
+
+# --- ratings --------------------------------------------------------------
+
+def fit_elo(names, pairings: dict, iterations: int = 1000) -> dict:
+    """
+    Elo ratings (mean 1500) from the Bradley-Terry fit of all results, draws as half
+    a win. One virtual draw per pairing keeps unbeaten/winless entrants finite.
+    """
+    scores = {name: 0.0 for name in names}
+    games = {}
+    for (a, b), t in pairings.items():
+        score_a = t["wins"] + 0.5 * t["draws"] + 0.5
+        score_b = t["losses"] + 0.5 * t["draws"] + 0.5
+        scores[a] += score_a
+        scores[b] += score_b
+        games[a, b] = games[b, a] = t["bouts"] + 1
+
+    strength = {name: 1.0 for name in names}
+    for _ in range(iterations):
+        new = {}
+        for i in names:
+            denom = sum(n / (strength[i] + strength[j]) for (x, j), n in games.items() if x == i)
+            new[i] = scores[i] / denom if denom else strength[i]
+        # Normalise (geometric mean 1) so the ratings average 1500
+        mean_log = sum(math.log(s) for s in new.values()) / len(new)
+        new = {k: s / math.exp(mean_log) for k, s in new.items()}
+        converged = max(abs(new[k] - strength[k]) for k in names) < 1e-10
+        strength = new
+        if converged:
+            break
+    return {name: 1500 + 400 * math.log10(strength[name]) for name in names}
+
+
+# --- tournament -----------------------------------------------------------
+
+def run_tournament(entrants, bouts: int, workers: int, chunk: int, seed: int, config: GameConfig,
+                   max_ticks: int, reaction_delay: int) -> dict:
+    tasks = []
+    for (name_a, spec_a), (name_b, spec_b) in combinations(entrants, 2):
+        for a_side in (0, 1):
+            count = bouts // 2 + (bouts % 2 if a_side == 0 else 0)
+            seeds = [seed + 2 * i for i in range(a_side * bouts, a_side * bouts + count)]
+            for lo in range(0, count, chunk):
+                tasks.append(((name_a, name_b), (spec_a, spec_b, a_side, seeds[lo:lo + chunk], config.model_dump(),
+                                                 max_ticks, reaction_delay)))
+
+    start = time.perf_counter()
+    if workers <= 1:
+        results = [play_chunk(*args) for _, args in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(play_chunk, *args) for _, args in tasks]
+            results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    pairings = {}
+    for (pair, _), totals in zip(tasks, results):
+        acc = pairings.setdefault(pair, dict.fromkeys(totals, 0))
+        for key, value in totals.items():
+            acc[key] += value
+
+    names = [name for name, _ in entrants]
+    elo = fit_elo(names, pairings)
+    report = []
+    for (a, b), t in pairings.items():
+        report.append({
+            "a": a, "b": b, **t,
+            "a_win_rate": t["wins"] / t["bouts"],
+            "b_win_rate": t["losses"] / t["bouts"],
+            "draw_rate": t["draws"] / t["bouts"],
+            "a_score": (t["wins"] + 0.5 * t["draws"]) / t["bouts"],
+            "touch_diff": (t["touches_for"] - t["touches_against"]) / t["bouts"],
+        })
+    total_bouts = sum(t["bouts"] for t in pairings.values())
+    return {
+        "entrants": dict(entrants),
+        "pairings": report,
+        "elo": dict(sorted(elo.items(), key=lambda kv: -kv[1])),
+        "bouts": total_bouts,
+        "seconds": elapsed,
+        "bouts_per_s": total_bouts / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def score_against(report: dict, name: str) -> dict:
+    """name's score (wins + draws/2 per bout) against each opponent."""
+    scores = {}
+    for p in report["pairings"]:
+        if p["a"] == name:
+            scores[p["b"]] = p["a_score"]
+        elif p["b"] == name:
+            scores[p["a"]] = 1.0 - p["a_score"]
+    return scores
+
+
+def print_report(report: dict):
+    print(f"\n{report['bouts']} bouts in {report['seconds']:.1f}s ({report['bouts_per_s']:,.0f} bouts/s)\n")
+    print(f"{'A':<16}{'B':<16}{'bouts':>7}{'A win':>8}{'B win':>8}{'draw':>8}{'touch diff':>12}")
+    for p in report["pairings"]:
+        print(f"{p['a']:<16}{p['b']:<16}{p['bouts']:>7}{p['a_win_rate']:>8.1%}{p['b_win_rate']:>8.1%}"
+              f"{p['draw_rate']:>8.1%}{p['touch_diff']:>+12.2f}")
+    print(f"\n{'entrant':<16}{'Elo':>8}")
+    for name, rating in report["elo"].items():
+        print(f"{name:<16}{rating:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("entrants", nargs="+", type=parse_entrant, help="[name=]bot or model path")
+    parser.add_argument("--bouts", type=int, default=1000, help="bouts per pairing (half on each side)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk", type=int, default=50, help="bouts per pool task")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-score", type=int, default=GameConfig().max_score)
+    parser.add_argument("--max-ticks", type=int, default=60 * 60 * 3, help="bout is a draw after this many ticks")
+    parser.add_argument("--reaction-delay", type=int, default=15, help="TrainedAI reaction delay (ticks)")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    parser.add_argument("--gate", help="entrant that must reach --min-score against every other entrant")
+    parser.add_argument("--min-score", type=float, default=0.5)
+    args = parser.parse_args()
+
+    names = [name for name, _ in args.entrants]
+    if len(set(names)) != len(names):
+        parser.error("entrant names must be unique (use name=spec)")
+    if len(names) < 2:
+        parser.error("need at least two entrants")
+    if args.gate is not None and args.gate not in names:
+        parser.error(f"--gate {args.gate!r} is not an entrant")
+
+    report = run_tournament(args.entrants, args.bouts, args.workers, args.chunk, args.seed,
+                            GameConfig(max_score=args.max_score), args.max_ticks, args.reaction_delay)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}")
+
+    if args.gate is not None:
+        failed = {opponent: score for opponent, score in score_against(report, args.gate).items()
+                  if score < args.min_score}
+        for opponent, score in failed.items():
+            print(f"GATE: {args.gate} scored {score:.1%} against {opponent} (< {args.min_score:.0%})")
+        if failed:
+            sys.exit(1)
+        print(f"GATE: {args.gate} passed (>= {args.min_score:.0%} against every entrant)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Multi-process PPO training for FencingEnv (train_rl.py is the single-process demo).
+
+    python train_parallel.py --envs 8 --timesteps 1000000
+    python train_parallel.py --resume latest --timesteps 2000000   # continue up to 2M steps
+
+Every env runs in its own worker process (SubprocVecEnv); each rollout is
+n_steps x envs transitions gathered in parallel, then the learner runs its
+PPO epochs on them. Resumable checkpoints (policy + optimizer state + step
+count) go to --checkpoint-dir every --checkpoint-freq steps, and each rollout
+logs env steps/sec and learner updates/sec under throughput/.
+
+The final model goes to --out (default: <checkpoint-dir>/ppo_fencing_final .zip/.npz).
+The model the game server loads (app/models/ppo_fencing) is only replaced with
+--install, and never by an interrupted run.
+"""
+import argparse
+import glob
+import os
+import re
+import shutil
+import time
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback, CheckpointCallback
+from stable_baselines3.common.env_util import make_vec_env
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+from app.game.gym_env import FencingEnv
+from app.game.trained_ai import DEFAULT_MODEL_PATH
+from export_policy import export
+
+CHECKPOINT_PREFIX = "ppo_fencing"
+SHIPPED_MODEL = os.path.splitext(DEFAULT_MODEL_PATH)[0]  # what the game server loads
+
+
+class ThroughputCallback(BaseCallback):
+    """Logs env steps/sec (rollout collection) and learner updates/sec (PPO minibatch gradient steps)."""
+
+    def __init__(self, verbose=0):
+        super().__init__(verbose)
+        self._start = None
+        self._rollout_start = None
+        self._rollout_end = None
+        self._steps_at_start = 0
+        self._rollout_steps = 0
+        self._updates_at_end = 0
+
+    def _on_training_start(self):
+        self._start = time.perf_counter()
+        self._steps_at_start = self.num_timesteps
+
+    def _on_rollout_start(self):
+        now = time.perf_counter()
+        if self._rollout_end is not None:
+            # Time since the last rollout ended was spent in the learner; _n_updates counts
+            # epochs, each a pass of minibatch gradient steps over the rollout
+            minibatches = -(-self.model.n_steps * self.model.n_envs // self.model.batch_size)
+            updates = (self.model._n_updates - self._updates_at_end) * minibatches
+            train_time = now - self._rollout_end
+            self.logger.record("throughput/updates_per_s", updates / train_time if train_time > 0 else 0.0)
+            self.logger.record("throughput/train_s", train_time)
+        self._rollout_start = now
+        self._rollout_steps = self.num_timesteps
+
+    def _on_step(self) -> bool:
+        return True
+
+    def _on_rollout_end(self):
+        now = time.perf_counter()
+        steps = self.num_timesteps - self._rollout_steps
+        collect_time = now - self._rollout_start
+        self.logger.record("throughput/env_steps_per_s", steps / collect_time if collect_time > 0 else 0.0)
+        self.logger.record("throughput/collect_s", collect_time)
+        total = now - self._start
+        self.logger.record("throughput/overall_steps_per_s", (self.num_timesteps - self._steps_at_start) / total)
+        self._rollout_end = now
+        self._updates_at_end = self.model._n_updates
+
+
+def latest_checkpoint(checkpoint_dir: str):
+    """Checkpoint with the highest step count in checkpoint_dir, or None."""
+    best, best_steps = None, -1
+    for path in glob.glob(os.path.join(checkpoint_dir, f"{CHECKPOINT_PREFIX}_*_steps.zip")):
+        match = re.search(r"_(\d+)_steps\.zip$", path)
+        if match and int(match.group(1)) > best_steps:
+            best, best_steps = path, int(match.group(1))
+    return best
+
+
+def train(args):
+    vec_env_cls = DummyVecEnv if args.vec == "dummy" else SubprocVecEnv
+    env = make_vec_env(FencingEnv, n_envs=args.envs, seed=args.seed, vec_env_cls=vec_env_cls,
+                       env_kwargs={"frame_skip": args.frame_skip, "skip_locked": args.skip_locked})
+
+    resume = latest_checkpoint(args.checkpoint_dir) if args.resume == "latest" else args.resume
+    if resume:
+        # Restores the policy, optimizer state and num_timesteps; the rollout settings
+        # are the checkpoint's (n_steps etc. from the command line do not apply)
+        model = PPO.load(resume, env=env, device=args.device)
+        print(f"Resuming from {resume} at {model.num_timesteps} steps")
+    else:
+        if args.resume == "latest":
+            print(f"No checkpoint in {args.checkpoint_dir}, starting from scratch")
+        model = PPO("MlpPolicy", env, verbose=1, learning_rate=args.learning_rate, n_steps=args.n_steps,
+                    batch_size=args.batch_size, seed=args.seed, device=args.device)
+
+    remaining = args.timesteps - model.num_timesteps
+    callbacks = [
+        # save_freq counts vec-env steps, i.e. `envs` transitions each
+        CheckpointCallback(save_freq=max(args.checkpoint_freq // args.envs, 1), save_path=args.checkpoint_dir,
+                           name_prefix=CHECKPOINT_PREFIX),
+        ThroughputCallback(),
+    ]
+    print(f"Training with {args.envs} {vec_env_cls.__name__} envs for {max(remaining, 0)} steps...")
+    interrupted = False
+    try:
+        if remaining > 0:
+            model.learn(total_timesteps=remaining, callback=callbacks, reset_num_timesteps=False)
+    except KeyboardInterrupt:
+        interrupted = True
+        print("Training interrupted manually.")
+    finally:
+        env.close()
+
+    # Final checkpoint (resumable) plus the model in the format the game server loads
+    os.makedirs(args.checkpoint_dir, exist_ok=True)
+    model.save(os.path.join(args.checkpoint_dir, f"{CHECKPOINT_PREFIX}_{model.num_timesteps}_steps"))
+    out = args.out or os.path.join(args.checkpoint_dir, f"{CHECKPOINT_PREFIX}_final")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    model.save(out)
+    print(f"Model saved to {out}.zip ({model.num_timesteps} steps)")
+    export(f"{out}.zip", f"{out}.npz")
+
+    if args.install:
+        if interrupted:
+            print(f"Interrupted run: {SHIPPED_MODEL}.zip left as it was")
+            return
+        for ext in (".zip", ".npz"):
+            shutil.copyfile(out + ext, SHIPPED_MODEL + ext)
+        print(f"Installed as {SHIPPED_MODEL}.zip / .npz (served by the game from its next start)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--envs", type=int, default=os.cpu_count() or 1, help="env worker processes")
+    parser.add_argument("--vec", choices=("subproc", "dummy"), default="subproc",
+                        help="dummy steps all envs in the learner process (debugging)")
+    parser.add_argument("--timesteps", type=int, default=1_000_000, help="total env steps to train up to")
+    parser.add_argument("--frame-skip", type=int, default=1, help="ticks an action is repeated per env step")
+    parser.add_argument("--skip-locked", action="store_true",
+                        help="fast-forward ticks in which the agent cannot act (not NEUTRAL, or frozen after a touch)")
+    parser.add_argument("--n-steps", type=int, default=2048, help="rollout length per env")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--learning-rate", type=float, default=0.0003)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--device", default="auto")
+    parser.add_argument("--checkpoint-dir", default="checkpoints")
+    parser.add_argument("--checkpoint-freq", type=int, default=100_000, help="env steps between checkpoints")
+    parser.add_argument("--resume", help="checkpoint .zip to continue from, or 'latest'")
+    parser.add_argument("--out", help="final model path, without extension (default: in --checkpoint-dir)")
+    parser.add_argument("--install", action="store_true",
+                        help=f"replace the model the game serves ({SHIPPED_MODEL}) once training completes")
+    args = parser.parse_args()
+    if args.out and os.path.abspath(args.out) == os.path.abspath(SHIPPED_MODEL):
+        parser.error(f"--out {args.out} is the model the game serves; use --install to replace it")
+    train(args)
+
+
+if __name__ == "__main__":
+    main()
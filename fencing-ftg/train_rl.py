@@ -1,6 +1,7 @@
 import gymnasium as gym
 from stable_baselines3 import PPO
 from app.game.gym_env import FencingEnv
+from export_policy import export
 import os
 
 def train():
@@ -27,6 +28,8 @@ def train():
     model_path = "app/models/ppo_fencing"
     model.save(model_path)
     print(f"Model saved to {model_path}.zip")
+    # Torch-free copy for the game server (app/game/numpy_policy.py)
+    export(f"{model_path}.zip", f"{model_path}.npz")
 
     # 5. Optional: Test the model
     obs, _ = env.reset()